@@ -0,0 +1,349 @@
+"""版本号与版本范围。
+
+版本号被解析成可以直接用元组比较的键，版本范围（forge 使用的 maven 区间、fabric / quilt 使用的
+semver 谓词和 x 通配符）被编译成若干个区间，判断版本是否在范围内时只需要做几次元组比较。
+解析和编译的结果都放在 LRU 缓存中，相同的字符串总是得到同一个对象。
+
+版本号的规则（参考 semver，并兼容 mc 和 mod 常见的写法）：
+    - 开头由点分隔的数字是正式版本号，末尾的 0 不影响比较，1.19 == 1.19.0
+    - 剩下的部分是预发布标识（例如 1.19.2-pre1、1.0.0-beta.2），带预发布标识的版本低于对应的正式版本
+    - + 之后的构建信息不参与比较
+"""
+import re
+from functools import lru_cache
+from typing import Any, Iterable, Union
+
+_tKey = tuple[tuple[int, ...], tuple]
+"""版本的比较键：(正式版本号, 预发布标识键)"""
+_tBound = Union[_tKey, None]
+_tInterval = tuple[_tBound, bool, _tBound, bool]
+"""(下界, 是否包含下界, 上界, 是否包含上界)，界为 None 表示无穷"""
+
+_RELEASE = (1,)
+"""正式版本的预发布标识键，比任何预发布标识都大"""
+_LOWEST = (0, ())
+"""比任何预发布标识都小的键，用于表示某个版本号之前的最小版本"""
+
+_TOKEN = re.compile(r'\d+|[a-zA-Z]+')
+_WILDCARDS = ('x', 'X', '*')
+
+
+class Version:
+    """解析后的版本号，可以直接比较大小，用 parse_version 创建"""
+    __slots__ = ('text', 'release', 'pre', 'key')
+
+    def __init__(self, text: str, release: tuple[int, ...], pre: tuple) -> None:
+        self.text: str = text
+        self.release: tuple[int, ...] = release
+        self.pre: tuple = pre
+        self.key: _tKey = (_trim(release), (0, pre) if pre else _RELEASE)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Version) and self.key == other.key
+
+    def __lt__(self, other: 'Version') -> bool:
+        return self.key < other.key
+
+    def __le__(self, other: 'Version') -> bool:
+        return self.key <= other.key
+
+    def __gt__(self, other: 'Version') -> bool:
+        return self.key > other.key
+
+    def __ge__(self, other: 'Version') -> bool:
+        return self.key >= other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __repr__(self) -> str:
+        return f"Version({self.text!r})"
+
+    def __reduce__(self):
+        return parse_version, (self.text,)
+
+
+def _trim(release: tuple[int, ...]) -> tuple[int, ...]:
+    end = len(release)
+    while end and release[end - 1] == 0:
+        end -= 1
+    return release[:end]
+
+
+def _pre_key(text: str) -> tuple:
+    """预发布标识的比较键，数字部分按数字比较并且小于字母部分（同 semver）"""
+    return tuple((0, int(t), '') if t.isdigit() else (1, 0, t.lower())
+                 for t in _TOKEN.findall(text))
+
+
+@lru_cache(maxsize=8192)
+def parse_version(text: str) -> Version:
+    """解析版本号，任何字符串都能解析，不会抛出异常"""
+    core = text.strip().lstrip('vV').split('+', 1)[0]
+    release: list[int] = []
+    rest = ''
+    parts = core.split('.')
+    for i, part in enumerate(parts):
+        if part.isdigit():
+            release.append(int(part))
+            continue
+        # 1.19.2-pre1 这样的写法中，数字后面紧跟的部分是预发布标识
+        m = re.match(r'\d+', part)
+        if m:
+            release.append(int(m.group()))
+            part = part[m.end():]
+        rest = '.'.join([part] + parts[i + 1:])
+        break
+    return Version(text, tuple(release), _pre_key(rest))
+
+
+def version_key(version: 'str | Version') -> _tKey:
+    """获取版本号的比较键"""
+    if isinstance(version, Version):
+        return version.key
+    return parse_version(version).key
+
+
+def _lowest_of(release: Iterable[int]) -> _tKey:
+    """某个正式版本号（包括它的预发布版本）中最小的版本"""
+    return (_trim(tuple(release)), _LOWEST)
+
+
+class VersionRange:
+    """编译好的版本范围，由若干个区间组成，版本在任意一个区间内即满足范围。
+    用 compile_range 创建，不要直接构造。
+    """
+    __slots__ = ('spec', 'maven', 'intervals', 'valid')
+
+    def __init__(self, spec: Any, maven: bool, intervals: tuple[_tInterval, ...],
+                 valid: bool = True) -> None:
+        self.spec: Any = spec
+        """编译前的范围，字符串或者 fabric / quilt 格式的列表、字典（已经转成元组）"""
+        self.maven: bool = maven
+        self.intervals: tuple[_tInterval, ...] = intervals
+        self.valid: bool = valid
+        """范围是否能被正确解析，不能解析的范围包含任何版本"""
+
+    def contains(self, version: 'str | Version') -> bool:
+        """判断一个版本是否在范围内"""
+        key = version.key if isinstance(version, Version) else parse_version(version).key
+        for lo, lo_in, hi, hi_in in self.intervals:
+            if lo is not None and (key < lo or (key == lo and not lo_in)):
+                continue
+            if hi is not None and (key > hi or (key == hi and not hi_in)):
+                continue
+            return True
+        return False
+
+    __contains__ = contains
+
+    @property
+    def is_any(self) -> bool:
+        """是否包含任何版本"""
+        return any(lo is None and hi is None for lo, _, hi, _ in self.intervals)
+
+    def __repr__(self) -> str:
+        return f"VersionRange({self.spec!r})"
+
+    def __reduce__(self):
+        # 反序列化时重新经过缓存，保证相同的范围仍然是同一个对象
+        return compile_range, (self.spec, self.maven)
+
+
+_ANY_INTERVAL: _tInterval = (None, True, None, True)
+
+
+def _intersect(a: _tInterval, b: _tInterval) -> _tInterval | None:
+    lo, lo_in, hi, hi_in = a
+    if b[0] is not None and (lo is None or b[0] > lo or (b[0] == lo and not b[1])):
+        lo, lo_in = b[0], b[1]
+    if b[2] is not None and (hi is None or b[2] < hi or (b[2] == hi and not b[3])):
+        hi, hi_in = b[2], b[3]
+    if lo is not None and hi is not None and (lo > hi or (lo == hi and not (lo_in and hi_in))):
+        return None
+    return (lo, lo_in, hi, hi_in)
+
+
+def _intersect_all(a: list[_tInterval], b: list[_tInterval]) -> list[_tInterval]:
+    result = []
+    for i in a:
+        for j in b:
+            if (k := _intersect(i, j)) is not None:
+                result.append(k)
+    return result
+
+
+def _parse_maven(spec: str) -> list[_tInterval]:
+    """解析 maven 版本范围，例如 [1.0,2.0)、[1.0,)、(,1.0]、[1.0]、[1,2),[3,)
+    只有一个版本号（forge 中的推荐版本）或 * 时包含任何版本。
+    """
+    spec = spec.replace(' ', '')
+    if not spec or spec == '*':
+        return [_ANY_INTERVAL]
+    if spec[0] not in '[(':
+        # 不带括号的版本号在 maven 中只是推荐版本，不做限制
+        parse_version(spec)
+        return [_ANY_INTERVAL]
+    result: list[_tInterval] = []
+    for m in re.finditer(r'([\[(])([^\[\]()]*)([\])])', spec):
+        start, body, end = m.groups()
+        bounds = body.split(',')
+        if len(bounds) == 1:
+            if start != '[' or end != ']':
+                raise ValueError(f"错误的版本范围 {spec}")
+            key = version_key(bounds[0])
+            result.append((key, True, key, True))
+            continue
+        if len(bounds) != 2:
+            raise ValueError(f"错误的版本范围 {spec}")
+        lo = version_key(bounds[0]) if bounds[0] else None
+        hi = version_key(bounds[1]) if bounds[1] else None
+        result.append((lo, start == '[', hi, end == ']'))
+    if not result:
+        raise ValueError(f"错误的版本范围 {spec}")
+    return result
+
+
+def _wildcard_interval(version: str) -> _tInterval | None:
+    """1.19.x、1.x、1.19.* 这样的通配符对应的区间，没有通配符时返回 None"""
+    parts = version.split('+', 1)[0].split('.')
+    for i, part in enumerate(parts):
+        if part in _WILDCARDS:
+            fixed = [int(p) for p in parts[:i]]
+            if not fixed:
+                return _ANY_INTERVAL
+            upper = fixed[:-1] + [fixed[-1] + 1]
+            return (_lowest_of(fixed), True, _lowest_of(upper), False)
+    return None
+
+
+def _parse_predicate(predicate: str) -> _tInterval | None:
+    """解析一个 semver 谓词，例如 >=1.2.0、~1.2、^1.0.0、1.19.x、=1.0，返回 None 表示不可能满足"""
+    m = re.fullmatch(r'(>=|<=|>|<|=|~|\^)?\s*(.+)', predicate)
+    if not m:
+        raise ValueError(f"错误的版本谓词 {predicate}")
+    op, version = m.group(1) or '=', m.group(2)
+    wildcard = _wildcard_interval(version)
+    if wildcard is not None:
+        lo, _, hi, _ = wildcard
+        if op == '=':
+            return wildcard
+        if op in ('>=', '~', '^'):
+            return (lo, True, None, True)
+        if op == '>':
+            return (hi, True, None, True) if hi is not None else None
+        if op == '<':
+            return (None, True, lo, False) if lo is not None else None
+        return (None, True, hi, False)
+
+    v = parse_version(version)
+    if op == '=':
+        return (v.key, True, v.key, True)
+    if op == '>=':
+        return (v.key, True, None, True)
+    if op == '>':
+        return (v.key, False, None, True)
+    if op == '<=':
+        return (None, True, v.key, True)
+    if op == '<':
+        return (None, True, v.key, False)
+    release = list(v.release) or [0]
+    if op == '~':
+        # 同一个次版本号：~1.2.3 := >=1.2.3 <1.3
+        upper = release[:2] if len(release) >= 2 else release[:1]
+    else:
+        # 同一个主版本号：^1.2.3 := >=1.2.3 <2
+        upper = release[:1]
+    upper = upper[:-1] + [upper[-1] + 1]
+    return (v.key, True, _lowest_of(upper), False)
+
+
+def _parse_semver(spec: str) -> list[_tInterval]:
+    """解析 fabric / quilt 的版本谓词，空格分隔的多个谓词必须同时满足，|| 分隔的多组满足任意一组即可"""
+    result: list[_tInterval] = []
+    for group in spec.split('||'):
+        interval: _tInterval | None = _ANY_INTERVAL
+        for predicate in re.sub(r'(>=|<=|>|<|=|~|\^)\s+', r'\1', group).split():
+            if predicate == '*':
+                continue
+            part = _parse_predicate(predicate)
+            interval = None if part is None else _intersect(interval, part)  # type: ignore
+            if interval is None:
+                break
+        if interval is not None:
+            result.append(interval)
+    return result
+
+
+def _parse_spec(spec: Any, maven: bool) -> list[_tInterval]:
+    if isinstance(spec, str):
+        spec = spec.strip()
+        if not spec:
+            return [_ANY_INTERVAL]
+        if maven or spec[0] in '[(':
+            return _parse_maven(spec)
+        return _parse_semver(spec)
+    if isinstance(spec, tuple) and spec and spec[0] in ('any', 'all') and len(spec) == 2 \
+            and isinstance(spec[1], tuple):
+        # quilt 的 {"any": [...]} 和 {"all": [...]}
+        if spec[0] == 'all':
+            result = [_ANY_INTERVAL]
+            for i in spec[1]:
+                result = _intersect_all(result, _parse_spec(i, maven))
+            return result
+        spec = spec[1]
+    if isinstance(spec, tuple):
+        # fabric / quilt 的列表表示满足任意一个即可
+        result = []
+        for i in spec:
+            result.extend(_parse_spec(i, maven))
+        return result
+    raise ValueError(f"不支持的版本范围 {spec!r}")
+
+
+def _freeze(spec: Any) -> Any:
+    """把 json 中的列表和字典转成可以作为缓存键的元组"""
+    if isinstance(spec, list):
+        return tuple(_freeze(i) for i in spec)
+    if isinstance(spec, dict):
+        if len(spec) == 1:
+            k, v = next(iter(spec.items()))
+            return (k, _freeze(v if isinstance(v, list) else [v]))
+        raise ValueError(f"不支持的版本范围 {spec!r}")
+    return spec
+
+
+@lru_cache(maxsize=4096)
+def _compile(spec: Any, maven: bool) -> VersionRange:
+    try:
+        return VersionRange(spec, maven, tuple(_parse_spec(spec, maven)))
+    except (ValueError, TypeError):
+        return VersionRange(spec, maven, (_ANY_INTERVAL,), valid=False)
+
+
+def compile_range(spec: Any, maven: bool = False) -> VersionRange:
+    """编译一个版本范围，不能解析的范围会得到包含任何版本、valid 为 False 的范围
+
+    Args:
+        spec: 版本范围，字符串，或者 fabric / quilt 格式的列表、quilt 的 {"any": [...]} / {"all": [...]}
+        maven: 是否按照 maven（forge）格式解析，为 False 时以 [ 或 ( 开头的字符串也按 maven 格式解析
+    """
+    try:
+        return _compile(_freeze(spec), maven)
+    except (ValueError, TypeError):
+        return VersionRange(spec, maven, (_ANY_INTERVAL,), valid=False)
+
+
+def range_text(spec: Any) -> str:
+    """把版本范围转换成用于显示的字符串"""
+    if isinstance(spec, str):
+        return spec
+    if isinstance(spec, list):
+        return ' || '.join(range_text(i) for i in spec)
+    if isinstance(spec, dict):
+        return '; '.join(f'{k}: {range_text(v)}' for k, v in spec.items())
+    return str(spec)
+
+
+ANY_RANGE: VersionRange = compile_range('*')
+"""包含任何版本的范围"""
@@ -0,0 +1,113 @@
+"""对比逐个遍历 mod 列表与使用 mod id 索引、依赖图检查一个游戏的前置 mod 的用时
+
+    python -m bench.CheckBench [mod 数量] [每个 mod 的前置数量]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from bench.JarFactory import make_fabric_jar, make_game_dir
+from data.GameInfo import Game
+from data.GameModsCheck import check_game
+from data.ModWatcher import ModWatcher
+
+
+def linear_check(game: Game) -> int:
+    """旧的检查方式：每个依赖都遍历整个 mod 列表（并递归子 mod）查找，返回问题数量"""
+    mods = game.get_mods_or_load()
+    problems = 0
+    for mod in mods:
+        info = mod.get_info(game.game_type)  # type: ignore
+        if info is None or not mod.enabled:
+            continue
+        for dep in info.dependencies:
+            if not dep.mandatory:
+                continue
+            if not any(i.include_mod_by_id(dep.mod_id) for i in mods):
+                problems += 1
+                continue
+            dep_mod = next((i for i in mods if dep.mod_id in i.get_ids()), None)
+            if dep_mod is not None and not dep_mod.enabled:
+                problems += 1
+    return problems
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    dep_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rnd = random.Random(0)
+    with tempfile.TemporaryDirectory() as versions_dir:
+        game_dir = make_game_dir(versions_dir, 'bench')
+        mods_dir = os.path.join(game_dir, 'mods')
+        for i in range(count):
+            # 大部分前置都存在，少数缺失
+            depends = {f'bench_mod_{rnd.randrange(count + count // 20)}': '*'
+                       for _ in range(dep_count)}
+            suffix = '.jar' if rnd.random() > 0.05 else '.jar.disabled'
+            make_fabric_jar(os.path.join(mods_dir, f'bench_mod_{i}{suffix}'),
+                            f'bench_mod_{i}', 4, seed=i, depends=depends)
+
+        game = Game.create(game_dir)
+        game.reload_mods(workers=1)
+        print(f"{count} 个 mod，每个 {dep_count} 个前置")
+
+        start = time.perf_counter()
+        problems = linear_check(game)
+        print(f"  遍历列表  {time.perf_counter() - start:8.4f}s  {problems} 个问题")
+
+        game.mod_index = None
+        start = time.perf_counter()
+        result = check_game(game)
+        used = time.perf_counter() - start
+        print(f"  依赖图    {used:8.4f}s  {sum(len(v) for v in result.values())} 个问题（含建立索引和依赖图）")
+
+        start = time.perf_counter()
+        check_game(game)
+        print(f"  依赖图    {time.perf_counter() - start:8.4f}s  （依赖图已建立）")
+
+        # 逐个开关 mod，每次只重新检查受影响的部分
+        mods = game.get_mods_or_load()[:50]
+        start = time.perf_counter()
+        for mod in mods:
+            game.set_mod_enabled(mod, not mod.enabled)
+            check_game(game)
+        toggle = (time.perf_counter() - start) / len(mods)
+        for mod in mods:
+            game.set_mod_enabled(mod, not mod.enabled)
+        print(f"  开关一个 mod 后重新检查  {toggle * 1000:8.3f}ms")
+
+        # 增量结果应当与重新建立依赖图的结果一致
+        assert_incremental(game)
+
+        # 通过监听器重命名一个有问题的 mod、删除另一个有问题的 mod，结果中不能有重复或者已经删除的 mod
+        watcher = ModWatcher(use_inotify=False)
+        watcher.watch(mods_dir, lambda delta: None)
+        problem_mods = [mod for mod in check_game(game) if mod.enabled]
+        renamed, deleted = problem_mods[0], problem_mods[1]
+        os.rename(renamed.full_file_path, os.path.join(mods_dir, 'renamed.jar'))
+        os.remove(deleted.full_file_path)
+        delta = watcher.check(mods_dir)
+        assert delta is not None and len(delta.moved) == 1 and len(delta.removed) == 1, delta
+        game.apply_mods_delta(delta)
+        result = check_game(game)
+        assert sum(mod is renamed for mod in result) == 1 and renamed.full_file_path.endswith('renamed.jar')
+        assert all(mod is not deleted for mod in result)
+        assert all(os.path.exists(mod.full_file_path) for mod in result)
+        assert_incremental(game)
+        print("  重命名、删除 mod 后的增量结果正确")
+
+
+def assert_incremental(game: Game) -> None:
+    """增量更新的检查结果应当和重新建立依赖图的结果相同"""
+    incremental = check_game(game)
+    assert len({id(mod) for mod in incremental}) == len(incremental)
+    game.mods_checker = None
+    full = check_game(game)
+    assert ({k.full_file_path: sorted(map(str, v)) for k, v in incremental.items()} ==
+            {k.full_file_path: sorted(map(str, v)) for k, v in full.items()})
+
+
+if __name__ == '__main__':
+    main()
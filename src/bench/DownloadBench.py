@@ -0,0 +1,153 @@
+"""对比原来每个请求新开一个线程调用 httpx.get，与下载管理器共享连接池并发下载大量 jar 的表现
+
+    python -m bench.DownloadBench [jar 数量] [每个请求的延迟毫秒]
+
+在本地服务器上测量总用时、建立的连接数和服务器同时处理的最大请求数，
+然后让一部分文件前两次请求返回 503，检查重试后全部下载完整；最后检查取消和优先级。
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+from bench.HttpServer import LocalServer
+from bench.JarFactory import LOADERS, mod_jar_bytes
+from download.DownloadManager import DownloadManager, JobState
+
+
+def old_download(urls: list[str], target_dir: str) -> int:
+    """原来 DownloadThread.Get 的做法：每个请求一个新线程，每次都用模块级的 httpx.get，返回失败的数量"""
+    failed: list[str] = []
+
+    def run(url: str):
+        try:
+            response = httpx.get(url)
+        except httpx.HTTPError:
+            failed.append(url)
+            return
+        with open(os.path.join(target_dir, url.rsplit('/', 1)[1]), 'wb') as f:
+            f.write(response.content)
+    threads = [threading.Thread(target=run, args=(url,)) for url in urls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(failed)
+
+
+def manager_download(manager: DownloadManager, urls: list[str], target_dir: str) -> list:
+    jobs = [manager.download(url, os.path.join(target_dir, url.rsplit('/', 1)[1])) for url in urls]
+    while not all(job.finished for job in jobs):
+        manager.drain()
+        time.sleep(0.005)
+    manager.drain()
+    return jobs
+
+
+def check_files(files: dict[str, bytes], target_dir: str) -> None:
+    for path, data in files.items():
+        with open(os.path.join(target_dir, path.rsplit('/', 1)[1]), 'rb') as f:
+            assert f.read() == data, path
+    leftovers = [i for i in os.listdir(target_dir) if i.endswith('.part')]
+    assert not leftovers, leftovers
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+    rnd = random.Random(0)
+    files = {f'/mods/mod{i}.jar': mod_jar_bytes(LOADERS[i % len(LOADERS)], f'mod{i}', seed=i,
+                                                  class_count=rnd.randint(5, 60))
+             for i in range(count)}
+    urls_of = lambda server: [server.url(path) for path in files]
+    total = sum(len(i) for i in files.values())
+    print(f"{count} 个 jar，共 {total / 1024 / 1024:.1f}MB，每个请求延迟 {latency * 1000:.0f}ms")
+
+    with LocalServer(files, latency=latency) as server:
+        with tempfile.TemporaryDirectory() as target_dir:
+            start = time.perf_counter()
+            failed = old_download(urls_of(server), target_dir)
+            used = time.perf_counter() - start
+            if not failed:
+                check_files(files, target_dir)
+            print(f"  每个请求一个线程  {used:6.3f}s  连接 {server.connections:4d}  "
+                  f"最大并发 {server.max_active:4d}  失败 {failed}")
+
+        server.reset_stats()
+        with tempfile.TemporaryDirectory() as target_dir:
+            manager = DownloadManager(workers=8, per_host=8)
+            start = time.perf_counter()
+            jobs = manager_download(manager, urls_of(server), target_dir)
+            used = time.perf_counter() - start
+            manager.close()
+            assert all(job.state == JobState.done for job in jobs)
+            check_files(files, target_dir)
+            print(f"  下载管理器        {used:6.3f}s  连接 {server.connections:4d}  "
+                  f"最大并发 {server.max_active:4d}")
+
+        server.reset_stats()
+        flaky = {path: 2 for i, path in enumerate(files) if i % 5 == 0}
+        server.fail_first.update(flaky)
+        with tempfile.TemporaryDirectory() as target_dir:
+            manager = DownloadManager(workers=8, per_host=4, backoff=0.01)
+            start = time.perf_counter()
+            jobs = manager_download(manager, urls_of(server), target_dir)
+            used = time.perf_counter() - start
+            manager.close()
+            assert all(job.state == JobState.done for job in jobs), [j.error for j in jobs if j.error]
+            check_files(files, target_dir)
+            print(f"  {len(flaky)} 个文件前两次 503  {used:6.3f}s  请求 {server.requests:4d}  "
+                  f"最大并发 {server.max_active:4d}（每个主机上限 4）")
+
+        # 单线程时按优先级执行，已经取消的任务不会发出请求
+        server.reset_stats()
+        with tempfile.TemporaryDirectory() as target_dir:
+            manager = DownloadManager(workers=1, per_host=1)
+            paths = list(files)[:5]
+            order: list[str] = []
+            release = threading.Event()
+            server.routes['/block'] = lambda handler: (release.wait(), handler.send_bytes(b'ok'))
+            blocker = manager.get(server.url('/block'))
+            jobs = [manager.download(server.url(path), os.path.join(target_dir, f'{i}.jar'), priority=i,
+                                     on_done_in_worker=lambda job: order.append(job.url))
+                    for i, path in enumerate(paths)]
+            jobs[2].cancel()
+            release.set()
+            while not all(job.finished for job in jobs):
+                time.sleep(0.005)
+            manager.close()
+            expected = [job.url for job in reversed(jobs) if job is not jobs[2]]
+            assert blocker.state == JobState.done
+            assert jobs[2].state == JobState.cancelled
+            assert [i for i in order if i != jobs[2].url] == expected, order
+            assert server.requests == len(paths)
+            print("  优先级和取消正确")
+
+        # 取出之后、开始下载之前被取消的任务也会归还主机的名额，同一个主机的下一个任务不会一直等待
+        manager = DownloadManager(workers=1, per_host=1)
+        take = manager._take
+
+        def take_then_cancel():
+            taken = take()
+            if taken is not None and taken[0].url.endswith('/block'):
+                taken[0].cancel()
+            return taken
+
+        manager._take = take_then_cancel  # type: ignore
+        cancelled = manager.get(server.url('/block'))
+        after = manager.get(server.url(paths[0]))
+        deadline = time.perf_counter() + 30
+        while not after.finished and time.perf_counter() < deadline:
+            time.sleep(0.005)
+        assert cancelled.state == JobState.cancelled and after.state == JobState.done, after.state
+        assert not manager._running and not manager._active, manager._running
+        manager.close()
+        print("  取出后取消的任务归还了名额")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""对比逐个判断每个 mod 与使用位集筛选器时，切换加载器、版本筛选的耗时，以及需要显示、隐藏的控件数量
+
+    python -m bench.FilterBench [mod 数量...]
+"""
+import random
+import sys
+import time
+
+from Version import compile_range
+from bench.SearchBench import make_mods
+from data.ModFilter import ModFilter
+
+_LOADERS = ('forge', 'fabric', 'quilt', 'other')
+_MC_VERSIONS = {
+    'forge': ['[1.18.2,1.19)', '[1.19,1.20)', '[1.19.2,)', '[1.20.1]'],
+    'fabric': ['~1.19', '1.19.x', '>=1.18.2', '1.20.1', '*'],
+    'quilt': ['>=1.19', '1.19.2'],
+    'other': [''],
+}
+_TOGGLES = [('fabric', False), ('version', '1.19.2'), ('forge', False), ('fabric', True),
+            ('version', '1.20.1'), ('version', ''), ('forge', True), ('other', False),
+            ('other', True), ('quilt', False), ('quilt', True), ('version', '1.18.2')]
+
+
+def make_filter_mods(count: int, seed: int = 0):
+    rnd = random.Random(seed)
+    mods = make_mods(count, seed)
+    for mod in mods:
+        loader = rnd.choice(_LOADERS)
+        for info in mod.mod_info:
+            info.loader = loader if loader != 'other' else ''
+            info.mc_version = rnd.choice(_MC_VERSIONS[loader])
+    return mods
+
+
+def linear_visible(mods, options: dict) -> list[bool]:
+    """原来的做法：每次都重新判断每个 mod"""
+    result = []
+    for mod in mods:
+        loaders = mod.support_loaders()
+        show = any(options[i] and i in loaders for i in ('forge', 'fabric', 'quilt')) or (
+            options['other'] and not {'forge', 'fabric', 'quilt'} & set(loaders))
+        if show and options['version']:
+            show = any(info.mc_version in ('', '0.0.0', '*') or
+                       compile_range(info.mc_version, maven=info.loader == 'forge')
+                       .contains(options['version']) for info in mod.mod_info)
+        result.append(show)
+    return result
+
+
+def run(count: int):
+    mods = make_filter_mods(count)
+    options: dict = {'forge': True, 'fabric': True, 'quilt': True, 'other': True, 'version': ''}
+    mod_filter = ModFilter()
+    slots = [mod_filter.add(mod)[0] for mod in mods]
+
+    start = time.perf_counter()
+    linear_states = []
+    for key, value in _TOGGLES:
+        options[key] = value
+        linear_states.append(linear_visible(mods, options))
+    linear_time = time.perf_counter() - start
+
+    options = {'forge': True, 'fabric': True, 'quilt': True, 'other': True, 'version': ''}
+    changed = 0
+    start = time.perf_counter()
+    filter_states = []
+    for key, value in _TOGGLES:
+        options[key] = value
+        mod_filter.loaders = {i for i in _LOADERS if options[i]}
+        mod_filter.version = options['version']
+        shown, hidden = mod_filter.refresh()
+        changed += len(shown) + len(hidden)
+        filter_states.append(mod_filter.visible)
+    filter_time = time.perf_counter() - start
+
+    for linear, visible in zip(linear_states, filter_states):
+        assert linear == [bool(visible >> slot & 1) for slot in slots]
+    per_toggle = len(_TOGGLES)
+    print(f"  {count:6d} 个 mod：逐个判断 {linear_time / per_toggle * 1000:8.3f}ms/次，"
+          f"筛选器 {filter_time / per_toggle * 1000:8.3f}ms/次，"
+          f"平均每次 {changed / per_toggle:8.1f} 个控件需要显示或隐藏（原来是 {count} 个）")
+
+
+def churn(count: int, rounds: int = 20):
+    """反复删除、加入一半的 mod（模拟 mods 目录的大量变化），检查位集不会一直变长，
+    并且 index_of 得到的位置和按对象查找得到的一致"""
+    rnd = random.Random(count)
+    mods = make_filter_mods(count)
+    mod_filter = ModFilter()
+    mod_filter.loaders = {'forge', 'quilt', 'other'}
+    current, shown = [], []
+    for mod in mods:
+        current.append(mod)
+        if mod_filter.add(mod)[1]:
+            shown.append(mod)
+    start = time.perf_counter()
+    for i in range(rounds):
+        for mod in rnd.sample(current, count // 2):
+            index = mod_filter.index_of(mod, mod_filter.alive)
+            shown_index = mod_filter.index_of(mod, mod_filter.visible)
+            assert current[index] is mod
+            del current[index]
+            if shown_index >= 0:
+                assert shown[shown_index] is mod
+                del shown[shown_index]
+            mod_filter.remove(mod)
+        for mod in make_filter_mods(count // 2, seed=count + i + 1):
+            current.append(mod)
+            if mod_filter.add(mod)[1]:
+                shown.append(mod)
+        if i % 5 == 4:
+            mod_filter.version = '' if mod_filter.version else '1.19.2'
+            mod_filter.refresh()
+            shown = mod_filter.visible_mods()
+    used = time.perf_counter() - start
+    assert shown == mod_filter.visible_mods()
+    assert len(mod_filter.mods) <= 2 * count, len(mod_filter.mods)
+    print(f"  {count:6d} 个 mod 增删 {rounds} 轮：{used / rounds * 1000:8.3f}ms/轮，"
+          f"槽位数 {len(mod_filter.mods)}（不压缩时是 {count + rounds * (count // 2)}）")
+
+
+def main():
+    counts = [int(i) for i in sys.argv[1:]] or [20, 200, 2000]
+    print(f"切换 {len(_TOGGLES)} 次筛选条件，结果与逐个判断一致")
+    for count in counts:
+        run(count)
+    print("反复增删 mod，槽位被压缩，位置与按对象查找一致")
+    for count in counts:
+        churn(count)
+
+
+if __name__ == '__main__':
+    main()
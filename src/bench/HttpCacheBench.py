@@ -0,0 +1,98 @@
+"""测量 mcmod 搜索经过 http 缓存时，冷启动、命中缓存、过期后 304 重新验证、页面变化后重新下载的用时
+
+    python -m bench.HttpCacheBench [页数] [每个请求的延迟毫秒]
+
+使用本地服务器提供的假列表页（参考 bench.McModPages），缓存目录和有效期通过设置修改。
+"""
+import sys
+import tempfile
+import threading
+import time
+
+from bench.HttpServer import LocalServer
+from bench.McModPages import ListingSite
+from data.Settings import settings
+from download.DownloadManager import close_download_manager
+from download.HttpCache import cache_key, get_http_cache
+from download.McMod import McModSearchFilter, search_mod
+from download.WebMod import WebMod
+
+
+def search_pages(site: ListingSite, pages: int, filter: McModSearchFilter) -> tuple[float, list[list[WebMod]]]:
+    """同时搜索前 pages 页，等待全部结果，返回 (用时, 每页的结果)"""
+    results: list[list[WebMod] | None] = [None] * pages
+    left = threading.Semaphore(0)
+
+    def on_page(index: int):
+        def callback(mods: list[WebMod]):
+            results[index] = mods
+            left.release()
+        return callback
+
+    start = time.perf_counter()
+    for page in range(1, pages + 1):
+        search_mod(page, filter, on_page(page - 1), url=site.url)
+    for _ in range(pages):
+        assert left.acquire(timeout=30), "搜索超时"
+    return time.perf_counter() - start, results  # type: ignore
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 150) / 1000
+    old_settings = settings.http_cache_dir, settings.http_cache_ttl, settings.http_cache_max_mb
+    filter = McModSearchFilter(mc_version='1.19.2', loader='1', sort='lastedittime')
+    with tempfile.TemporaryDirectory() as cache_dir, LocalServer(latency=latency) as server:
+        settings.http_cache_dir = cache_dir
+        settings.http_cache_ttl = 600
+        site = ListingSite(server)
+        cache = get_http_cache()
+        print(f"{pages} 页，每个请求延迟 {latency * 1000:.0f}ms")
+
+        def report(name: str, used: float) -> None:
+            print(f"  {name:<12} {used * 1000:8.1f}ms  请求 {server.requests:3d}  "
+                  f"服务器发送 {server.bytes_sent / 1024:7.1f}KB  命中 {cache.hits} 304 {cache.revalidated} "
+                  f"未命中 {cache.misses}")
+            server.reset_stats()
+            cache.hits = cache.revalidated = cache.misses = 0
+
+        used, first = search_pages(site, pages, filter)
+        assert all(len(i) == site.per_page for i in first)
+        report('冷启动', used)
+
+        used, results = search_pages(site, pages, filter)
+        assert results == first and server.requests == 0
+        report('命中缓存', used)
+
+        # 参数顺序不同、多了空参数，仍然是同一个缓存条目
+        assert cache_key(site.url, {'b': '1', 'a': '2', 'c': ''}) == cache_key(site.url, {'a': '2', 'b': '1'})
+
+        settings.http_cache_ttl = 0
+        for page in range(1, pages + 1):
+            params = {**filter.to_dict(), 'page': str(page)}
+            entry = cache.lookup(site.url, params)
+            assert entry is not None
+            entry.expires = 0
+            cache._save_meta(entry)
+        used, results = search_pages(site, pages, filter)
+        assert results == first
+        report('过期后 304', used)
+
+        site.seed += 1
+        used, results = search_pages(site, pages, filter)
+        assert results != first and all(len(i) == site.per_page for i in results)
+        report('页面变化后', used)
+
+        print(f"  缓存占用 {cache.total_bytes() / 1024:.1f}KB")
+        # 淘汰发生在写入时，让页面再变化一次
+        cache.max_bytes = cache.total_bytes() // 4
+        site.seed += 1
+        search_pages(site, pages, filter)
+        assert cache.total_bytes() <= cache.max_bytes
+        print(f"  上限改为 {cache.max_bytes / 1024:.1f}KB 后占用 {cache.total_bytes() / 1024:.1f}KB")
+        close_download_manager()
+    settings.http_cache_dir, settings.http_cache_ttl, settings.http_cache_max_mb = old_settings
+
+
+if __name__ == '__main__':
+    main()
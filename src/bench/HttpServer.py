@@ -0,0 +1,159 @@
+"""性能测试用的本地 http 服务器，在后台线程中运行
+
+    with LocalServer({'/a.jar': data}, latency=0.02) as server:
+        url = server.url('/a.jar')
+
+支持长连接（HTTP/1.1），可以给每个请求加上固定的延迟，限制每个响应的传输速度，让指定的路径前几次请求返回 503，
+并统计建立的连接数、请求数、发送的字节数和同时处理的最大请求数，用来检查连接复用和并发上限。
+files 中的文件支持 If-None-Match、单个 Range 请求和 If-Range，ETag 是内容的 sha1。
+"""
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 128
+    """默认的 listen 队列只有 5，同时发起大量连接时会超时"""
+    daemon_threads = True
+
+    def handle_error(self, request, client_address) -> None:
+        # 客户端取消下载时断开连接是正常的
+        pass
+
+
+class LocalServer(object):
+    def __init__(self, files: dict[str, bytes] | None = None, latency: float = 0.0,
+                 fail_first: dict[str, int] | None = None, rate: float = 0.0) -> None:
+        """
+        Args:
+            files: 路径 -> 内容
+            latency: 每个请求在返回之前等待的秒数
+            fail_first: 路径 -> 前几次请求返回 503
+            rate: 每个响应每秒最多发送的字节数，0 表示不限制
+        """
+        self.files: dict[str, bytes] = files or {}
+        self.latency: float = latency
+        self.rate: float = rate
+        self.ranges: bool = True
+        """是否支持 Range 请求"""
+        self.bytes_sent: int = 0
+        self.fail_first: dict[str, int] = dict(fail_first or {})
+        self.routes: dict[str, Callable[[BaseHTTPRequestHandler], None]] = {}
+        """路径 -> 自定义的处理函数，优先于 files"""
+        self.connections: int = 0
+        self.requests: int = 0
+        self.active: int = 0
+        self.max_active: int = 0
+        self._lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def url(self, path: str) -> str:
+        return f'http://127.0.0.1:{self.port}{path}'
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.connections = self.requests = self.max_active = self.bytes_sent = 0
+
+    def __enter__(self) -> 'LocalServer':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _begin(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def _end(self) -> None:
+        with self._lock:
+            self.active -= 1
+
+    def _should_fail(self, path: str) -> bool:
+        with self._lock:
+            left = self.fail_first.get(path, 0)
+            if left > 0:
+                self.fail_first[path] = left - 1
+                return True
+            return False
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self) -> None:
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+            def send_bytes(self, data: bytes, status: int = 200, headers: dict[str, str] | None = None):
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                step = max(1, int(server.rate / 50)) if server.rate else len(data) or 1
+                for i in range(0, len(data), step):
+                    self.wfile.write(data[i:i + step])
+                    with server._lock:
+                        server.bytes_sent += len(data[i:i + step])
+                    if server.rate:
+                        time.sleep(step / server.rate)
+
+            def send_file(self, data: bytes):
+                etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+                headers = {'ETag': etag}
+                if server.ranges:
+                    headers['Accept-Ranges'] = 'bytes'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_bytes(b'', 304, {'ETag': etag})
+                    return
+                spec = self.headers.get('Range', '')
+                if_range = self.headers.get('If-Range')
+                if (not server.ranges or not spec.startswith('bytes=') or ',' in spec
+                        or (if_range is not None and if_range != etag)):
+                    self.send_bytes(data, 200, headers)
+                    return
+                first, _, last = spec[len('bytes='):].partition('-')
+                start = int(first) if first else max(0, len(data) - int(last))
+                end = min(int(last), len(data) - 1) if first and last else len(data) - 1
+                if start >= len(data) or start > end:
+                    self.send_bytes(b'', 416, {'Content-Range': f'bytes */{len(data)}'})
+                    return
+                headers['Content-Range'] = f'bytes {start}-{end}/{len(data)}'
+                self.send_bytes(data[start:end + 1], 206, headers)
+
+            def do_GET(self) -> None:
+                server._begin()
+                try:
+                    if server.latency:
+                        time.sleep(server.latency)
+                    path = self.path.split('?', 1)[0]
+                    if server._should_fail(path):
+                        self.send_bytes(b'busy', 503)
+                    elif path in server.routes:
+                        server.routes[path](self)
+                    elif path in server.files:
+                        self.send_file(server.files[path])
+                    else:
+                        self.send_bytes(b'not found', 404)
+                finally:
+                    server._end()
+
+        return Handler
@@ -0,0 +1,65 @@
+"""对比扫描时就读取全部图标（旧方式）与按需读取图标的内存占用
+
+    python -m bench.IconBench [mod 数量] [图标边长]
+"""
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bench.JarFactory import make_fabric_jar, make_mods_dir
+from data import load_mods
+from data.mod import IconCache as IconCacheModule
+
+
+def measure(fun) -> tuple[float, int]:
+    """返回 (用时秒数, fun 返回的对象仍然占用的 python 内存字节数)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fun()
+    used = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return used, current
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    icon_size = int(sys.argv[2]) if len(sys.argv) > 2 else 128
+    with tempfile.TemporaryDirectory() as root_dir:
+        make_mods_dir(root_dir, count, 20, icon_size=icon_size)
+
+        def eager():
+            # 旧方式：每个 ModInfo 都带着图标的 bytes
+            IconCacheModule.icon_cache = IconCacheModule.IconCache(max_bytes=1 << 62)
+            mods = load_mods(root_dir, workers=1, use_cache=False)
+            return mods, [mod.get_icon() for mod in mods]
+
+        def lazy():
+            IconCacheModule.icon_cache = IconCacheModule.IconCache(max_bytes=1 << 20)
+            return load_mods(root_dir, workers=1, use_cache=False)
+
+        def lazy_show_page():
+            # 按需读取，并且模拟界面上显示了 20 个 mod 的图标
+            mods = lazy()
+            for mod in mods[:20]:
+                mod.get_icon()
+            return mods
+
+        print(f"{count} 个 mod，图标 {icon_size}x{icon_size}")
+        for name, fun in (('扫描时读取全部图标', eager), ('按需读取', lazy), ('按需读取并显示 20 个', lazy_show_page)):
+            used, retained = measure(fun)
+            print(f"  {name:<14} {used:7.3f}s  常驻内存 {retained / 1024 / 1024:7.2f} MB")
+
+        # jar 被原地替换（同名、内容不同）后重新读取图标，而不是继续使用缓存的旧图标
+        mod = lazy()[0]
+        old_icon = mod.get_icon()
+        make_fabric_jar(mod.full_file_path, 'bench_mod_0', 20, seed=count, icon_size=icon_size)
+        new_icon = mod.get_icon()
+        assert new_icon and new_icon != old_icon
+        print("  jar 被替换后读取到了新的图标")
+
+
+if __name__ == '__main__':
+    main()
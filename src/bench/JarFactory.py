@@ -0,0 +1,316 @@
+"""生成用于性能测试的假 mod jar 文件
+"""
+import io
+import json
+import os
+import random
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+
+def make_class_bytes(rnd: random.Random, size: int = 2048) -> bytes:
+    """生成一段看起来像 class 文件的数据，有一定的可压缩性"""
+    words = [b'java/lang/Object', b'net/minecraft/', b'Code', b'LineNumberTable',
+             bytes(rnd.getrandbits(8) for _ in range(16))]
+    buf = bytearray(b'\xca\xfe\xba\xbe')
+    while len(buf) < size:
+        buf += rnd.choice(words)
+    return bytes(buf[:size])
+
+
+def make_icon_bytes(rnd: random.Random, size: int) -> bytes:
+    """生成一个 size x size 的 png 图标，内容是随机噪点，和真实图标一样基本压缩不了"""
+    from PIL import Image
+    img = Image.frombytes('RGBA', (size, size),
+                          bytes(rnd.getrandbits(8) for _ in range(size * size * 4)))
+    buf = io.BytesIO()
+    img.save(buf, 'png')
+    return buf.getvalue()
+
+
+def fabric_jar_bytes(mod_id: str, class_count: int = 200, seed: int = 0,
+                     nested: list[tuple[str, bytes]] | None = None,
+                     nested_compress_type: int = ZIP_STORED,
+                     icon_size: int = 0,
+                     depends: dict[str, str] | None = None) -> bytes:
+    """生成一个 fabric mod jar 文件的内容
+
+    Args:
+        mod_id: mod id
+        class_count: jar 中 class 文件的数量
+        seed: 随机种子，相同的参数总能生成相同的文件
+        nested: 要放进 META-INF/jars 的子 jar，(文件名, 内容)
+        nested_compress_type: 子 jar 的压缩方式，fabric 的构建工具默认不压缩子 jar
+        icon_size: 图标的边长，0 表示没有图标
+        depends: 额外的前置 mod，mod id -> 版本范围
+    """
+    rnd = random.Random(seed)
+    nested = nested or []
+    meta = {
+        'schemaVersion': 1,
+        'id': mod_id,
+        'name': mod_id.capitalize(),
+        'version': f'1.{rnd.randint(0, 20)}.{rnd.randint(0, 9)}',
+        'description': f'这是用于性能测试的 mod {mod_id}',
+        'authors': ['bench'],
+        'depends': {'fabricloader': '>=0.14.0', 'minecraft': '1.19.x', **(depends or {})},
+        'jars': [{'file': f'META-INF/jars/{name}'} for name, _ in nested],
+    }
+    if icon_size:
+        meta['icon'] = f'assets/{mod_id}/icon.png'
+    buf = io.BytesIO()
+    with ZipFile(buf, 'w', ZIP_DEFLATED) as jar:
+        jar.writestr('fabric.mod.json', json.dumps(meta))
+        for i in range(class_count):
+            jar.writestr(f'{mod_id}/pkg{i % 16}/Class{i}.class',
+                         make_class_bytes(rnd))
+        if icon_size:
+            jar.writestr(meta['icon'], make_icon_bytes(rnd, icon_size))
+        for name, data in nested:
+            jar.writestr(f'META-INF/jars/{name}', data,
+                         compress_type=nested_compress_type)
+    return buf.getvalue()
+
+
+def make_fabric_jar(file_path: str, mod_id: str, class_count: int = 200, seed: int = 0,
+                    nested: list[tuple[str, bytes]] | None = None, icon_size: int = 0,
+                    depends: dict[str, str] | None = None) -> str:
+    """生成一个 fabric mod jar 文件，参数参考 fabric_jar_bytes
+    """
+    with open(file_path, 'wb') as f:
+        f.write(fabric_jar_bytes(mod_id, class_count, seed, nested, icon_size=icon_size,
+                                 depends=depends))
+    return file_path
+
+
+def make_fabric_api_jar(file_path: str, module_count: int = 40, module_class_count: int = 400,
+                        nested_compress_type: int = ZIP_STORED) -> str:
+    """生成一个和 fabric-api 差不多大的 jar 文件：外层几乎是空的，里面嵌套了很多模块 jar
+    """
+    modules = [(f'fabric-module-{i}.jar',
+                fabric_jar_bytes(f'fabric_module_{i}', module_class_count, seed=i))
+               for i in range(module_count)]
+    with open(file_path, 'wb') as f:
+        f.write(fabric_jar_bytes('fabric_api', 4, nested=modules,
+                                 nested_compress_type=nested_compress_type))
+    return file_path
+
+
+def make_mods_dir(root_dir: str, count: int, class_count: int = 200,
+                  shared_libs: int = 0, icon_size: int = 0, own_libs: int = 0) -> list[str]:
+    """在一个目录中生成 count 个 fabric mod，返回文件路径们
+
+    Args:
+        shared_libs: 每个 mod 都内嵌的相同的库 jar 的数量，用来模拟整合包里重复出现的 cloth-config 之类的库
+        icon_size: 每个 mod 的图标边长，0 表示没有图标
+        own_libs: 每个 mod 各自内嵌的不同的库 jar 的数量
+    """
+    os.makedirs(root_dir, exist_ok=True)
+    libs = [(f'bench-lib-{i}.jar', fabric_jar_bytes(f'bench_lib_{i}', class_count, seed=-1 - i))
+            for i in range(shared_libs)]
+    result = []
+    for i in range(count):
+        own = [(f'bench-mod-{i}-lib-{j}.jar',
+                fabric_jar_bytes(f'bench_mod_{i}_lib_{j}', class_count, seed=count + i * own_libs + j))
+               for j in range(own_libs)]
+        result.append(make_fabric_jar(os.path.join(root_dir, f'bench_mod_{i}.jar'),
+                                      f'bench_mod_{i}', class_count, seed=i, nested=libs + own,
+                                      icon_size=icon_size))
+    return result
+
+
+def make_game_dir(versions_dir: str, name: str, mc_version: str = '1.19.2',
+                  main_class: str = 'net.fabricmc.loader.impl.launch.knot.KnotClient') -> str:
+    """在 versions 目录下生成一个游戏版本目录（只有版本 json 和空的 mods 目录），返回游戏目录
+    """
+    game_dir = os.path.join(versions_dir, name)
+    os.makedirs(os.path.join(game_dir, 'mods'), exist_ok=True)
+    with open(os.path.join(game_dir, name + '.json'), 'w', encoding='utf-8') as f:
+        json.dump({'id': name, 'mainClass': main_class, 'clientVersion': mc_version}, f)
+    return game_dir
+
+
+LOADERS = ('fabric', 'forge', 'quilt')
+
+
+def _mod_meta(loader: str, mod_id: str, version: str, icon: str | None,
+              nested: list[str], depends: dict[str, str]) -> tuple[str, str]:
+    """生成 mod 信息文件，返回 (文件名, 内容)"""
+    if loader == 'forge':
+        lines = ['modLoader="javafml"', 'loaderVersion="[41,)"', 'license="MIT"', '[[mods]]',
+                 f'modId="{mod_id}"', f'version="{version}"', f'displayName="{mod_id.capitalize()}"',
+                 f"description='''这是用于性能测试的 mod {mod_id}'''", 'authors="bench"']
+        if icon:
+            lines.append(f'logoFile="{icon}"')
+        deps = {'forge': '[41,)', 'minecraft': '[1.19.2,1.20)', **depends}
+        for dep_id, version_range in deps.items():
+            lines += [f'[[dependencies.{mod_id}]]', f'modId="{dep_id}"', 'mandatory=true',
+                      f'versionRange="{version_range}"', 'ordering="NONE"', 'side="BOTH"']
+        return 'META-INF/mods.toml', '\n'.join(lines) + '\n'
+    if loader == 'quilt':
+        meta: dict = {
+            'schema_version': 1,
+            'quilt_loader': {
+                'group': 'bench', 'id': mod_id, 'version': version,
+                'metadata': {'name': mod_id.capitalize(),
+                             'description': f'这是用于性能测试的 mod {mod_id}',
+                             'contributors': {'bench': 'Owner'}},
+                'depends': [{'id': 'quilt_loader', 'versions': '>=0.17.0'},
+                            {'id': 'minecraft', 'versions': '1.19.x'},
+                            *({'id': k, 'versions': v} for k, v in depends.items())],
+                'jars': nested,
+            },
+        }
+        if icon:
+            meta['quilt_loader']['metadata']['icon'] = icon
+        return 'quilt.mod.json', json.dumps(meta)
+    meta = {
+        'schemaVersion': 1, 'id': mod_id, 'name': mod_id.capitalize(), 'version': version,
+        'description': f'这是用于性能测试的 mod {mod_id}', 'authors': ['bench'],
+        'depends': {'fabricloader': '>=0.14.0', 'minecraft': '1.19.x', **depends},
+        'jars': [{'file': name} for name in nested],
+    }
+    if icon:
+        meta['icon'] = icon
+    return 'fabric.mod.json', json.dumps(meta)
+
+
+def _break_meta(loader: str, text: str, rnd: random.Random) -> str:
+    """把 mod 信息弄坏：截断、语法错误或者缺少关键字段"""
+    kind = rnd.randrange(3)
+    if kind == 0:
+        return text[:len(text) // 2]
+    if kind == 1:
+        return text.replace('"', "'", 3) if loader != 'forge' else text.replace('=', ' ', 2)
+    if loader == 'forge':
+        return text.replace('[[mods]]', '[[not_mods]]')
+    if loader == 'quilt':
+        return text.replace('"metadata"', '"meta"')
+    return '{"schemaVersion": 1}'
+
+
+def mod_jar_bytes(loader: str, mod_id: str, class_count: int = 20, seed: int = 0,
+                  icon_size: int = 0, depends: dict[str, str] | None = None,
+                  nested_depth: int = 0, fan_out: int = 0, malformed: bool = False) -> bytes:
+    """生成一个 fabric、forge 或 quilt mod jar 文件的内容
+
+    Args:
+        loader: 'fabric'、'forge' 或 'quilt'
+        mod_id: mod id
+        class_count: jar 中 class 文件的数量
+        seed: 随机种子，相同的参数总能生成相同的文件
+        icon_size: 图标的边长，0 表示没有图标
+        depends: 额外的前置 mod，mod id -> 版本范围（forge 使用 maven 格式）
+        nested_depth: 子 jar 嵌套的层数，forge 的解析器不读取子 jar，所以 forge mod 总是没有子 jar
+        fan_out: 每一层 jar 中子 jar 的数量
+        malformed: 是否生成损坏的 mod 信息
+    """
+    rnd = random.Random(seed)
+    version = f'1.{rnd.randint(0, 20)}.{rnd.randint(0, 9)}'
+    nested: list[tuple[str, bytes]] = []
+    if nested_depth > 0 and loader != 'forge':
+        for i in range(fan_out):
+            child_id = f'{mod_id}_c{i}'
+            nested.append((f'META-INF/jars/{child_id}.jar',
+                           mod_jar_bytes(loader, child_id, max(class_count // 4, 1),
+                                         seed * 31 + i + 1, nested_depth=nested_depth - 1,
+                                         fan_out=fan_out)))
+    icon = f'assets/{mod_id}/icon.png' if icon_size else None
+    meta_name, meta = _mod_meta(loader, mod_id, version, icon, [n for n, _ in nested], depends or {})
+    if malformed:
+        meta = _break_meta(loader, meta, rnd)
+    buf = io.BytesIO()
+    with ZipFile(buf, 'w', ZIP_DEFLATED) as jar:
+        jar.writestr(meta_name, meta)
+        if loader == 'forge':
+            jar.writestr('META-INF/MANIFEST.MF',
+                         f'Manifest-Version: 1.0\nImplementation-Title: {mod_id}\n'
+                         f'Implementation-Version: {version}\n')
+        for i in range(class_count):
+            jar.writestr(f'{mod_id}/pkg{i % 16}/Class{i}.class', make_class_bytes(rnd, 512))
+        if icon:
+            jar.writestr(icon, make_icon_bytes(rnd, icon_size))
+        for name, data in nested:
+            jar.writestr(name, data, compress_type=ZIP_STORED)
+    return buf.getvalue()
+
+
+def make_mixed_mods_dir(root_dir: str, count: int, seed: int = 0, class_count: int = 20,
+                        icon_size: int = 0, nested_depth: int = 0, fan_out: int = 0,
+                        malformed_ratio: float = 0.0, depend_ratio: float = 0.3,
+                        loaders: tuple[str, ...] = LOADERS) -> list[str]:
+    """在一个目录中生成 count 个随机加载器的 mod，返回文件路径们。
+    相同的参数总能生成相同的目录。
+
+    Args:
+        malformed_ratio: 损坏的 mod 的比例，其中一小部分连 zip 格式都是坏的
+        depend_ratio: 依赖前面某个 mod 的 mod 的比例，依赖的 mod 偶尔不存在或者版本不满足，用来测试 mod 检查
+        其它参数参考 mod_jar_bytes
+    """
+    os.makedirs(root_dir, exist_ok=True)
+    rnd = random.Random(seed)
+    result = []
+    for i in range(count):
+        loader = loaders[i % len(loaders)]
+        mod_id = f'bench_{loader}_{i}'
+        file_path = os.path.join(root_dir, f'{mod_id}.jar')
+        malformed = rnd.random() < malformed_ratio
+        if malformed and rnd.random() < 0.2:
+            with open(file_path, 'wb') as f:
+                f.write(b'PK\x03\x04' + bytes(rnd.getrandbits(8) for _ in range(256)))
+            result.append(file_path)
+            continue
+        depends: dict[str, str] = {}
+        if i and rnd.random() < depend_ratio:
+            target = rnd.randrange(i)
+            target_loader = loaders[target % len(loaders)]
+            target_id = f'bench_{target_loader}_{target}' if rnd.random() < 0.9 else f'missing_{i}'
+            if loader == 'forge':
+                depends[target_id] = '[1.0,)' if rnd.random() < 0.9 else '[99,)'
+            else:
+                depends[target_id] = '>=1.0.0' if rnd.random() < 0.9 else '>=99'
+        with open(file_path, 'wb') as f:
+            f.write(mod_jar_bytes(loader, mod_id, class_count, seed=seed * 100003 + i,
+                                  icon_size=icon_size, depends=depends,
+                                  nested_depth=nested_depth, fan_out=fan_out, malformed=malformed))
+        result.append(file_path)
+    return result
+
+
+_MAIN_CLASSES = {
+    'fabric': 'net.fabricmc.loader.impl.launch.knot.KnotClient',
+    'forge': 'cpw.mods.modlauncher.Launcher',
+    'vanilla': 'net.minecraft.client.main.Main',
+    'other': 'org.example.Main',
+}
+
+
+def make_versions_dir(versions_dir: str, count: int, seed: int = 0, mods_per_game: int = 0,
+                      **mods_kwargs) -> list[str]:
+    """生成一个 .minecraft/versions 目录，包含 count 个不同类型的游戏版本，返回游戏目录们。
+    版本 json 有的直接写 clientVersion，有的只在 patches 中写游戏版本，也有少数损坏的目录（没有 json）。
+
+    Args:
+        mods_per_game: 每个游戏的 mods 目录中生成多少个 mod，参数 mods_kwargs 参考 make_mixed_mods_dir
+    """
+    rnd = random.Random(seed)
+    result = []
+    for i in range(count):
+        game_type = list(_MAIN_CLASSES)[i % len(_MAIN_CLASSES)]
+        name = f'1.19.{i % 5}-{game_type}-{i}'
+        game_dir = os.path.join(versions_dir, name)
+        os.makedirs(os.path.join(game_dir, 'mods'), exist_ok=True)
+        if rnd.random() >= 0.05:
+            root: dict = {'id': name, 'mainClass': _MAIN_CLASSES[game_type],
+                          'libraries': [{'name': f'lib:{j}:1.0'} for j in range(rnd.randint(20, 80))]}
+            if rnd.random() < 0.5:
+                root['clientVersion'] = f'1.19.{i % 5}'
+            else:
+                root['patches'] = [{'id': 'game', 'version': f'1.19.{i % 5}'},
+                                   {'id': game_type, 'version': '1.0'}]
+            with open(os.path.join(game_dir, name + '.json'), 'w', encoding='utf-8') as f:
+                json.dump(root, f)
+        if mods_per_game:
+            make_mixed_mods_dir(os.path.join(game_dir, 'mods'), mods_per_game,
+                                seed=seed * 7919 + i, **mods_kwargs)
+        result.append(game_dir)
+    return result
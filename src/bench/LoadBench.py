@@ -0,0 +1,133 @@
+"""对比在界面线程中同步加载与后台加载时，界面每一帧最长被卡住多久
+
+模拟一个每帧渲染 1/60 秒的界面循环：同步加载时整个扫描都发生在一帧之内；
+后台加载时每帧只在 frame_budget_ms 内取出结果，并模拟每显示一个 mod 需要的界面开销。
+最后测量加载到一半时取消任务，后台线程多久之后停止，并检查加载到一半时出错不会把不完整的结果当成 mod 列表。
+
+    python -m bench.LoadBench [mod 数量] [每帧预算毫秒]
+"""
+import os
+import sys
+import tempfile
+import time
+from functools import partial
+
+import data
+from bench.JarFactory import make_mods_dir
+from data import ModManager, iter_mods, load_mods
+from data.LoadTask import LoadTask
+from data.mod.ModCache import ModCache
+from data.Settings import settings
+
+FRAME = 1 / 60
+ADD_COST = 0.0002
+"""模拟 ModList.add 的开销"""
+
+
+def on_add(_):
+    end = time.perf_counter() + ADD_COST
+    while time.perf_counter() < end:
+        pass
+
+
+def run_sync(root_dir: str) -> tuple[float, float]:
+    start = time.perf_counter()
+    load_mods(root_dir, on_add, workers=1, use_cache=False, quick=True)
+    used = time.perf_counter() - start
+    return used, used
+
+
+def run_background(root_dir: str, budget: float, workers: int) -> tuple[float, float, int]:
+    """返回 (最长一帧的耗时, 全部加载完的用时, 帧数)。
+    只用一个进程时解析发生在后台线程中，会和界面线程争抢 GIL，一帧可能超出预算
+    """
+    task = LoadTask(partial(iter_mods, root_dir, workers, False, True), on_add).start()
+    start = time.perf_counter()
+    worst = 0.0
+    frames = 0
+    while True:
+        frame_start = time.perf_counter()
+        finished = task.drain(frame_start + budget)
+        worst = max(worst, time.perf_counter() - frame_start)
+        frames += 1
+        if finished:
+            break
+        time.sleep(FRAME)
+    return worst, time.perf_counter() - start, frames
+
+
+def run_cancel(root_dir: str, count: int) -> tuple[float, int]:
+    """加载到一半时取消，返回 (后台线程停止的用时, 取消后界面收到的 mod 数量)"""
+    loaded = 0
+
+    def on_one(_):
+        nonlocal loaded
+        loaded += 1
+
+    task = LoadTask(partial(iter_mods, root_dir, 1, False, True), on_one).start()
+    while loaded < count // 2:
+        task.drain()
+        time.sleep(0.001)
+    start = time.perf_counter()
+    task.cancel()
+    assert task._thread is not None
+    task._thread.join()
+    stopped = time.perf_counter() - start
+    before = loaded
+    task.drain()
+    return stopped, loaded - before
+
+
+def run_fail(root_dir: str, count: int) -> int:
+    """扫描到一半时出错（例如进程池崩溃、目录被删除），返回出错前写入 mod 缓存的文件数量。
+    后台加载应当失败：不调用 on_load_over，local_mods 保持原来的列表
+    """
+    scan = data.scan_mod_files
+
+    def failing_scan(*args, **kwargs):
+        for i, mod in enumerate(scan(*args, **kwargs)):
+            if i == count // 2:
+                raise OSError('模拟扫描出错')
+            yield mod
+
+    old_settings = settings.local_mods_dir, settings.mod_cache_file
+    manager = ModManager.get()
+    old_mods = manager.local_mods = []
+    over: list[list] = []
+    failed: list[Exception] = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        settings.local_mods_dir = root_dir
+        settings.mod_cache_file = os.path.join(cache_dir, 'mod_cache.pkl')
+        data.scan_mod_files = failing_scan
+        try:
+            task = manager.reload_local_mods(on_load_over=over.append, workers=1, quick=True,
+                                             background=True, on_load_failed=failed.append)
+            assert task is not None
+            task.wait()
+        finally:
+            data.scan_mod_files = scan
+            settings.local_mods_dir, settings.mod_cache_file = old_settings
+        assert task.finished and task.failed and len(task.loaded) == count // 2
+        assert not over and len(failed) == 1 and manager.local_mods is old_mods, over
+        return len(ModCache(os.path.join(cache_dir, 'mod_cache.pkl')).entries)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    budget = (int(sys.argv[2]) if len(sys.argv) > 2 else 8) / 1000
+    with tempfile.TemporaryDirectory() as root_dir:
+        make_mods_dir(root_dir, count, 20, own_libs=1)
+        print(f"{count} 个 mod，每帧预算 {budget * 1000:.0f}ms")
+        worst, total = run_sync(root_dir)
+        print(f"  同步加载    最长一帧 {worst * 1000:7.1f}ms  全部 {total:6.3f}s")
+        for name, workers in (('后台单进程', 1), ('后台进程池', 0)):
+            worst, total, frames = run_background(root_dir, budget, workers)
+            print(f"  {name}  最长一帧 {worst * 1000:7.1f}ms  全部 {total:6.3f}s  共 {frames} 帧")
+        stopped, after = run_cancel(root_dir, count)
+        print(f"  加载一半时取消，后台线程 {stopped * 1000:.1f}ms 后停止，取消后界面收到 {after} 个 mod")
+        cached = run_fail(root_dir, count)
+        print(f"  加载一半时出错，保持原来的列表，出错前解析的 {cached} 个 mod 写入了缓存")
+
+
+if __name__ == '__main__':
+    main()
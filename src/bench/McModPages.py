@@ -0,0 +1,83 @@
+"""生成和 mcmod.cn mod 列表页结构相同的假页面，供 http 缓存和页面解析的性能测试使用
+
+每页除了 mod 列表之外还带有和真实页面差不多大小的导航、脚本和页脚，
+每个 mod 的 id 由页码和序号决定，所以不同的页之间不会重复（除非 overlap 不为 0）。
+"""
+import random
+from urllib.parse import parse_qs, urlsplit
+
+from bench.HttpServer import LocalServer
+
+LOADER_NAMES = ['Forge', 'Fabric', 'Quilt']
+MC_VERSIONS = ['1.20.1', '1.19.4', '1.19.2', '1.18.2', '1.16.5', '1.12.2', '1.7.10']
+
+
+def mod_block(rnd: random.Random, mod_id: int) -> str:
+    loaders = rnd.sample(LOADER_NAMES, rnd.randint(1, 2))
+    mc_version = ''.join(
+        f'<li>{loader}:</li>' + ''.join(
+            f'<li><a href="/modlist.html?mcver={v}" target="_blank">{v}</a></li>'
+            for v in sorted(rnd.sample(MC_VERSIONS, rnd.randint(1, 4)), key=MC_VERSIONS.index))
+        for loader in loaders)
+    return f'''
+<div class="modlist-block">
+  <div class="cover"><a href="/class/{mod_id}.html" target="_blank"><img src="//i.mcmod.cn/class/cover/{mod_id}.jpg@480x300.jpg" alt="cover"></a></div>
+  <div class="title">
+    <p class="name"><a href="/class/{mod_id}.html" target="_blank">测试模组 {mod_id} &amp; Friends</a></p>
+    <p class="ename">Bench Mod {mod_id}</p>
+  </div>
+  <div class="info">
+    <div class="mcver"><ul>{mc_version}</ul></div>
+    <div class="category"><a href="/modlist.html?category={rnd.randint(1, 20)}"><i class="common-icon-category"></i>科技</a></div>
+    <p class="intro">这是一段用来占位的简介，{"很长" * rnd.randint(5, 40)}。</p>
+  </div>
+</div>'''
+
+
+def listing_page(page: int, per_page: int = 30, seed: int = 0, overlap: int = 0,
+                 padding: int = 40) -> str:
+    """生成第 page 页
+
+    Args:
+        per_page: 每页的 mod 数量
+        overlap: 和上一页重复的 mod 数量，模拟翻页时列表发生了变化
+        padding: 页头页脚中无关内容的数量，越大页面越大
+    """
+    rnd = random.Random(seed * 100003 + page)
+    first = (page - 1) * (per_page - overlap)
+    blocks = ''.join(mod_block(rnd, 1000 + first + i) for i in range(per_page))
+    nav = ''.join(f'<li><a href="/modlist.html?category={i}">分类 {i}</a></li>' for i in range(padding))
+    scripts = ''.join(f'<script>var _t{i} = "{"x" * 80}";</script>' for i in range(padding))
+    return f'''<!DOCTYPE html>
+<html lang="zh-CN"><head><meta charset="utf-8"><title>MC百科 模组列表 第 {page} 页</title>{scripts}</head>
+<body><div class="header"><ul class="nav">{nav}</ul></div>
+<div class="modlist-list-frame">{blocks}</div>
+<div class="pagination"><a href="/modlist.html?page={page + 1}">下一页</a></div>
+<div class="footer">{'<p>页脚</p>' * padding}</div></body></html>'''
+
+
+class ListingSite(object):
+    """在本地服务器上提供列表页，修改 seed 会让全部页面的内容和 ETag 都发生变化
+    """
+
+    def __init__(self, server: LocalServer, path: str = '/modlist.html', per_page: int = 30,
+                 seed: int = 0, max_page: int = 100, **page_kwargs) -> None:
+        self.url: str = server.url(path)
+        self.per_page: int = per_page
+        self.seed: int = seed
+        self.max_page: int = max_page
+        self.page_kwargs = page_kwargs
+        """传给 listing_page 的其它参数"""
+        self.requests: dict[str, int] = {}
+        """页码 -> 请求次数"""
+        server.routes[path] = self.handle
+
+    def handle(self, handler) -> None:
+        query = parse_qs(urlsplit(handler.path).query)
+        page = query.get('page', ['1'])[0]
+        self.requests[page] = self.requests.get(page, 0) + 1
+        if page.isdigit() and 1 <= int(page) <= self.max_page:
+            html = listing_page(int(page), self.per_page, self.seed, **self.page_kwargs)
+        else:
+            html = listing_page(1, 0, self.seed)
+        handler.send_file(html.encode('utf-8'))
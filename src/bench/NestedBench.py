@@ -0,0 +1,60 @@
+"""对比两种解析子 jar 的方式的内存和时间：
+把子 jar 整个读成 bytes 再包一层 BytesIO（旧方式），以及直接在外层文件的 mmap 上打开（当前方式）
+
+    python -m bench.NestedBench [模块数量] [每个模块的 class 数量]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+from bench.JarFactory import make_fabric_api_jar
+from data.mod import JarView
+from data.mod.ModFile import ModFile
+
+
+def _copy_nested_jar(jar: ZipFile, name: str) -> BytesIO:
+    return BytesIO(jar.read(name))
+
+
+def create_by_copy(jar_path: str) -> ModFile:
+    """旧的解析方式：外层文件和每个子 jar 都完整读入内存后再解析"""
+    origin = JarView.open_nested_jar
+    JarView.open_nested_jar = _copy_nested_jar  # type: ignore
+    try:
+        with open(jar_path, 'rb') as f:
+            return ModFile.create_by_bytes(BytesIO(f.read()), jar_path)
+    finally:
+        JarView.open_nested_jar = origin
+
+
+def measure(fun, *args) -> tuple[float, int]:
+    """返回 (用时秒数, python 分配内存的峰值字节数)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    fun(*args)
+    used = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return used, peak
+
+
+def main():
+    module_count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    class_count = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    with tempfile.TemporaryDirectory() as root_dir:
+        for label, compress_type in (('stored', ZIP_STORED), ('deflated', ZIP_DEFLATED)):
+            jar_path = make_fabric_api_jar(os.path.join(root_dir, f'fabric-api-{label}.jar'),
+                                           module_count, class_count, compress_type)
+            size = os.path.getsize(jar_path)
+            print(f"子 jar {label}，{module_count} 个模块，文件大小 {size / 1024 / 1024:.1f} MB")
+            for name, fun in (('读入 bytes', create_by_copy), ('mmap 视图', ModFile.create)):
+                used, peak = measure(fun, jar_path)
+                print(f"  {name:<10} {used:7.3f}s  内存峰值 {peak / 1024 / 1024:7.2f} MB")
+
+
+if __name__ == '__main__':
+    main()
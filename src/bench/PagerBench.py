@@ -0,0 +1,115 @@
+"""对比翻页浏览 mcmod 搜索结果时不预取和预取后面几页的等待时间，并检查去重、保留页数的上限、
+修改搜索条件时取消请求、到达最后一页和请求失败的情况
+
+    python -m bench.PagerBench [翻页次数] [每个请求的延迟毫秒] [每页停留的毫秒]
+
+使用本地服务器提供的假列表页（参考 bench.McModPages），相邻的页之间有重复的 mod。
+"""
+import sys
+import tempfile
+import time
+
+from bench.HttpServer import LocalServer
+from bench.McModPages import ListingSite
+from data.Settings import settings
+from download.DownloadManager import close_download_manager
+from download.HttpCache import get_http_cache
+from download.McMod import McModSearchFilter
+from download.SearchPager import SearchPager
+from download.WebMod import WebMod
+
+
+def browse(pager: SearchPager, flips: int, read_time: float) -> tuple[float, list[list[WebMod]]]:
+    """从第一页开始翻 flips 次页，每页停留 read_time 秒，返回 (等待页面的总时间, 每页的结果)"""
+    waited = 0.0
+    pages = []
+    for page in range(1, flips + 2):
+        start = time.perf_counter()
+        if pager.goto(page) is None:
+            pager.wait(page, timeout=30)
+        waited += time.perf_counter() - start
+        mods = pager.get(page)
+        assert mods is not None, f"第 {page} 页没有结果"
+        pages.append(mods)
+        time.sleep(read_time)
+    return waited, pages
+
+
+def main():
+    flips = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 200) / 1000
+    read_time = (int(sys.argv[3]) if len(sys.argv) > 3 else 300) / 1000
+    overlap = 3
+    old_settings = settings.http_cache_dir
+    filter = McModSearchFilter(mc_version='1.19.2', sort='lastedittime')
+    with tempfile.TemporaryDirectory() as cache_dir, LocalServer(latency=latency) as server:
+        settings.http_cache_dir = cache_dir
+        site = ListingSite(server, overlap=overlap)
+        cache = get_http_cache()
+        print(f"翻 {flips} 次页，每个请求延迟 {latency * 1000:.0f}ms，每页停留 {read_time * 1000:.0f}ms，"
+              f"相邻的页有 {overlap} 个重复的 mod")
+
+        results = []
+        for prefetch in (0, 1, 2, 4):
+            cache.clear()
+            server.reset_stats()
+            pager = SearchPager(filter, prefetch=prefetch, window=4, url=site.url)
+            waited, pages = browse(pager, flips, read_time)
+            pager.close()
+            assert len(pager.retained()) <= pager.window, pager.retained()
+            print(f"  预取 {prefetch} 页  等待 {waited * 1000:7.1f}ms  请求 {server.requests:3d}  "
+                  f"最后保留 {pager.retained()}")
+            results.append(pages)
+
+        # 每个 mod 只出现一次，并且结果和预取的页数无关
+        ids = [mod.mod_id for page in results[0] for mod in page]
+        assert len(ids) == len(set(ids)) == (flips + 1) * site.per_page - flips * overlap, len(ids)
+        assert all(i == results[0] for i in results)
+        print(f"  去重后 {len(ids)} 个 mod")
+
+        # 修改搜索条件时没有完成的请求被取消，结果不会交给 on_page
+        cache.clear()
+        delivered: list[int] = []
+        pager = SearchPager(filter, prefetch=2, url=site.url,
+                            on_page=lambda page, mods: delivered.append(page))
+        pager.goto(1)
+        old_requests = list(pager._requests.values())
+        pager.set_filter(McModSearchFilter(mc_version='1.19.2', sort='createtime'))
+        assert all(i.cancel for i in old_requests) and len(old_requests) == 3
+        pager.wait(3, timeout=30)
+        time.sleep(latency * 2)
+        pager.poll()
+        assert sorted(delivered) == [1, 2, 3], delivered
+        print(f"  修改搜索条件后只收到新条件的 {len(delivered)} 页")
+        pager.close()
+
+        # 到达最后一页后不再请求更后面的页
+        cache.clear()
+        site.max_page = 3
+        pager = SearchPager(filter, prefetch=2, url=site.url)
+        for page in range(1, 5):
+            pager.goto(page)
+            pager.wait(page, timeout=30)
+        assert pager.last_page == 3 and not pager.has_next() and not pager.pending()
+        print(f"  最后一页是 {pager.last_page}")
+        pager.close()
+
+        # 请求失败时交给 on_page 的结果是 None，再次打开时重试
+        cache.clear()
+        site.max_page = 100
+        failures: list[int] = []
+        server.routes['/missing.html'] = lambda handler: handler.send_error(404)
+        pager = SearchPager(filter, prefetch=0, url=server.url('/missing.html'),
+                            on_page=lambda page, mods: mods is None and failures.append(page))
+        pager.goto(1)
+        assert pager.wait(1, timeout=30) is None
+        pager.poll()
+        assert failures == [1]
+        pager.close()
+        print("  请求失败时得到 None")
+        close_download_manager()
+    settings.http_cache_dir = old_settings
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""对比流式解析（parse_search_page）和 BeautifulSoup（parse_search_page_soup）解析 mod 列表页的用时和内存，
+并检查两者在 bench/fixtures 中保存的页面和生成的页面上结果相同
+
+    python -m bench.ParseBench [页数] [每页 mod 数量]
+"""
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+from bench.McModPages import listing_page
+from download.McMod import parse_search_page, parse_search_page_soup
+from download.WebMod import WebMod
+
+FIXTURES_DIR: str = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def measure(parse: Callable[[str], list[WebMod]], pages: list[str]) -> tuple[float, int]:
+    """返回 (解析全部页面的用时, 解析一页时的内存峰值)"""
+    start = time.perf_counter()
+    for page in pages:
+        parse(page)
+    used = time.perf_counter() - start
+    tracemalloc.start()
+    parse(pages[0])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return used, peak
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    per_page = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+            source = f.read()
+        mods = parse_search_page(source)
+        assert mods == parse_search_page_soup(source), name
+        assert mods and all(mod.name or mod.loader for mod in mods), name
+        print(f"{name}: {len(mods)} 个 mod，结果相同")
+
+    sources = [listing_page(page, per_page, seed=1) for page in range(1, pages + 1)]
+    for source in sources[:5]:
+        assert parse_search_page(source) == parse_search_page_soup(source)
+    size = sum(len(i.encode('utf-8')) for i in sources)
+    print(f"{pages} 页，每页 {per_page} 个 mod，共 {size / 1024:.0f}KB")
+    stream_used, stream_peak = measure(parse_search_page, sources)
+    soup_used, soup_peak = measure(parse_search_page_soup, sources)
+    print(f"  BeautifulSoup  {soup_used * 1000 / pages:7.2f}ms/页  内存峰值 {soup_peak / 1024:7.1f}KB")
+    print(f"  流式解析       {stream_used * 1000 / pages:7.2f}ms/页  内存峰值 {stream_peak / 1024:7.1f}KB")
+    print(f"  快 {soup_used / stream_used:.1f} 倍")
+
+
+if __name__ == '__main__':
+    main()
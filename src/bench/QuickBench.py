@@ -0,0 +1,73 @@
+"""对比完整解析与快速解析时 mod 列表的首屏时间
+
+首屏时间指从开始扫描到界面拿到前 page 个 mod 的时间，以及扫描完整个目录的时间。
+
+    python -m bench.QuickBench [mod 数量] [每个 mod 内嵌的库数量]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from bench.JarFactory import make_mods_dir
+from data import load_mods
+from data.mod.ModCache import get_mod_cache
+from data.Settings import settings
+
+
+def measure(root_dir: str, quick: bool, page: int = 20) -> tuple[float, float]:
+    """返回 (显示前 page 个 mod 的用时, 全部扫描完的用时)"""
+    first_page = 0.0
+    count = 0
+    start = time.perf_counter()
+
+    def on_load_one(_):
+        nonlocal first_page, count
+        count += 1
+        if count == page:
+            first_page = time.perf_counter() - start
+
+    load_mods(root_dir, on_load_one, workers=1, use_cache=False, quick=quick)
+    return first_page, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    own_libs = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    with tempfile.TemporaryDirectory() as root_dir:
+        make_mods_dir(root_dir, count, 20, own_libs=own_libs)
+        print(f"{count} 个 mod，每个内嵌 {own_libs} 个库")
+        for name, quick in (('完整解析', False), ('快速解析', True)):
+            first_page, total = measure(root_dir, quick)
+            print(f"  {name}  首屏 {first_page:7.3f}s  全部 {total:7.3f}s")
+
+        # 快速解析后按需补全，结果应当与完整解析一致
+        full = load_mods(root_dir, workers=1, use_cache=False)
+        quick = load_mods(root_dir, workers=1, use_cache=False, quick=True)
+        start = time.perf_counter()
+        for a, b in zip(full, quick):
+            for x, y in zip(a.mod_info, b.mod_info):
+                assert x.description == y.description
+                assert [m.get_ids() for m in x.child_mods] == [m.get_ids() for m in y.child_mods]
+        print(f"  按需补全全部 mod  {time.perf_counter() - start:7.3f}s")
+
+        # 补全的结果写回 mod 缓存，保存后再次加载时不需要重新完整解析
+        old_cache_file = settings.mod_cache_file
+        with tempfile.TemporaryDirectory() as cache_dir:
+            settings.mod_cache_file = os.path.join(cache_dir, 'mod_cache.pkl')
+            for mod in load_mods(root_dir, workers=1, quick=True):
+                mod.load_full()
+            cache = get_mod_cache()
+            assert cache is not None
+            cache.save()
+            cache._entries = None
+            start = time.perf_counter()
+            mods = load_mods(root_dir, workers=1, quick=True)
+            used = time.perf_counter() - start
+            assert all(mod.is_full for mod in mods)
+            print(f"  补全的结果写回缓存，再次加载 {used:7.3f}s，{len(mods)} 个 mod 都是完整的")
+        settings.mod_cache_file = old_cache_file
+
+
+if __name__ == '__main__':
+    main()
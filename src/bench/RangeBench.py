@@ -0,0 +1,90 @@
+"""对比大文件整个下载和分段并行下载的用时，并检查中断后续传、校验失败和服务器不支持 Range 的情况
+
+    python -m bench.RangeBench [文件大小 MB] [每个响应的速度 MB/s] [每个请求的延迟毫秒]
+
+本地服务器限制每个响应的传输速度（模拟远程服务器对单个连接的限速）并给每个请求加上延迟。
+"""
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+from bench.HttpServer import LocalServer
+from download.DownloadManager import DownloadJob, DownloadManager, JobState
+
+
+def run(manager: DownloadManager, job: DownloadJob, stop_at: float | None = None) -> float:
+    """等待任务结束，stop_at 不为 None 时在下载了这个比例之后取消，返回用时"""
+    start = time.perf_counter()
+    manager.submit(job)
+    while not job.finished:
+        if stop_at is not None and job.total and job.downloaded >= job.total * stop_at:
+            job.cancel()
+            stop_at = None
+        time.sleep(0.01)
+    return time.perf_counter() - start
+
+
+def main():
+    size = int(float(sys.argv[1] if len(sys.argv) > 1 else 16) * 1024 * 1024)
+    rate = float(sys.argv[2] if len(sys.argv) > 2 else 4) * 1024 * 1024
+    latency = (int(sys.argv[3]) if len(sys.argv) > 3 else 50) / 1000
+    data = random.Random(0).randbytes(size)
+    digest = 'sha256:' + hashlib.sha256(data).hexdigest()
+    print(f"{size / 1024 / 1024:.0f}MB 的文件，每个响应 {rate / 1024 / 1024:.0f}MB/s，延迟 {latency * 1000:.0f}ms")
+
+    with LocalServer({'/pack.zip': data}, latency=latency, rate=rate) as server, \
+            tempfile.TemporaryDirectory() as work_dir:
+        target = os.path.join(work_dir, 'pack.zip')
+        url = server.url('/pack.zip')
+
+        def check() -> None:
+            with open(target, 'rb') as f:
+                assert f.read() == data
+            os.remove(target)
+            assert not [i for i in os.listdir(work_dir) if '.part' in i], os.listdir(work_dir)
+
+        manager = DownloadManager(segments=4)
+        used = run(manager, DownloadJob(url, target, expected_hash=digest))
+        manager.close()
+        check()
+        print(f"  整个下载      {used:6.2f}s")
+
+        for segments in (2, 4, 8):
+            manager = DownloadManager(segments=segments)
+            used = run(manager, DownloadJob(url, target, resumable=True, expected_size=size,
+                                            expected_hash=digest))
+            manager.close()
+            check()
+            # 每段至少 SEGMENT_MIN_SIZE，小文件实际的段数会更少
+            print(f"  最多分 {segments} 段下载  {used:6.2f}s")
+
+        manager = DownloadManager(segments=4)
+        job = DownloadJob(url, target, resumable=True, expected_hash=digest)
+        run(manager, job, stop_at=0.5)
+        assert job.state == JobState.cancelled and os.path.exists(target + '.part.json')
+        server.reset_stats()
+        job = DownloadJob(url, target, resumable=True, expected_hash=digest)
+        used = run(manager, job)
+        assert job.state == JobState.done, job.error
+        check()
+        print(f"  下载一半后取消再续传  {used:6.2f}s  续传时发送了 {server.bytes_sent / size:.0%} 的数据")
+
+        job = DownloadJob(url, target, resumable=True, expected_hash='sha256:' + '0' * 64)
+        run(manager, job)
+        assert job.state == JobState.failed and not os.listdir(work_dir), os.listdir(work_dir)
+        print(f"  哈希值不对时失败：{job.error[:40]}...")
+
+        server.ranges = False
+        job = DownloadJob(url, target, resumable=True, expected_size=size)
+        used = run(manager, job)
+        manager.close()
+        assert job.state == JobState.done, job.error
+        check()
+        print(f"  服务器不支持 Range 时整个下载  {used:6.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""测试 load_mods 在不同进程数下的扫描速度
+
+    python -m bench.ScanBench [mod 数量] [每个 mod 的 class 数量] [每个 mod 内嵌的相同库的数量]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from bench.JarFactory import make_mods_dir
+from data import load_mods
+from data.mod.ModCache import ModCache
+
+
+def bench_scan(root_dir: str, workers: int, repeat: int = 3) -> float:
+    """返回 repeat 次扫描中最快的一次用时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load_mods(root_dir, workers=workers, use_cache=False)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    class_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    shared_libs = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    cpu = os.cpu_count() or 1
+    worker_counts = sorted({1, *[2 ** i for i in range(1, 8) if 2 ** i <= cpu], cpu})
+    with tempfile.TemporaryDirectory() as root_dir:
+        make_mods_dir(root_dir, count, class_count, shared_libs)
+        print(f"{count} 个 mod，每个 {class_count} 个 class，内嵌 {shared_libs} 个相同的库，cpu 核心数 {cpu}")
+        base = 0.0
+        for workers in worker_counts:
+            used = bench_scan(root_dir, workers)
+            base = base or used
+            print(f"workers={workers:<3} {used:8.3f}s  加速比 {base / used:5.2f}x")
+        bench_cache(root_dir)
+
+
+def bench_cache(root_dir: str) -> None:
+    """对比缓存为空和缓存全部命中时的扫描用时"""
+    from data.ModScanner import list_mod_files, scan_mod_files
+    cache = ModCache(os.path.join(root_dir, 'bench_cache.pkl'))
+    for label in ('冷缓存', '热缓存'):
+        cache.stats.reset()
+        start = time.perf_counter()
+        list(scan_mod_files(list_mod_files(root_dir), 1, cache))
+        used = time.perf_counter() - start
+        print(f"{label} {used:8.3f}s  命中 {cache.stats.hits}  未命中 {cache.stats.misses}  "
+              f"子 jar 命中率 {cache.stats.nested_hit_rate:.0%}")
+
+
+if __name__ == '__main__':
+    main()
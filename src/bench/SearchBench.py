@@ -0,0 +1,77 @@
+"""对比逐个调用 ModFile.in_search 与使用搜索索引时，在搜索框中逐字输入关键字的耗时
+
+    python -m bench.SearchBench [mod 数量]
+"""
+import random
+import sys
+import time
+
+from data.SearchIndex import SearchIndex
+from data.mod.ModFile import ModFile
+from data.mod.ModInfo import ModInfo
+
+_WORDS = ('fabric api config library render shader tweak storage magic tech world '
+          'biome mob armor tool food farm energy pipe machine '
+          '矿物 魔法 科技 存储 农业 生物 渲染 优化 装备 世界').split()
+
+
+def make_words(rnd: random.Random, count: int) -> list[str]:
+    """生成一些随机的英文单词"""
+    syllables = ['ka', 'ri', 'mo', 'te', 'lu', 'sa', 'no', 'vi', 'ze', 'po', 'qu', 'an', 'el', 'or']
+    return [''.join(rnd.choice(syllables) for _ in range(rnd.randint(2, 4))) for _ in range(count)]
+
+
+def make_mods(count: int, seed: int = 0) -> list[ModFile]:
+    """在内存中生成带有名字、描述、作者的 mod，不需要 jar 文件。
+    描述主要由随机单词组成，_WORDS 中的常见词只偶尔出现。
+    """
+    rnd = random.Random(seed)
+    filler = make_words(rnd, 3000)
+
+    def word() -> str:
+        return rnd.choice(_WORDS) if rnd.random() < 0.02 else rnd.choice(filler)
+
+    mods = []
+    for i in range(count):
+        words = [rnd.choice(_WORDS) for _ in range(3)]
+        mod = ModFile(full_file_path=f'/mods/bench_{i}.jar', mod_info=[])
+        mod.mod_info.append(ModInfo(
+            file=mod, name=' '.join(w.capitalize() for w in words[:2]) + f' {i}',
+            mod_id=f'{words[0]}_{words[1]}_{i}', version='1.0.0', mc_version='1.19.2',
+            icon=None, loader='fabric',
+            description=' '.join(word() for _ in range(rnd.randint(20, 80))),
+            authors=[f'author{rnd.randrange(200)}'],
+            provide_mods_id=[f'{words[2]}_{i}'] if rnd.random() < 0.1 else []))
+        mods.append(mod)
+    return mods
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    mods = make_mods(count)
+    keystrokes = ['s', 'sh', 'sha', 'shad', 'shade', 'shader', 'shader ', 'shader c',
+                  'shader co', 'shader con', 'shader conf', '魔', '魔法']
+
+    print(f"{count} 个 mod，逐字输入 {keystrokes[-3]!r} 和 {keystrokes[-1]!r}")
+    start = time.perf_counter()
+    linear = [sum(all(mod.in_search(t) for t in k.split()) for mod in mods)
+              for k in keystrokes]
+    print(f"  逐个 in_search  {(time.perf_counter() - start) * 1000:8.2f}ms")
+
+    index = SearchIndex(mods)
+    start = time.perf_counter()
+    index.search('x')
+    print(f"  建立索引        {(time.perf_counter() - start) * 1000:8.2f}ms")
+
+    start = time.perf_counter()
+    indexed = [len(index.match_ids(k) or mods) for k in keystrokes]
+    print(f"  搜索索引        {(time.perf_counter() - start) * 1000:8.2f}ms")
+    for k, a, b in zip(keystrokes, linear, indexed):
+        print(f"    {k!r:<14} {a:5d} {b:5d}")
+
+    top = index.search('shader', limit=3)
+    print(f"  'shader' 排名前三：{[m.get_names()[0] for m in top]}")
+
+
+if __name__ == '__main__':
+    main()
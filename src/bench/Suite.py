@@ -0,0 +1,264 @@
+"""可重复的性能测试套件：生成假的 mod 目录和 versions 目录，在不同的 mod 数量下测量各条热路径
+
+    python -m bench.Suite [--sizes 10,100,1000,10000] [--cases load_mods,search] [--out result.json]
+
+每个用例在一个新的子进程中运行，结果包括总用时、每个文件（或每次操作）的延迟分位数以及子进程的峰值内存，
+以 JSON 格式输出到标准输出或 --out 指定的文件。相同的参数（包括 --seed）总是生成相同的测试数据。
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Callable
+from zipfile import ZipFile
+
+from bench.JarFactory import LOADERS, make_mixed_mods_dir, make_versions_dir
+
+GAME_NAME = 'bench-game'
+KEYSTROKES = ['b', 'be', 'ben', 'benc', 'bench', 'bench ', 'bench f', 'bench fa', 'bench fab',
+              'bench fabr', 'bench fabri', 'bench fabric', 'forge', 'quilt', '性能', '性能测试']
+FILTER_TOGGLES = [('fabric', False), ('version', '1.19.2'), ('forge', False), ('fabric', True),
+                  ('version', '1.20.1'), ('version', ''), ('forge', True), ('other', False),
+                  ('other', True), ('quilt', False), ('quilt', True), ('version', '1.18.2')]
+
+_tResult = tuple[float, list[float]]
+"""(总用时, 每个文件或每次操作的延迟)"""
+
+
+def percentiles(values: list[float]) -> dict[str, float | int]:
+    """计算延迟的分位数（最近秩方法），单位毫秒"""
+    if not values:
+        return {'count': 0}
+    values = sorted(values)
+
+    def rank(p: float) -> float:
+        return values[min(len(values) - 1, max(0, int(p * len(values) + 0.5) - 1))] * 1000
+
+    return {'count': len(values), 'mean': sum(values) / len(values) * 1000,
+            'p50': rank(0.5), 'p90': rank(0.9), 'p99': rank(0.99), 'max': values[-1] * 1000}
+
+
+def _timed_callbacks() -> tuple[Callable, list[float]]:
+    """返回一个记录两次回调之间间隔的回调，单进程加载时间隔就是每个文件的解析用时"""
+    latencies: list[float] = []
+    last = [time.perf_counter()]
+
+    def on_load_one(_):
+        now = time.perf_counter()
+        latencies.append(now - last[0])
+        last[0] = now
+
+    return on_load_one, latencies
+
+
+def mods_dir(data_dir: str) -> str:
+    return os.path.join(data_dir, 'game', 'versions', GAME_NAME, 'mods')
+
+
+def _load(data_dir: str, workers: int, quick: bool) -> _tResult:
+    from data import load_mods
+    on_load_one, latencies = _timed_callbacks()
+    start = time.perf_counter()
+    load_mods(mods_dir(data_dir), on_load_one, workers=workers, use_cache=False, quick=quick)
+    return time.perf_counter() - start, latencies
+
+
+def case_load_mods(data_dir: str, workers: int) -> _tResult:
+    return _load(data_dir, workers, False)
+
+
+def case_load_mods_quick(data_dir: str, workers: int) -> _tResult:
+    return _load(data_dir, workers, True)
+
+
+def _case_parser(loader: str) -> Callable[[str, int], _tResult]:
+    def case(data_dir: str, workers: int) -> _tResult:
+        from data.mod.ModFile import ModFile
+        from data.mod.parser import get_parsers
+        latencies: list[float] = []
+        start = time.perf_counter()
+        root = mods_dir(data_dir)
+        for name in sorted(os.listdir(root)):
+            if f'_{loader}_' not in name:
+                continue
+            path = os.path.join(root, name)
+            file_start = time.perf_counter()
+            try:
+                with ZipFile(path) as jar:
+                    for parser in get_parsers(jar):
+                        instance = parser(jar, ModFile(path, []))
+                        if instance.loader == loader:
+                            instance.parse()
+            except Exception:
+                pass
+            latencies.append(time.perf_counter() - file_start)
+        return time.perf_counter() - start, latencies
+    case.__name__ = f'case_parser_{loader}'
+    return case
+
+
+def case_load_games(data_dir: str, workers: int) -> _tResult:
+    from data import load_games
+    on_load_one, latencies = _timed_callbacks()
+    start = time.perf_counter()
+    load_games(os.path.join(data_dir, 'versions'), on_load_one)
+    return time.perf_counter() - start, latencies
+
+
+def _load_game(data_dir: str, workers: int):
+    from data.GameInfo import Game
+    game = Game.create(os.path.join(data_dir, 'game', 'versions', GAME_NAME))
+    game.reload_mods(workers=workers)
+    return game
+
+
+def case_check_game(data_dir: str, workers: int) -> _tResult:
+    """总用时是第一次完整检查的用时，延迟是之后每次开关一个 mod 并重新检查的用时"""
+    from data import GameModsCheck
+    game = _load_game(data_dir, workers)
+    start = time.perf_counter()
+    GameModsCheck.check_game(game)
+    wall = time.perf_counter() - start
+    latencies: list[float] = []
+    mods = game.mod_list or []
+    for mod in mods[::max(1, len(mods) // 50)]:
+        toggle_start = time.perf_counter()
+        game.set_mod_enabled(mod, not mod.enabled)
+        GameModsCheck.check_game(game)
+        latencies.append(time.perf_counter() - toggle_start)
+        game.set_mod_enabled(mod, not mod.enabled)
+    return wall, latencies
+
+
+def case_search(data_dir: str, workers: int) -> _tResult:
+    """总用时包括建立索引，延迟是逐字输入时每次搜索的用时"""
+    from data.SearchIndex import SearchIndex
+    game = _load_game(data_dir, workers)
+    start = time.perf_counter()
+    index = SearchIndex(game.mod_list or [])
+    latencies: list[float] = []
+    for keyword in KEYSTROKES:
+        query_start = time.perf_counter()
+        index.match_ids(keyword)
+        latencies.append(time.perf_counter() - query_start)
+    return time.perf_counter() - start, latencies
+
+
+def case_filter(data_dir: str, workers: int) -> _tResult:
+    """总用时包括把 mod 加入筛选器，延迟是每次切换筛选条件的用时"""
+    from data.ModFilter import ModFilter
+    game = _load_game(data_dir, workers)
+    start = time.perf_counter()
+    mod_filter = ModFilter()
+    for mod in game.mod_list or []:
+        mod_filter.add(mod)
+    options: dict = {'forge': True, 'fabric': True, 'quilt': True, 'other': True, 'version': ''}
+    latencies: list[float] = []
+    for key, value in FILTER_TOGGLES:
+        toggle_start = time.perf_counter()
+        options[key] = value
+        mod_filter.loaders = {i for i in ('forge', 'fabric', 'quilt', 'other') if options[i]}
+        mod_filter.version = options['version']
+        mod_filter.refresh()
+        latencies.append(time.perf_counter() - toggle_start)
+    return time.perf_counter() - start, latencies
+
+
+CASES: dict[str, Callable[[str, int], _tResult]] = {
+    'load_mods': case_load_mods,
+    'load_mods_quick': case_load_mods_quick,
+    **{f'parser_{loader}': _case_parser(loader) for loader in LOADERS},
+    'load_games': case_load_games,
+    'check_game': case_check_game,
+    'search': case_search,
+    'filter': case_filter,
+}
+
+
+def peak_rss() -> int | None:
+    """当前进程的峰值内存（字节），不支持的平台返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _run_case(name: str, data_dir: str, workers: int) -> dict:
+    """在子进程中运行一个用例"""
+    logging.disable(logging.CRITICAL)
+    wall, latencies = CASES[name](data_dir, workers)
+    return {'wall': wall, 'latency_ms': percentiles(latencies), 'peak_rss': peak_rss()}
+
+
+def generate(data_dir: str, size: int, args: argparse.Namespace) -> None:
+    """生成一组测试数据：size 个 mod 的游戏，以及 size 个游戏版本的 versions 目录"""
+    versions_dir = os.path.join(data_dir, 'game', 'versions')
+    os.makedirs(os.path.join(versions_dir, GAME_NAME), exist_ok=True)
+    with open(os.path.join(versions_dir, GAME_NAME, GAME_NAME + '.json'), 'w', encoding='utf-8') as f:
+        json.dump({'id': GAME_NAME, 'mainClass': 'net.fabricmc.loader.impl.launch.knot.KnotClient',
+                   'clientVersion': '1.19.2'}, f)
+    make_mixed_mods_dir(mods_dir(data_dir), size, seed=args.seed, class_count=args.class_count,
+                        icon_size=args.icon_size, nested_depth=args.depth, fan_out=args.fan_out,
+                        malformed_ratio=args.malformed)
+    make_versions_dir(os.path.join(data_dir, 'versions'), size, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='mod 管理器性能测试套件')
+    parser.add_argument('--sizes', default='10,100,1000,10000', help='mod 数量们，用逗号分隔')
+    parser.add_argument('--cases', default=','.join(CASES), help='要运行的用例，用逗号分隔')
+    parser.add_argument('--workers', type=int, default=1, help='解析用的进程数，参考 load_mods')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--class-count', type=int, default=20, help='每个 jar 中 class 文件的数量')
+    parser.add_argument('--icon-size', type=int, default=0, help='图标边长，0 表示没有图标')
+    parser.add_argument('--depth', type=int, default=1, help='子 jar 嵌套的层数')
+    parser.add_argument('--fan-out', type=int, default=1, help='每一层 jar 中子 jar 的数量')
+    parser.add_argument('--malformed', type=float, default=0.02, help='损坏的 mod 的比例')
+    parser.add_argument('--out', default='', help='结果 JSON 文件，为空时输出到标准输出')
+    args = parser.parse_args()
+
+    sizes = [int(i) for i in args.sizes.split(',') if i]
+    cases = [i for i in args.cases.split(',') if i]
+    for name in cases:
+        if name not in CASES:
+            parser.error(f'未知的用例 {name}，可用的用例：{", ".join(CASES)}')
+
+    report: dict = {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(),
+                 'cpu_count': os.cpu_count(),
+                 **{k: v for k, v in vars(args).items() if k not in ('out',)}},
+        'results': [],
+    }
+    ctx = multiprocessing.get_context('spawn')
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as data_dir:
+            start = time.perf_counter()
+            generate(data_dir, size, args)
+            print(f"生成 {size} 个 mod 的测试数据用时 {time.perf_counter() - start:.2f}s", file=sys.stderr)
+            for name in cases:
+                # 每个用例使用新的进程，峰值内存互不影响
+                with ctx.Pool(1) as pool:
+                    result = pool.apply(_run_case, (name, data_dir, args.workers))
+                report['results'].append({'case': name, 'size': size, **result})
+                latency = result['latency_ms']
+                print(f"  {name:<16} {size:6d}  {result['wall']:8.3f}s  "
+                      f"p50 {latency.get('p50', 0):8.3f}ms  p99 {latency.get('p99', 0):8.3f}ms",
+                      file=sys.stderr)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
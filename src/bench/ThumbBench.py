@@ -0,0 +1,56 @@
+"""对比原来经过临时 png 文件生成缩略图、在内存中解码、以及命中磁盘缩略图缓存时的耗时
+
+    python -m bench.ThumbBench [图标数量] [图标边长] [缩略图边长]
+
+原来的方式用 dpg.load_image 读回临时文件，这里没有 dpg，用 PIL 读回并转换成浮点数代替。
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from array import array
+
+from PIL.Image import Resampling, open as open_image
+
+from bench.JarFactory import make_icon_bytes
+from data.mod.Thumbnail import ThumbnailCache, rgba_to_floats
+
+
+def temp_file_thumbnail(icon: bytes, size: int, work_dir: str) -> list[float]:
+    """原来的做法：解码、缩放、写入临时 png，再读回来"""
+    from io import BytesIO
+    temp_path = os.path.join(work_dir, '___temp___.png')
+    img = open_image(BytesIO(icon)).resize((size, size), Resampling.NEAREST)
+    img.save(temp_path)
+    with open_image(temp_path) as loaded:
+        data = [i / 255 for i in loaded.convert('RGBA').tobytes()]
+    os.remove(temp_path)
+    return data
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    icon_size = int(sys.argv[2]) if len(sys.argv) > 2 else 128
+    thumb_size = int(sys.argv[3]) if len(sys.argv) > 3 else 180
+    rnd = random.Random(0)
+    icons = [make_icon_bytes(rnd, icon_size) for _ in range(count)]
+    print(f"{count} 个 {icon_size}x{icon_size} 的图标，缩略图 {thumb_size}x{thumb_size}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        start = time.perf_counter()
+        old = [temp_file_thumbnail(icon, thumb_size, work_dir) for icon in icons]
+        print(f"  临时文件        {time.perf_counter() - start:7.3f}s")
+
+        for name, cache_dir in (('内存解码', ''), ('内存解码并写缓存', os.path.join(work_dir, 'thumbs')),
+                                ('命中磁盘缓存', os.path.join(work_dir, 'thumbs'))):
+            cache = ThumbnailCache(cache_dir)
+            start = time.perf_counter()
+            new = [rgba_to_floats(cache.get(icon, thumb_size), thumb_size)  # type: ignore
+                   for icon in icons]
+            print(f"  {name:<12} {time.perf_counter() - start:7.3f}s  "
+                  f"命中 {cache.hits} 未命中 {cache.misses}")
+            assert all(a == array('f', b) for a, b in zip(new, old))
+
+
+if __name__ == '__main__':
+    main()
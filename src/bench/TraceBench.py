@@ -0,0 +1,77 @@
+"""测量性能追踪关闭和开启时扫描 mod 的耗时，并导出一份 Chrome trace 文件
+
+    python -m bench.TraceBench [mod 数量] [进程数] [trace 文件]
+
+关闭时每个 span 只是一次函数调用加一次全局变量判断，这里同时给出单个空 span 的开销。
+最后按名字汇总各个阶段的总用时，生成的 trace 文件可以用 https://ui.perfetto.dev 打开。
+"""
+import json
+import logging
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from bench.JarFactory import make_mixed_mods_dir
+from data import Trace, load_mods
+
+
+def noop_span_cost(count: int = 200000) -> float:
+    """关闭追踪时一个 span 的开销（扣除空循环的用时），单位纳秒"""
+    Trace.enable(False)
+    start = time.perf_counter()
+    for _ in range(count):
+        pass
+    empty = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(count):
+        with Trace.span('noop', file='x'):
+            pass
+    return (time.perf_counter() - start - empty) / count * 1e9
+
+
+def scan(root_dir: str, workers: int, repeat: int = 3) -> float:
+    """多次扫描取最快的一次"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load_mods(root_dir, workers=workers, use_cache=False)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    trace_file = sys.argv[3] if len(sys.argv) > 3 else 'trace.json'
+    logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as root_dir:
+        make_mixed_mods_dir(root_dir, count, nested_depth=2, fan_out=2)
+        print(f"{count} 个 mod，{workers} 个进程")
+        print(f"  空 span    {noop_span_cost():7.1f}ns")
+
+        Trace.enable(False)
+        off = scan(root_dir, workers)
+        print(f"  关闭追踪  {off:7.3f}s")
+
+        Trace.enable(True)
+        on = scan(root_dir, workers, repeat=1)
+        Trace.enable(False)
+        events = Trace.take_events()
+        print(f"  开启追踪  {on:7.3f}s  共 {len(events)} 个 span")
+
+    totals: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+    for name, _, duration, *_ in events:
+        totals[name][0] += 1
+        totals[name][1] += duration
+    for name, (times, total) in sorted(totals.items(), key=lambda i: -i[1][1]):
+        print(f"    {name:<20} {times:7d} 次  {total / 1e6:9.1f}ms")
+
+    Trace.export_chrome_trace(trace_file, events)
+    with open(trace_file, encoding='utf-8') as f:
+        assert len(json.load(f)['traceEvents']) == len(events)
+    print(f"  已写入 {trace_file}")
+
+
+if __name__ == '__main__':
+    main()
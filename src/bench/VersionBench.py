@@ -0,0 +1,82 @@
+"""对比每次重新解析版本范围（旧的 Utils.in_version_forge，去掉了 print）与编译好的版本范围的判断速度
+
+    python -m bench.VersionBench [判断次数]
+"""
+import random
+import sys
+import time
+
+from Version import compile_range, parse_version
+
+
+def old_version_cmp(v1: str, v2: str) -> int:
+    v1s = v1.strip('. ').split('.')
+    v2s = v2.strip('. ').split('.')
+    i = 0
+    while True:
+        if i >= len(v1s) and i >= len(v2s):
+            return 0
+        if i >= len(v1s):
+            return -1
+        if i >= len(v2s):
+            return 1
+        a, b = v1s[i], v2s[i]
+        if a == 'x' and b == 'x':
+            return 0
+        if a == 'x':
+            return -1
+        if b == 'x':
+            return 1
+        if int(a) != int(b):
+            return 1 if int(a) > int(b) else -1
+        i += 1
+
+
+def old_in_version_forge(version: str, range: str) -> bool:
+    startin = range.startswith('[')
+    endin = range.endswith(']')
+    versions = range[1:-1].split(',')
+    if len(versions) == 1:
+        return old_version_cmp(versions[0], version) == 0
+    versions[0] = versions[0] or '0'
+    versions[1] = versions[1] or '99999999'
+    low = old_version_cmp(version, versions[0])
+    high = old_version_cmp(version, versions[1])
+    return (low == 0 and startin) or (high == 0 and endin) or (low == 1 and high == -1)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rnd = random.Random(0)
+    maven_ranges = [f'[1.{i},1.{i + 1})' for i in range(12, 20)] + ['[1.18.2,)', '(,1.19]']
+    semver_ranges = ['>=0.14.0', '1.19.x', '~1.2.3', '^2.0.0', '>=1.0 <2.0', '*']
+    versions = [f'1.{rnd.randint(12, 20)}.{rnd.randint(0, 4)}' for _ in range(64)]
+    maven_cases = [(rnd.choice(versions), rnd.choice(maven_ranges)) for _ in range(count)]
+    semver_cases = [(rnd.choice(versions), rnd.choice(semver_ranges)) for _ in range(count)]
+
+    print(f"{count} 次判断")
+    start = time.perf_counter()
+    expected = [old_in_version_forge(v, r) for v, r in maven_cases]
+    print(f"  maven 范围，每次重新解析   {time.perf_counter() - start:7.3f}s")
+
+    start = time.perf_counter()
+    got = [compile_range(r, maven=True).contains(v) for v, r in maven_cases]
+    print(f"  maven 范围，编译缓存       {time.perf_counter() - start:7.3f}s")
+    # 旧实现认为 1.19.0 > 1.19，只有这种情况结果不同
+    diff = {(v, r) for (v, r), a, b in zip(maven_cases, expected, got) if a != b}
+    assert all(v.endswith('.0') for v, _ in diff), diff
+
+    compiled = [(parse_version(v), compile_range(r, maven=True)) for v, r in maven_cases]
+    start = time.perf_counter()
+    for v, r in compiled:
+        r.contains(v)
+    print(f"  maven 范围，预先编译       {time.perf_counter() - start:7.3f}s")
+
+    start = time.perf_counter()
+    for v, r in semver_cases:
+        compile_range(r).contains(v)
+    print(f"  semver 谓词，编译缓存      {time.perf_counter() - start:7.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,2 @@
+"""性能测试工具，需要在 src 目录下用 python -m bench.XXX 运行
+"""
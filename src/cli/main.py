@@ -32,15 +32,16 @@ def _input2command(source: str) -> Tuple[str, list[str]]:
     return (cmd, args_list)
 
 
-mmc = ModManagerCli()
-while True:
-    user_input = input()
-    cmd, args = _input2command(user_input)
-    try:
-        result = mmc.call(cmd, args)
-    except Exception as e:
-        print("Error: " + str(e))
-        continue
+if __name__ == '__main__':
+    mmc = ModManagerCli()
+    while True:
+        user_input = input()
+        cmd, args = _input2command(user_input)
+        try:
+            result = mmc.call(cmd, args)
+        except Exception as e:
+            print("Error: " + str(e))
+            continue
 
-    for line in result:
-        print(line)
+        for line in result:
+            print(line)
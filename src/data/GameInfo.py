@@ -3,9 +3,15 @@ import json
 import os
 import os.path as path
 import shutil
-from typing import Callable, List
+from typing import TYPE_CHECKING, Callable, List
 
+from data import Trace
 from data.mod.ModFile import ModFile
+from data.ModIndex import ModIndex
+if TYPE_CHECKING:
+    from data.LoadTask import LoadTask
+    from data.ModWatcher import ModDirDelta, ModListChange
+    from data.GameModsCheck import ModsChecker
 
 
 class GameType(object):
@@ -31,6 +37,10 @@ class Game:
     """游戏版本"""
     mod_list: list[ModFile] | None = None
     """mod 列表"""
+    mod_index: ModIndex | None = dataclasses.field(default=None, repr=False, compare=False)
+    """mod id 索引，第一次按 id 查找 mod 时建立，参考 get_mod_index"""
+    mods_checker: 'ModsChecker | None' = dataclasses.field(default=None, repr=False, compare=False)
+    """mod 检查器，第一次检查时建立，参考 GameModsCheck.get_checker"""
 
     def get_mods_or_load(self, on_load_one: Callable[[ModFile], None] | None = None,
                          on_load_over: Callable[[list[ModFile]], None] | None = None) -> list[ModFile]:
@@ -46,20 +56,101 @@ class Game:
         if self.mod_list is None:
             self.reload_mods(on_load_one, on_load_over)
 
-        assert self.mod_list
+        assert self.mod_list is not None
         return self.mod_list
 
     def reload_mods(self, on_load_one: Callable[[ModFile], None] | None = None,
-                    on_load_over: Callable[[list[ModFile]], None] | None = None) -> None:
+                    on_load_over: Callable[[list[ModFile]], None] | None = None,
+                    workers: int | None = None, quick: bool = False,
+                    background: bool = False,
+                    on_load_failed: Callable[[Exception], None] | None = None
+                    ) -> 'LoadTask[ModFile] | None':
         """重新加载 mod
 
         Args:
             on_load_one 成功读取一个 mod 时的回调.
             on_load_over 读取完毕时的回调.
+            workers 解析用的进程数，参考 load_mods.
+            quick 是否快速解析，参考 load_mods.
+            background 是否在后台线程中加载，为 True 时返回已经启动的任务，
+                需要定期调用它的 drain 来触发回调，mod 列表在加载结束时才会更新，任务被取消或失败时保持原来的 mod 列表.
+                加载期间 mods 目录的变化会暂缓到加载结束（或取消、失败）后再应用.
+            on_load_failed 后台加载失败时的回调，这时不会调用 on_load_over，参考 LoadTask.
         """
-        from data import load_mods
-        self.mod_list = load_mods(os.path.join(self.full_dir_path, 'mods'),
-                                  on_load_one=on_load_one, on_load_over=on_load_over)
+        from data import iter_mods, load_mods
+        if background:
+            from functools import partial
+            from data.LoadTask import LoadTask
+
+            def _over(mods: list[ModFile]):
+                self.mod_index = None
+                self.mods_checker = None
+                self.mod_list = mods
+                if on_load_over:
+                    on_load_over(mods.copy())
+
+            task = LoadTask(partial(iter_mods, self.get_mods_dir(), workers, quick=quick),
+                            on_load_one, _over, on_load_failed, name=f'LoadGameMods-{self.dir_name}').start()
+            from data import ModManager
+            watcher = ModManager.get().watcher
+            if watcher:
+                watcher.hold(self.get_mods_dir(), task)
+            return task
+        self.mod_index = None
+        self.mods_checker = None
+        self.mod_list = load_mods(self.get_mods_dir(),
+                                  on_load_one=on_load_one, on_load_over=on_load_over,
+                                  workers=workers, quick=quick)
+        return None
+
+    def get_mods_dir(self) -> str:
+        """获取这个游戏的 mods 目录"""
+        return os.path.join(self.full_dir_path, 'mods')
+
+    def apply_mods_delta(self, delta: 'ModDirDelta') -> 'ModListChange':
+        """把 mods 目录的增量变化应用到 mod 列表，只会在当前线程中重新解析新增或内容变化的文件。
+        mod 列表还没有加载时什么也不做。界面线程中应当使用 start_mods_delta
+        """
+        from data.ModWatcher import ModListChange, apply_mods_delta
+        if self.mod_list is None:
+            return ModListChange()
+        return self._on_mods_changed(apply_mods_delta(self.mod_list, delta))
+
+    def start_mods_delta(self, delta: 'ModDirDelta',
+                         on_change: Callable[['ModListChange'], None]) -> 'LoadTask | None':
+        """apply_mods_delta 的后台版本，参考 data.ModWatcher.start_mods_delta。
+        mod 列表还没有加载，或者解析期间列表被重新加载替换了时不会调用 on_change
+        """
+        from data.ModWatcher import start_mods_delta
+        mods = self.mod_list
+        if mods is None:
+            return None
+
+        def _done(change: 'ModListChange') -> None:
+            if mods is self.mod_list:
+                on_change(self._on_mods_changed(change))
+
+        return start_mods_delta(mods, delta, _done)
+
+    def _on_mods_changed(self, change: 'ModListChange') -> 'ModListChange':
+        """mod 列表发生变化后更新索引和检查结果"""
+        if self.mod_index is not None:
+            for mod in change.removed:
+                self.mod_index.remove(mod)
+            for mod in change.added:
+                self.mod_index.add(mod)
+        if self.mods_checker is not None:
+            self.mods_checker.update(change.added, change.removed, change.moved)
+        return change
+
+    def get_mod_index(self) -> ModIndex:
+        """获取 mod id 索引，没有时根据 mod 列表建立（会完整解析全部 mod）。
+        索引会随 add_mod、remove_mod、reload_mods 和 apply_mods_delta 更新，
+        开启或关闭 mod 只是重命名文件，不需要更新索引。
+        """
+        if self.mod_index is None:
+            self.mod_index = ModIndex(self.get_mods_or_load())
+        return self.mod_index
 
     def has_mod_by_id(self, mod_id: str) -> bool:
         """根据 mod id 判断是否存在某个 mod
@@ -73,15 +164,13 @@ class Game:
 
         if mod_id is None:
             return False
-        for mod in self.get_mods_or_load():
-            if mod.include_mod_by_id(mod_id):
-                return True
-        return False
+        return mod_id in self.get_mod_index()
 
     def get_mod_by_id(self, mod_id: str) -> ModFile | None:
-        for mod in self.get_mods_or_load():
-            if mod_id in mod.get_ids():
-                return mod
+        """根据 mod id 获取 mod，子 mod 和 provides 中的 id 会返回它所在的顶层 mod，
+        有多个时优先返回开启了的 mod，参考 ModIndex.get
+        """
+        return self.get_mod_index().get(mod_id)
 
     def has_mod_by_file(self, mod_file: str) -> bool:
         """根据 mod 文件名判断是否存在某个 mod, 注意这只能判断是否存在同文件名 mod，这仅仅检查文件名。
@@ -112,8 +201,12 @@ class Game:
         mod = mod.copy_to(
             path.join(self.full_dir_path, 'mods', basename)
         )
-        assert self.mod_list
+        assert self.mod_list is not None
         self.mod_list.append(mod)
+        if self.mod_index is not None:
+            self.mod_index.add(mod)
+        if self.mods_checker is not None:
+            self.mods_checker.update(added=[mod])
 
     def remove_mod(self, mod: ModFile) -> None:
         """删除 mod 和对应文件。
@@ -121,11 +214,31 @@ class Game:
         Args:
             mod (ModInfo): 要删除的 mod。
         """
-        if mod not in self.get_mods_or_load():
+        from data.ModWatcher import index_by_identity
+        mods = self.get_mods_or_load()
+        # 按对象查找，列表中的 mod 可能已经被改名（身份标识随之变化），参考 ModFile.get_key
+        index = index_by_identity(mods, mod)
+        if index < 0:
             return
         os.remove(mod.full_file_path)
-        if self.mod_list:
-            self.mod_list.remove(mod)
+        del mods[index]
+        if self.mod_index is not None:
+            self.mod_index.remove(mod)
+        if self.mods_checker is not None:
+            self.mods_checker.update(removed=[mod])
+
+    def set_mod_enabled(self, mod: ModFile, enabled: bool) -> None:
+        """开启或关闭这个游戏中的一个 mod，并更新 mod 检查结果
+
+        Args:
+            mod (ModFile): 要开启或关闭的 mod
+            enabled (bool): 是否开启
+        """
+        if mod.enabled == enabled:
+            return
+        mod.enabled = enabled
+        if self.mods_checker is not None:
+            self.mods_checker.update(changed=[mod])
 
     @staticmethod
     def create(version_dir: str) -> 'Game':
@@ -145,8 +258,11 @@ class Game:
         if not path.exists(json_file_path):
             return result
 
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            json_root: dict = json.loads(f.read())
+        with Trace.span('version_json', file=json_file_path) as span:
+            with open(json_file_path, 'rb') as f:
+                data = f.read()
+            span.set('bytes', len(data))
+            json_root: dict = json.loads(data)
         main_class = json_root.get('mainClass', '')
         if main_class.startswith('cpw.mods.'):
             result.game_type = GameType.forge
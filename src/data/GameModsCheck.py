@@ -1,6 +1,9 @@
-from typing import Callable
+from typing import Callable, Iterable
 from data.mod.ModFile import ModFile
+from data.mod.ModInfo import ModDepend
 from data.GameInfo import Game
+from data.ModIndex import ModIndex
+from Version import parse_version
 
 
 class ModCheckResult(object):
@@ -8,10 +11,13 @@ class ModCheckResult(object):
                  mod: ModFile,
                  game: Game,
                  message: str,
+                 kind: str = '',
                  ) -> None:
         self.mod: ModFile = mod
         self.game: Game = game
         self.message: str = message
+        self.kind: str = kind
+        """问题类型：loader、missing、disabled 或 version"""
         self.action: Callable[['ModCheckResult'], None] | None = None
 
     def Action(self):
@@ -28,52 +34,155 @@ class ModCheckResult(object):
 _tResults = dict[ModFile, list[ModCheckResult]]
 
 
-def check_game(game: Game) -> _tResults:
-    result: _tResults = {}
-    for mod in game.get_mods_or_load():
+class ModsChecker(object):
+    """一个游戏的 mod 检查器。
+
+    第一次检查时建立依赖图：节点是 mod id（包括子 mod 和 provides 中的 id，来自 Game.get_mod_index），
+    边记录哪些开启的 mod 依赖哪个 id。之后某个 mod 被开启、关闭、添加或删除时，
+    只需要重新检查这个 mod 本身以及依赖它提供的 id 的 mod。
+    ModFile 的哈希值来自路径，重命名后会改变，所以内部的表都和 ModIndex 一样以 id(mod) 为键。
+    """
+
+    def __init__(self, game: Game) -> None:
+        self.game: Game = game
+        self.index: ModIndex = game.get_mod_index()
+        self.results: dict[int, list[ModCheckResult]] = {}
+        """id(有问题的 mod) -> 问题们"""
+        self.dependents: dict[str, dict[int, ModFile]] = {}
+        """mod id -> 依赖这个 id 的开启的 mod 们，id(mod) -> mod"""
+        self.depends: dict[int, list[str]] = {}
+        """id(开启的 mod) -> 它依赖的 mod id 们"""
+        self.provided: dict[int, list[str]] = {}
+        """id(检查过的 mod) -> 它提供的 mod id 们，mod 被删除后仍然需要知道它原来提供了什么"""
+        for mod in game.get_mods_or_load():
+            self._check_mod(mod)
+
+    def get_results(self) -> _tResults:
+        """获取检查结果，不会重新检查"""
+        return {result[0].mod: result for result in self.results.values()}
+
+    def update(self,
+               added: Iterable[ModFile] = (),
+               removed: Iterable[ModFile] = (),
+               changed: Iterable[ModFile] = ()) -> None:
+        """mod 列表发生变化后调用，只重新检查受影响的 mod。
+        调用前 Game.mod_index 应当已经更新（Game 的方法会自动更新）。
+
+        Args:
+            added: 新增的 mod
+            removed: 删除的 mod
+            changed: 被开启、关闭或者重命名的 mod
+        """
+        affected: dict[int, ModFile] = {}
+        for mod in removed:
+            for mod_id in self.provided.pop(id(mod), []):
+                affected.update(self.dependents.get(mod_id, {}))
+            self._remove_edges(mod)
+            self.results.pop(id(mod), None)
+        for mod in list(added) + list(changed):
+            affected[id(mod)] = mod
+            for mod_id in self.index.get_provided(mod):
+                affected.update(self.dependents.get(mod_id, {}))
+        for mod in affected.values():
+            if self.index.has_mod(mod):
+                self._check_mod(mod)
+
+    def _remove_edges(self, mod: ModFile) -> None:
+        for mod_id in self.depends.pop(id(mod), []):
+            dependents = self.dependents.get(mod_id)
+            if dependents is not None:
+                dependents.pop(id(mod), None)
+                if not dependents:
+                    del self.dependents[mod_id]
+
+    def _check_mod(self, mod: ModFile) -> None:
+        """重新检查一个 mod，并更新它在依赖图中的边"""
+        self._remove_edges(mod)
+        self.results.pop(id(mod), None)
+        self.provided[id(mod)] = list(self.index.get_provided(mod))
         if not mod.enabled:
-            continue
-        mod_check: list[ModCheckResult] = []
-        mod_check.extend(check_one_mod_depend(game, mod))
-        loader_check = check_one_mod_loader(game, mod)
+            return
+
+        result: list[ModCheckResult] = []
+        loader_check = check_one_mod_loader(self.game, mod)
         if loader_check:
-            mod_check.append(loader_check)
-        if mod_check:
-            result[mod] = mod_check
-    return result
+            result.append(loader_check)
+        info = mod.get_info(self.game.game_type)  # type: ignore
+        if info is not None:
+            deps: list[str] = []
+            for dep in info.dependencies:
+                if not dep.mandatory:
+                    continue
+                deps.append(dep.mod_id)
+                self.dependents.setdefault(dep.mod_id, {})[id(mod)] = mod
+                issue = self.check_depend(mod, dep)
+                if issue:
+                    result.append(issue)
+            self.depends[id(mod)] = deps
+        if result:
+            self.results[id(mod)] = result
+
+    def check_depend(self, mod: ModFile, dep: ModDepend) -> ModCheckResult | None:
+        """检查 mod 的一个前置 mod，没有问题时返回 None"""
+        owners = self.index.get_all(dep.mod_id)
+        if not owners:
+            return ModCheckResult(mod, self.game, f"缺少前置mod: {dep.mod_id}", 'missing')
+        enabled = [i for i in owners if i.enabled]
+        if not enabled:
+            return ModCheckResult(mod, self.game, f"前置mod: {dep.mod_id} 没有开启", 'disabled')
+        versions = [self.index.get_version(i, dep.mod_id) or '' for i in enabled]
+        if any(not is_known_version(v) or dep.accepts(v) for v in versions):
+            return None
+        return ModCheckResult(
+            mod, self.game,
+            f"前置mod: {dep.mod_id} 的版本 {', '.join(versions)} 不满足 {dep.version_range}",
+            'version')
+
+
+def is_known_version(version: str) -> bool:
+    """版本号是否有意义。没有版本、没有替换的 ${file.jarVersion} 之类的占位符、
+    forge 解析器找不到版本时填写的 0.0.0 以及不以数字开头的版本都无法和范围比较，视为满足任何范围
+    """
+    if not version or '${' in version or version == '0.0.0':
+        return False
+    return bool(parse_version(version).release)
+
+
+def get_checker(game: Game) -> ModsChecker:
+    """获取游戏的 mod 检查器，没有时建立，检查器会随着 Game 中 mod 列表的变化而更新"""
+    if game.mods_checker is None:
+        game.mods_checker = ModsChecker(game)
+    return game.mods_checker
+
+
+def check_game(game: Game) -> _tResults:
+    """检查游戏中开启的 mod 的加载器和前置 mod，第一次检查后结果会随着 mod 的变化增量更新"""
+    return get_checker(game).get_results()
 
 
 def check_one_mod_loader(game: Game, mod: ModFile) -> ModCheckResult | None:
     if game.game_type in mod.support_loaders():
         return None
     return ModCheckResult(
-        mod, game, f"确定这是一个支持 {game.game_type} 的mod吗？"
+        mod, game, f"确定这是一个支持 {game.game_type} 的mod吗？", 'loader'
     )
 
 
 def check_one_mod_depend(game: Game, mod: ModFile) -> list[ModCheckResult]:
+    """检查一个 mod 的前置 mod"""
     info = mod.get_info(game.game_type)  # type: ignore
     if info is None:
         return []
-
+    checker = get_checker(game)
     result: list[ModCheckResult] = []
     for dep in info.dependencies:
         if not dep.mandatory:
             continue
-        if not game.has_mod_by_id(dep.mod_id):
-            result.append(ModCheckResult(mod, game, f"缺少前置mod: {dep.mod_id}"))
-            continue
-
-        dep_mod = game.get_mod_by_id(dep.mod_id)
-        if dep_mod is None:
-            continue
-        if not dep_mod.enabled:
-            result.append(ModCheckResult(
-                mod, game, f"前置mod: {dep.mod_id} 没有开启"))
-            continue
+        issue = checker.check_depend(mod, dep)
+        if issue:
+            result.append(issue)
     return result
 
-
 if __name__ == '__main__':
     game: Game = Game.create(
         r'/980/Minecraft/.minecraft/versions/1.18.2-Fabric 0.14.9')
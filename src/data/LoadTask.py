@@ -0,0 +1,126 @@
+"""后台加载任务。
+
+加载 mod 要解压、解析大量 jar 文件，在界面线程中进行会让窗口在加载完之前一直卡住。
+LoadTask 在后台线程中逐个产生结果并放入线程安全的队列，调用者线程（界面线程）定期调用 drain，
+在给定的时间内取出结果并触发回调，所以回调总是在调用者线程中、按产生的顺序触发。
+任务可以随时取消，取消后后台线程处理完当前的对象就会停止，队列中剩下的结果也不会再触发回调。
+产生结果时出现错误的任务算作失败，不会触发 on_load_over（否则调用者会把不完整的结果当成全部结果），
+而是触发 on_load_failed，已经取出的结果在 loaded 中。
+"""
+import queue
+import threading
+import time
+from typing import Callable, Generic, Iterator, TypeVar
+
+from data.mod import log
+
+T = TypeVar('T')
+
+_OVER = object()
+"""后台线程结束的标记"""
+
+
+class LoadTask(Generic[T]):
+    """在后台线程中运行的加载任务
+    """
+
+    def __init__(self, produce: Callable[[], Iterator[T]],
+                 on_load_one: Callable[[T], None] | None = None,
+                 on_load_over: Callable[[list[T]], None] | None = None,
+                 on_load_failed: Callable[[Exception], None] | None = None,
+                 name: str = 'LoadTask') -> None:
+        """
+        Args:
+            produce: 在后台线程中调用，返回逐个产生结果的迭代器，取消时如果它是生成器会被 close
+            on_load_one: 取出一个结果时的回调
+            on_load_over: 全部结果都取出后的回调，任务被取消或者失败时不会触发
+            on_load_failed: 任务失败时，出错之前产生的结果都取出后的回调，参数是出现的错误
+            name: 后台线程的名字
+        """
+        self.produce = produce
+        self.on_load_one = on_load_one
+        self.on_load_over = on_load_over
+        self.on_load_failed = on_load_failed
+        self.name: str = name
+        self.results: queue.Queue = queue.Queue()
+        self.loaded: list[T] = []
+        """已经取出的结果"""
+        self.finished: bool = False
+        """是否已经结束（全部结果都已经取出，或者被取消）"""
+        self.error: Exception | None = None
+        """产生结果时出现的错误，在后台线程中设置"""
+        self._cancelled = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+    def start(self) -> 'LoadTask[T]':
+        """启动后台线程，返回自身"""
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        """取消任务，可以在任何线程中调用，已经结束的任务什么也不会发生"""
+        self._cancelled.set()
+
+    def _run(self) -> None:
+        items = None
+        try:
+            items = self.produce()
+            for item in items:
+                if self._cancelled.is_set():
+                    break
+                self.results.put(item)
+        except Exception as e:
+            log.warning(f"后台任务 {self.name} 出现错误：{e}")
+            self.error = e
+        finally:
+            close = getattr(items, 'close', None)
+            if close is not None:
+                close()
+            self.results.put(_OVER)
+
+    def drain(self, deadline: float | None = None) -> bool:
+        """在调用者线程中取出后台线程产生的结果并触发回调，至少会处理一个已经产生的结果
+
+        Args:
+            deadline: time.perf_counter() 的截止时间，超过后剩下的结果留到下次再取，None 表示不限制
+
+        Returns:
+            任务是否已经结束
+        """
+        while not self.finished:
+            if self._cancelled.is_set():
+                self.finished = True
+                break
+            try:
+                item = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if item is _OVER:
+                self.finished = True
+                if self.error is not None:
+                    if self.on_load_failed:
+                        self.on_load_failed(self.error)
+                elif self.on_load_over:
+                    self.on_load_over(self.loaded.copy())
+                break
+            self.loaded.append(item)
+            if self.on_load_one:
+                self.on_load_one(item)
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        return self.finished
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """等待后台线程结束并取出全部结果，返回任务是否已经结束"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.drain()
@@ -0,0 +1,242 @@
+"""mod 列表的筛选引擎。
+
+每个 mod 占用一个槽位，加载器、mc 版本和关键字筛选的结果都用 python 的 int 作为位集表示（第 i 位表示第 i 个槽位）：
+    - 每种加载器预先计算一个位集，加载器筛选是几个位集的按位或
+    - mc 版本范围按（被缓存、相同的范围是同一个对象的）编译结果分组，每组一个位集，
+      版本筛选只需要对每种不同的范围判断一次
+    - 关键字筛选的结果来自搜索索引，只需要处理匹配到的 mod
+筛选条件变化时，和上一次的可见位集做异或就得到可见性发生变化的槽位，界面只需要处理这些槽位。
+槽位按加入的顺序分配，被删除的槽位超过一半时压缩（剩下的 mod 按原来的顺序重新编号），
+所以按位的顺序遍历就是 mod 加入的顺序，位集的长度也不会随着反复的增删一直变长。
+"""
+from typing import Iterator
+
+from data.mod.ModFile import ModFile
+from Version import ANY_RANGE, VersionRange, compile_range
+
+LOADER_BITS: dict[str, int] = {
+    'forge': 1,
+    'fabric': 2,
+    'quilt': 4,
+}
+"""各个加载器在加载器掩码中的位，不支持这些加载器的 mod 算作 other"""
+
+_UNKNOWN_MC_VERSIONS = ('', '0.0.0', '*')
+
+
+def loader_mask(mod: ModFile) -> int:
+    """获取 mod 的加载器掩码"""
+    mask = 0
+    for loader in mod.support_loaders():
+        mask |= LOADER_BITS.get(loader, 0)
+    return mask
+
+
+def mc_version_ranges(mod: ModFile) -> tuple[VersionRange, ...]:
+    """获取 mod 支持的 mc 版本范围们，不知道支持的版本时返回包含任何版本的范围"""
+    result: list[VersionRange] = []
+    for info in mod.mod_info:
+        mc_version = info.mc_version
+        if isinstance(mc_version, str) and mc_version.strip() in _UNKNOWN_MC_VERSIONS:
+            return (ANY_RANGE,)
+        mc_range = compile_range(mc_version, maven=info.loader == 'forge')
+        if mc_range not in result:
+            result.append(mc_range)
+    return tuple(result) or (ANY_RANGE,)
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """按从低到高的顺序遍历位集中为 1 的位的序号。
+    大整数的每次位运算都要处理整个整数，所以先转换成字符串再查找，而不是逐个去掉最低位
+    """
+    text = bin(bits)[:1:-1]
+    i = text.find('1')
+    while i >= 0:
+        yield i
+        i = text.find('1', i + 1)
+
+
+class ModFilter:
+    """mod 列表的筛选引擎，不涉及界面，只负责计算哪些槽位可见
+    """
+
+    def __init__(self) -> None:
+        self.mods: list[ModFile | None] = []
+        """槽位 -> mod，被删除的槽位为 None"""
+        self._slot_of: dict[int, int] = {}
+        """id(mod) -> 槽位"""
+        self.alive: int = 0
+        """有 mod 的槽位"""
+        self.loader_sets: dict[str, int] = {name: 0 for name in LOADER_BITS}
+        self.loader_sets['other'] = 0
+        self.version_groups: dict[tuple[VersionRange, ...], int] = {}
+        """mc 版本范围们 -> 使用这些范围的槽位"""
+        self._version_of: list[tuple[VersionRange, ...] | None] = []
+
+        self.loaders: set[str] = set(self.loader_sets)
+        """要显示的加载器，other 表示不支持 forge / fabric / quilt 的 mod"""
+        self.version: str = ''
+        """要显示的 mc 版本，空字符串表示不筛选"""
+        self.keyword_slots: int | None = None
+        """关键字匹配到的槽位，None 表示没有关键字"""
+        self.visible: int = 0
+        """上一次计算得到的可见槽位"""
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def slot_of(self, mod: ModFile) -> int | None:
+        return self._slot_of.get(id(mod))
+
+    def index_of(self, mod: ModFile, bits: int) -> int:
+        """mod 在按槽位顺序排列的位集 bits 中是第几个，不在其中时返回 -1。
+        传入 alive 得到在全部 mod 中的位置，传入 visible 得到在可见的 mod 中的位置
+        """
+        slot = self._slot_of.get(id(mod))
+        if slot is None or not bits >> slot & 1:
+            return -1
+        return (bits & ((1 << slot) - 1)).bit_count()
+
+    def add(self, mod: ModFile, keyword_match: bool = True) -> tuple[int, bool]:
+        """加入一个 mod，只对这一个 mod 判断是否可见，不会重新计算整个列表
+
+        Args:
+            mod: 新的 mod
+            keyword_match: mod 是否匹配当前的关键字，没有关键字时忽略
+
+        Returns:
+            (槽位, 在当前的筛选条件下是否可见)
+        """
+        slot = self._slot_of.get(id(mod))
+        if slot is not None:
+            return slot, bool(self.visible >> slot & 1)
+        self._compact_if_sparse()
+        slot = len(self.mods)
+        self.mods.append(mod)
+        self._version_of.append(None)
+        self._slot_of[id(mod)] = slot
+        bit = 1 << slot
+        self.alive |= bit
+
+        mask = loader_mask(mod)
+        for name, loader_bit in LOADER_BITS.items():
+            if mask & loader_bit:
+                self.loader_sets[name] |= bit
+        if not mask:
+            self.loader_sets['other'] |= bit
+        ranges = mc_version_ranges(mod)
+        self._version_of[slot] = ranges
+        self.version_groups[ranges] = self.version_groups.get(ranges, 0) | bit
+
+        if self.keyword_slots is not None and keyword_match:
+            self.keyword_slots |= bit
+        visible = self._slot_visible(slot, ranges)
+        if visible:
+            self.visible |= bit
+        return slot, visible
+
+    def remove(self, mod: ModFile) -> int | None:
+        """删除一个 mod，返回它原来的槽位"""
+        slot = self._slot_of.pop(id(mod), None)
+        if slot is None:
+            return None
+        mask = ~(1 << slot)
+        self.alive &= mask
+        self.visible &= mask
+        if self.keyword_slots is not None:
+            self.keyword_slots &= mask
+        for name in self.loader_sets:
+            self.loader_sets[name] &= mask
+        ranges = self._version_of[slot]
+        if ranges is not None:
+            group = self.version_groups[ranges] & mask
+            if group:
+                self.version_groups[ranges] = group
+            else:
+                del self.version_groups[ranges]
+        self._version_of[slot] = None
+        self.mods[slot] = None
+        return slot
+
+    def visible_mods(self) -> list[ModFile]:
+        """按加入的顺序获取上一次计算得到的可见的 mod"""
+        return [self.mods[slot] for slot in iter_bits(self.visible)]  # type: ignore
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def set_keyword_matches(self, mod_ids: set[int] | None) -> None:
+        """设置关键字匹配到的 mod（id(mod) 的集合），None 表示没有关键字"""
+        if mod_ids is None:
+            self.keyword_slots = None
+            return
+        bits = 0
+        for mod_id in mod_ids:
+            slot = self._slot_of.get(mod_id)
+            if slot is not None:
+                bits |= 1 << slot
+        self.keyword_slots = bits
+
+    def _loader_bits(self) -> int:
+        bits = 0
+        for name in self.loaders:
+            bits |= self.loader_sets.get(name, 0)
+        return bits
+
+    def _version_bits(self) -> int:
+        version = self.version.strip()
+        if not version:
+            return self.alive
+        bits = 0
+        for ranges, group in self.version_groups.items():
+            if any(r.contains(version) for r in ranges):
+                bits |= group
+        return bits
+
+    def compute(self) -> int:
+        """计算当前筛选条件下可见的槽位"""
+        bits = self.alive & self._loader_bits() & self._version_bits()
+        if self.keyword_slots is not None:
+            bits &= self.keyword_slots
+        return bits
+
+    def _slot_visible(self, slot: int, ranges: tuple[VersionRange, ...]) -> bool:
+        if not any(self.loader_sets.get(name, 0) >> slot & 1 for name in self.loaders):
+            return False
+        if self.keyword_slots is not None and not self.keyword_slots >> slot & 1:
+            return False
+        version = self.version.strip()
+        return not version or any(r.contains(version) for r in ranges)
+
+    def refresh(self) -> tuple[list[int], list[int]]:
+        """重新计算可见的槽位，返回 (变为可见的槽位们, 变为不可见的槽位们)，槽位是压缩之后的"""
+        self._compact_if_sparse()
+        visible = self.compute()
+        changed = visible ^ self.visible
+        self.visible = visible
+        return list(iter_bits(changed & visible)), list(iter_bits(changed & ~visible))
+
+    def _compact_if_sparse(self) -> None:
+        """被删除的槽位超过一半时压缩，每次压缩之前至少删除过一半的 mod，所以均摊下来是常数时间"""
+        if len(self.mods) > 2 * len(self._slot_of):
+            self.compact()
+
+    def compact(self) -> None:
+        """去掉被删除的槽位，剩下的 mod 按原来的顺序重新编号，之前得到的槽位都会失效"""
+        slots = list(iter_bits(self.alive))
+
+        def remap(bits: int) -> int:
+            # 和 iter_bits 一样按字符串处理，text[i] 是第 i 位
+            text = bin(bits)[:1:-1]
+            kept = ''.join(text[slot] if slot < len(text) else '0' for slot in reversed(slots))
+            return int(kept or '0', 2)
+
+        self.mods = [self.mods[slot] for slot in slots]
+        self._version_of = [self._version_of[slot] for slot in slots]
+        self._slot_of = {id(mod): slot for slot, mod in enumerate(self.mods)}
+        self.alive = (1 << len(slots)) - 1
+        self.visible = remap(self.visible)
+        if self.keyword_slots is not None:
+            self.keyword_slots = remap(self.keyword_slots)
+        self.loader_sets = {name: remap(bits) for name, bits in self.loader_sets.items()}
+        self.version_groups = {ranges: remap(bits) for ranges, bits in self.version_groups.items()}
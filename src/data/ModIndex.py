@@ -0,0 +1,92 @@
+"""mod id 到 mod 文件的索引。
+
+检查前置 mod 时需要对每个依赖按 id 查找 mod，逐个遍历 mod 列表（还要递归子 mod）的话整个检查是平方复杂度，
+所以每个游戏维护一个 id -> 顶层 ModFile 的字典，子 mod 的 id 和 provides 中的 id 都算作它所在的顶层 mod 的 id。
+"""
+from data.mod.ModFile import ModFile
+
+
+class ModIndex:
+    """mod id 到顶层 ModFile 的索引，mod 按对象本身（而不是内容）区分
+    """
+
+    def __init__(self, mods: list[ModFile] | None = None) -> None:
+        self._owners: dict[str, list[ModFile]] = {}
+        """mod id -> 拥有这个 id 的顶层 mod 们，直接声明这个 id 的 mod 排在前面"""
+        self._ids: dict[int, tuple[ModFile, dict[str, str]]] = {}
+        """id(mod) -> (mod, 索引中这个 mod 拥有的 id 们 -> 对应的版本)"""
+        for mod in mods or []:
+            self.add(mod)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, mod_id: str) -> bool:
+        return mod_id in self._owners
+
+    def add(self, mod: ModFile) -> None:
+        """把一个顶层 mod 加入索引，已经在索引中时什么也不做。
+        会访问依赖、子 mod 等字段，快速解析的 mod 会被完整解析。
+        """
+        if id(mod) in self._ids:
+            return
+        own_ids = set(mod.get_ids())
+        ids: dict[str, str] = {}
+        for info in mod.mod_info:
+            for mod_id, version in info.get_provided().items():
+                if mod_id:
+                    ids.setdefault(mod_id, version)
+        for mod_id in ids:
+            owners = self._owners.setdefault(mod_id, [])
+            if mod_id in own_ids:
+                owners.insert(0, mod)
+            else:
+                owners.append(mod)
+        self._ids[id(mod)] = (mod, ids)
+
+    def remove(self, mod: ModFile) -> None:
+        """从索引中删除一个 mod，不在索引中时什么也不做"""
+        entry = self._ids.pop(id(mod), None)
+        if entry is None:
+            return
+        for mod_id in entry[1]:
+            owners = [i for i in self._owners[mod_id] if i is not mod]
+            if owners:
+                self._owners[mod_id] = owners
+            else:
+                del self._owners[mod_id]
+
+    def __iter__(self):
+        """遍历索引中的全部 mod"""
+        return (mod for mod, _ in self._ids.values())
+
+    def has_mod(self, mod: ModFile) -> bool:
+        """某个 mod 对象是否在索引中"""
+        return id(mod) in self._ids
+
+    def get_provided(self, mod: ModFile) -> dict[str, str]:
+        """获取一个 mod 在索引中拥有的 id 们 -> 对应的版本，不在索引中时返回空字典"""
+        entry = self._ids.get(id(mod))
+        return entry[1] if entry else {}
+
+    def get_version(self, mod: ModFile, mod_id: str) -> str | None:
+        """获取某个 mod 中 id 为 mod_id 的（子）mod 的版本"""
+        return self.get_provided(mod).get(mod_id)
+
+    def clear(self) -> None:
+        self._owners.clear()
+        self._ids.clear()
+
+    def get_all(self, mod_id: str) -> list[ModFile]:
+        """获取拥有某个 id 的全部顶层 mod"""
+        return self._owners.get(mod_id, [])
+
+    def get(self, mod_id: str) -> ModFile | None:
+        """获取拥有某个 id 的顶层 mod，有多个时优先返回开启了的、直接声明这个 id 的 mod"""
+        owners = self._owners.get(mod_id)
+        if not owners:
+            return None
+        for mod in owners:
+            if mod.enabled:
+                return mod
+        return owners[0]
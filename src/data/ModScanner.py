@@ -0,0 +1,160 @@
+"""mod 扫描器，负责列出目录中的 mod 文件并（可选地）用进程池并行解析它们。
+
+解压 jar、解析 TOML/JSON 都是纯 python 的计算，多线程会被 GIL 卡住，所以这里使用进程池。
+解析结果总是按照文件名排序后的顺序返回，保证回调的触发顺序是确定的。
+"""
+import os
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+
+from data.mod.ModCache import (ModCache, NestedJarMemo, _tNestedResult, file_stat,
+                               get_nested_memo, set_nested_memo)
+from data.mod.ModFile import ModFile
+from data.mod import log
+from data import Trace
+
+
+def is_mod_file_name(file_name: str) -> bool:
+    """判断一个文件名是否是 mod 文件，仅 .jar 或 .jar.disabled 后缀的文件算作 mod
+    """
+    lf: str = file_name.lower()
+    return lf.endswith('.jar') or lf.endswith('.jar.disabled')
+
+
+def list_mod_files(root_dir: str) -> list[str]:
+    """列出一个目录下全部 mod 文件的完整路径，按文件名排序
+    """
+    with Trace.span('list_dir', dir=root_dir) as span:
+        result = [os.path.join(root_dir, name)
+                  for name in sorted(os.listdir(root_dir))
+                  if is_mod_file_name(name)]
+        span.set('count', len(result))
+    return result
+
+
+def get_worker_count(workers: int | None = None) -> int:
+    """获取实际使用的进程数
+
+    Args:
+        workers: 期望的进程数，None 表示使用设置中的 scan_workers，0 表示使用全部 cpu 核心。
+    """
+    if workers is None:
+        from data.Settings import settings
+        workers = settings.scan_workers
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+_tParseResult = tuple[ModFile | None, _tNestedResult]
+
+
+def _init_worker(nested_entries: dict, tracing: bool = False) -> None:
+    """子进程的初始化函数，让子进程也能用上已经缓存的子 jar，并和主进程一样开启或关闭性能追踪"""
+    set_nested_memo(NestedJarMemo(nested_entries))
+    Trace.enable(tracing)
+    # fork 出来的子进程会带着主进程还没有导出的事件，丢掉以免重复
+    Trace.take_events()
+
+
+def _create_mod(mod_file_path: str, quick: bool = False,
+                memo: NestedJarMemo | None = None) -> _tParseResult:
+    """在（子）进程中解析一个 mod 文件，出错时 mod 为 None。
+    同时返回这次解析中子 jar 备忘录的变化，交给主进程合并。
+
+    Args:
+        memo: 使用的子 jar 备忘录，None 表示使用进程池初始化时设置的备忘录（没有时使用一个空的）。
+            备忘录只在解析这一个文件期间设置为当前线程的备忘录，同一个线程中交替进行的扫描互不影响。
+    """
+    if memo is None:
+        memo = get_nested_memo() or NestedJarMemo()
+    old_memo = set_nested_memo(memo)
+    try:
+        mod = ModFile.create(mod_file_path, quick)
+    except Exception as e:
+        log.warning(f"解析 mod {mod_file_path} 时出现错误：{e}")
+        mod = None
+    finally:
+        set_nested_memo(old_memo)
+    return mod, memo.take_result()
+
+
+def _create_mod_in_worker(mod_file_path: str, quick: bool = False) -> tuple[ModFile | None, _tNestedResult, list]:
+    """在进程池中解析一个 mod 文件，额外返回子进程记录的性能追踪事件"""
+    mod, nested_result = _create_mod(mod_file_path, quick)
+    return mod, nested_result, Trace.take_events()
+
+
+def _parse_mod_files(mod_file_paths: list[str], workers: int | None = None,
+                     nested_entries: dict | None = None,
+                     quick: bool = False) -> Iterator[_tParseResult]:
+    """解析一组 mod 文件，按照传入的顺序依次产出结果，解析失败的文件产出的 mod 为 None
+    """
+    nested_entries = {} if nested_entries is None else nested_entries
+    workers = min(get_worker_count(workers), len(mod_file_paths))
+    if workers <= 1:
+        memo = NestedJarMemo(nested_entries)
+        for mod_file_path in mod_file_paths:
+            yield _create_mod(mod_file_path, quick, memo)
+        return
+
+    # 每个进程一次领取多个文件以减少进程间通信，但块不能太大，否则前面的回调要等很久
+    chunksize = max(1, len(mod_file_paths) // (workers * 8))
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=(nested_entries, Trace.is_enabled()))
+    try:
+        for mod, nested_result, events in pool.map(partial(_create_mod_in_worker, quick=quick),
+                                                   mod_file_paths, chunksize=chunksize):
+            if events:
+                Trace.add_events(events)
+            yield mod, nested_result
+    finally:
+        # 提前结束（例如加载被取消）时，还没有开始解析的文件不再解析
+        pool.shutdown(cancel_futures=True)
+
+
+def scan_mod_files(mod_file_paths: list[str], workers: int | None = None,
+                   cache: ModCache | None = None,
+                   quick: bool = False) -> Iterator[ModFile | None]:
+    """解析一组 mod 文件，按照传入的顺序依次产出结果，解析失败的文件产出 None
+
+    Args:
+        mod_file_paths: mod 文件的路径们
+        workers: 进程数，参考 get_worker_count。只有一个进程或只有一个文件时直接在当前进程中解析。
+        cache: mod 缓存，命中缓存的文件不会再被解析，新解析的文件和子 jar 会被放入缓存（但不会保存到文件），
+            命中情况记录在 cache.stats 中。没有缓存时子 jar 也只会在这次扫描中（每个进程）解析一次。
+        quick: 是否快速解析，参考 ModParserBase.parse。缓存中的 mod 无论是哪种解析都会直接使用。
+    """
+    if cache is None:
+        for mod, _ in _parse_mod_files(mod_file_paths, workers, quick=quick):
+            yield mod
+        return
+
+    # 先做一遍 stat，把没有命中缓存的文件一次性交给进程池，再按原来的顺序合并结果
+    hits: dict[str, ModFile] = {}
+    stats: dict[str, tuple[int, int, int]] = {}
+    miss_paths: list[str] = []
+    for mod_file_path in mod_file_paths:
+        try:
+            stat = file_stat(mod_file_path)
+        except OSError:
+            miss_paths.append(mod_file_path)
+            continue
+        stats[mod_file_path] = stat
+        if mod := cache.get(mod_file_path, stat):
+            hits[mod_file_path] = mod
+        else:
+            miss_paths.append(mod_file_path)
+
+    misses = _parse_mod_files(miss_paths, workers, cache.nested_snapshot(), quick)
+    for mod_file_path in mod_file_paths:
+        if mod_file_path in hits:
+            yield hits.pop(mod_file_path)
+            continue
+        mod, nested_result = next(misses)
+        cache.add_nested(nested_result)
+        if mod and mod_file_path in stats:
+            cache.put(mod, stats[mod_file_path])
+        yield mod
+    misses.close()
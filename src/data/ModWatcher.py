@@ -0,0 +1,464 @@
+"""mod 目录监听器，把 mods 目录里的文件变化（添加、删除、重命名、启用/禁用、内容修改）整理成增量。
+
+Linux 下使用 inotify 得知哪个目录发生了变化，其他平台（或 inotify 不可用时）定时轮询。
+不管哪种方式，真正的变化都是通过对比前后两次目录快照 (文件名 -> 大小、修改时间、inode) 得出的，
+一连串的事件会被合并成一次增量。增量在后台线程中产生，通过 dispatch 在调用者的线程中分发。
+新增和内容变化的文件需要重新解析，回调可以返回在后台线程中解析的 LoadTask（参考 start_mods_delta），
+任务结束之前同一个目录后面的增量会被暂缓，保证增量按顺序应用到 mod 列表上。
+"""
+import dataclasses
+import os
+import queue
+import select
+import struct
+import threading
+import time
+from functools import partial
+from typing import Callable, Iterator
+
+from data.LoadTask import LoadTask
+from data.mod import log
+from data.mod.ModCache import file_stat, get_mod_cache
+from data.mod.ModFile import ModFile
+from data.ModScanner import is_mod_file_name, scan_mod_files
+
+_tStat = tuple[int, int, int]
+_tSnapshot = dict[str, _tStat]
+_tHandler = Callable[['ModDirDelta'], 'LoadTask | None']
+
+
+@dataclasses.dataclass
+class ModDirDelta:
+    """一个 mods 目录的一次增量变化，路径都是完整路径"""
+    root_dir: str
+    added: list[str] = dataclasses.field(default_factory=list)
+    """新出现的文件"""
+    removed: list[str] = dataclasses.field(default_factory=list)
+    """消失的文件"""
+    moved: list[tuple[str, str]] = dataclasses.field(default_factory=list)
+    """(旧路径, 新路径)，重命名以及 .jar / .jar.disabled 之间的切换"""
+    changed: list[str] = dataclasses.field(default_factory=list)
+    """内容发生变化的文件"""
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.moved or self.changed)
+
+
+@dataclasses.dataclass
+class ModListChange:
+    """把增量应用到 mod 列表后，列表实际发生的变化"""
+    added: list[ModFile] = dataclasses.field(default_factory=list)
+    removed: list[ModFile] = dataclasses.field(default_factory=list)
+    moved: list[ModFile] = dataclasses.field(default_factory=list)
+    """文件路径改变了的 mod（包括启用、禁用），它们的 full_file_path 已经更新"""
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.moved)
+
+
+def snapshot_dir(root_dir: str) -> _tSnapshot:
+    """获取目录中 mod 文件的快照"""
+    result: _tSnapshot = {}
+    try:
+        names = os.listdir(root_dir)
+    except OSError:
+        return result
+    for name in names:
+        if not is_mod_file_name(name):
+            continue
+        try:
+            result[name] = file_stat(os.path.join(root_dir, name))
+        except OSError:
+            continue
+    return result
+
+
+def diff_snapshot(root_dir: str, old: _tSnapshot, new: _tSnapshot) -> ModDirDelta:
+    """对比两次快照得到增量，大小、修改时间和 inode 都相同的一删一增视为重命名"""
+    delta = ModDirDelta(root_dir)
+    removed = old.keys() - new.keys()
+    added = new.keys() - old.keys()
+
+    moved_from: dict[_tStat, str] = {old[n]: n for n in removed if old[n][2]}
+    for name in sorted(added):
+        if (old_name := moved_from.pop(new[name], None)) is not None:
+            removed.discard(old_name)
+            delta.moved.append((os.path.join(root_dir, old_name),
+                                os.path.join(root_dir, name)))
+        else:
+            delta.added.append(os.path.join(root_dir, name))
+    delta.removed = [os.path.join(root_dir, n) for n in sorted(removed)]
+    delta.changed = [os.path.join(root_dir, n)
+                     for n in sorted(old.keys() & new.keys()) if old[n] != new[n]]
+    return delta
+
+
+def _paths_of(mod_list: list[ModFile]) -> dict[str, ModFile]:
+    return {os.path.abspath(mod.full_file_path): mod for mod in mod_list}
+
+
+def reparse_paths(mod_list: list[ModFile], delta: ModDirDelta) -> list[str]:
+    """应用增量需要重新解析的文件：新增的、内容变化的，以及列表里没有的文件改名后的新路径"""
+    by_path = _paths_of(mod_list)
+    result = [new_path for old_path, new_path in delta.moved
+              if old_path not in by_path and new_path not in by_path]
+    result.extend(delta.changed)
+    result.extend(path for path in delta.added if path not in by_path)
+    return result
+
+
+def parse_mod_paths(paths: list[str], workers: int | None = 1) -> Iterator[tuple[str, ModFile | None]]:
+    """快速解析一组文件（需要依赖等信息时会自动完整解析），产出 (路径, mod)，结束后保存 mod 缓存"""
+    cache = get_mod_cache()
+    try:
+        yield from zip(paths, scan_mod_files(paths, workers, cache=cache, quick=True))
+    finally:
+        if cache:
+            cache.save()
+
+
+def apply_parsed_delta(mod_list: list[ModFile], delta: ModDirDelta,
+                       parsed: dict[str, ModFile | None]) -> ModListChange:
+    """用已经解析好的文件把增量应用到一个 mod 列表上，parsed 中没有的文件不会加入列表。
+    已经反映在列表里的变化（例如通过 ModFile.enabled 自己改的名）会被忽略。
+    """
+    change = ModListChange()
+    by_path = _paths_of(mod_list)
+
+    def _remove(path: str) -> None:
+        mod = by_path.pop(path, None)
+        if mod is not None:
+            remove_mod_by_identity(mod_list, mod)
+            change.removed.append(mod)
+
+    def _add(path: str) -> None:
+        mod = parsed.get(path)
+        if mod is not None and path not in by_path:
+            mod_list.append(mod)
+            by_path[path] = mod
+            change.added.append(mod)
+
+    for path in delta.removed:
+        _remove(path)
+    for old_path, new_path in delta.moved:
+        mod = by_path.pop(old_path, None)
+        if mod is not None:
+            mod.full_file_path = new_path
+            by_path[new_path] = mod
+            change.moved.append(mod)
+        else:
+            _add(new_path)
+    for path in delta.changed:
+        _remove(path)
+        _add(path)
+    for path in delta.added:
+        _add(path)
+    return change
+
+
+def index_by_identity(mod_list: list[ModFile], mod: ModFile) -> int:
+    """按对象查找 mod 在列表中的位置，不在列表中时返回 -1。
+    mod 的身份标识随路径变化（参考 ModFile.get_key），按对象查找不受启用、禁用和改名的影响
+    """
+    for i, m in enumerate(mod_list):
+        if m is mod:
+            return i
+    return -1
+
+
+def remove_mod_by_identity(mod_list: list[ModFile], mod: ModFile) -> bool:
+    """按对象从列表中删除一个 mod，返回是否删除了，按相等删除可能删错，参考 index_by_identity
+    """
+    i = index_by_identity(mod_list, mod)
+    if i < 0:
+        return False
+    del mod_list[i]
+    return True
+
+
+def apply_mods_delta(mod_list: list[ModFile], delta: ModDirDelta,
+                     workers: int | None = 1) -> ModListChange:
+    """把增量应用到一个 mod 列表上，只有新增和内容变化的文件会在当前线程中被重新解析。
+    界面线程中应当使用 start_mods_delta
+    """
+    paths = reparse_paths(mod_list, delta)
+    parsed = dict(parse_mod_paths(paths, workers)) if paths else {}
+    return apply_parsed_delta(mod_list, delta, parsed)
+
+
+def start_mods_delta(mod_list: list[ModFile], delta: ModDirDelta,
+                     on_change: Callable[[ModListChange], None]) -> LoadTask | None:
+    """在后台线程中重新解析需要解析的文件，解析完后在 drain 的调用者线程中把增量应用到列表上并调用 on_change。
+    不需要解析时直接应用并调用 on_change，返回 None
+    """
+    paths = reparse_paths(mod_list, delta)
+    if not paths:
+        on_change(apply_parsed_delta(mod_list, delta, {}))
+        return None
+
+    def _over(results: list[tuple[str, ModFile | None]]) -> None:
+        on_change(apply_parsed_delta(mod_list, delta, dict(results)))
+
+    def _failed(error: Exception) -> None:
+        # 删除和改名不需要解析，仍然要应用；没有解析出来的文件不会加入列表
+        _over(task.loaded)
+
+    task = LoadTask(partial(parse_mod_paths, paths), None, _over, _failed, name='ReparseMods')
+    return task.start()
+
+
+class _Inotify:
+    """通过 ctypes 调用 libc 的 inotify，只用来得知哪个目录发生了变化"""
+    _MASK = (0x00000002 | 0x00000004 | 0x00000008 | 0x00000040 |
+             0x00000080 | 0x00000100 | 0x00000200)
+    """IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE"""
+    _IN_Q_OVERFLOW = 0x00004000
+    _IN_IGNORED = 0x00008000
+    _HEADER = struct.Struct('iIII')
+
+    def __init__(self) -> None:
+        import ctypes
+        import ctypes.util
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd: int = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+        self.wd_to_dir: dict[int, str] = {}
+        self.lost: set[str] = set()
+        """监听已经失效的目录（例如目录被删除了），需要改为轮询"""
+
+    @staticmethod
+    def create() -> '_Inotify | None':
+        if not hasattr(os, 'O_CLOEXEC'):
+            return None
+        try:
+            return _Inotify()
+        except Exception as e:
+            log.info(f"inotify 不可用，改为轮询 mods 目录：{e}")
+            return None
+
+    def add(self, root_dir: str) -> bool:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root_dir), self._MASK)
+        if wd < 0:
+            return False
+        self.wd_to_dir[wd] = root_dir
+        return True
+
+    def remove(self, root_dir: str) -> None:
+        for wd, d in list(self.wd_to_dir.items()):
+            if d == root_dir:
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.wd_to_dir[wd]
+
+    def wait(self, timeout: float) -> set[str]:
+        """等待事件，返回发生变化的目录们"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        result: set[str] = set()
+        offset = 0
+        while offset + self._HEADER.size <= len(buf):
+            wd, mask, _, name_len = self._HEADER.unpack_from(buf, offset)
+            offset += self._HEADER.size + name_len
+            if mask & self._IN_Q_OVERFLOW:
+                return set(self.wd_to_dir.values())
+            if wd not in self.wd_to_dir:
+                continue
+            result.add(self.wd_to_dir[wd])
+            if mask & self._IN_IGNORED:
+                self.lost.add(self.wd_to_dir.pop(wd))
+        return result
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class ModWatcher:
+    """监听一组 mods 目录，变化会被整理成 ModDirDelta，通过 dispatch 分发给对应目录的回调
+    """
+
+    def __init__(self, poll_interval: float = 1.0, settle: float = 0.3, max_delay: float = 2.0,
+                 use_inotify: bool = True) -> None:
+        """
+        Args:
+            poll_interval: 轮询间隔（秒），inotify 不可用或某个目录无法用 inotify 监听时使用
+            settle: 一连串事件之间超过这个时间（秒）没有新事件才算结束，期间的事件会被合并
+            max_delay: 持续有事件时最多等待这么久（秒）也要产生一次增量
+            use_inotify: 是否尝试使用 inotify
+        """
+        self.poll_interval: float = poll_interval
+        self.settle: float = settle
+        self.max_delay: float = max_delay
+        self.handlers: dict[str, _tHandler] = {}
+        self.deltas: queue.Queue[ModDirDelta] = queue.Queue()
+        self._held: dict[str, list[ModDirDelta]] = {}
+        """目录 -> 已经产生但暂缓分发的增量们，只在 dispatch 的线程中使用"""
+        self._blockers: dict[str, list[tuple[LoadTask, bool]]] = {}
+        """目录 -> 还没有结束的任务们 (任务, 是否由 dispatch 取出结果)，结束之前暂缓分发这个目录的增量"""
+        self._snapshots: dict[str, _tSnapshot] = {}
+        self._polled: set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._inotify: _Inotify | None = _Inotify.create() if use_inotify else None
+        self._thread: threading.Thread | None = None
+
+    def watch(self, root_dir: str, handler: _tHandler) -> None:
+        """开始监听一个目录，目录不存在时会通过轮询等待它出现
+
+        Args:
+            root_dir: mods 目录
+            handler: 收到这个目录的增量时的回调，在 dispatch 的调用者线程中触发。
+                可以返回一个 LoadTask，dispatch 会负责取出它的结果，任务结束之前这个目录的增量会被暂缓
+        """
+        root_dir = os.path.abspath(root_dir)
+        with self._lock:
+            self.handlers[root_dir] = handler
+            if root_dir in self._snapshots:
+                return
+            self._snapshots[root_dir] = snapshot_dir(root_dir)
+            if not (self._inotify and self._inotify.add(root_dir)):
+                self._polled.add(root_dir)
+
+    def unwatch(self, root_dir: str) -> None:
+        """停止监听一个目录"""
+        root_dir = os.path.abspath(root_dir)
+        with self._lock:
+            self.handlers.pop(root_dir, None)
+            self._held.pop(root_dir, None)
+            self._snapshots.pop(root_dir, None)
+            self._polled.discard(root_dir)
+            if self._inotify:
+                self._inotify.remove(root_dir)
+
+    def hold(self, root_dir: str, task: LoadTask) -> None:
+        """在 task 结束（或被取消）之前暂缓分发 root_dir 的增量，之后按顺序分发。
+        用于在后台重新加载整个目录：加载期间的变化会应用到新的列表上，而不是马上被替换掉的旧列表。
+        task 的结果需要调用者自己取出（例如交给 StateWatcher.add_load_task），只在 dispatch 的线程中调用
+        """
+        self._blockers.setdefault(os.path.abspath(root_dir), []).append((task, False))
+
+    def busy(self) -> bool:
+        """是否有暂缓的增量或者正在重新解析的文件"""
+        return bool(self._held or self._blockers)
+
+    def watched_dirs(self) -> list[str]:
+        with self._lock:
+            return list(self.handlers.keys())
+
+    def start(self) -> None:
+        """启动后台监听线程"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='ModWatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台监听线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+    def _wait(self, timeout: float) -> set[str]:
+        if self._inotify:
+            return self._inotify.wait(timeout)
+        self._stop.wait(timeout)
+        return set()
+
+    def _run(self) -> None:
+        last_poll = time.monotonic()
+        while not self._stop.is_set():
+            dirty = self._wait(self.poll_interval)
+            if dirty:
+                # 合并一连串的事件，直到安静下来或者等待太久
+                deadline = time.monotonic() + self.max_delay
+                while time.monotonic() < deadline and not self._stop.is_set():
+                    more = self._wait(self.settle)
+                    if not more:
+                        break
+                    dirty |= more
+            if time.monotonic() - last_poll >= self.poll_interval:
+                last_poll = time.monotonic()
+                with self._lock:
+                    dirty |= self._polled
+                    self._retry_inotify()
+            for root_dir in dirty:
+                self.check(root_dir)
+
+    def _retry_inotify(self) -> None:
+        """失效的 inotify 监听改为轮询，轮询中的目录重新出现后再换回 inotify"""
+        if not self._inotify:
+            return
+        self._polled |= self._inotify.lost & self._snapshots.keys()
+        self._inotify.lost.clear()
+        for root_dir in list(self._polled):
+            if os.path.isdir(root_dir) and self._inotify.add(root_dir):
+                self._polled.discard(root_dir)
+
+    def check(self, root_dir: str) -> ModDirDelta | None:
+        """立即检查一个目录，有变化时把增量放入队列并返回"""
+        new = snapshot_dir(root_dir)
+        with self._lock:
+            old = self._snapshots.get(root_dir)
+            if old is None:
+                return None
+            self._snapshots[root_dir] = new
+        delta = diff_snapshot(root_dir, old, new)
+        if not delta:
+            return None
+        self.deltas.put(delta)
+        return delta
+
+    def dispatch(self) -> int:
+        """在当前线程中分发已经产生的增量，返回分发的数量。适合每帧调用一次。
+        先取出回调返回的任务的结果，有任务没有结束的目录的增量留到任务结束后再分发。
+        """
+        for root_dir, tasks in list(self._blockers.items()):
+            tasks = [(task, owned) for task, owned in tasks if not self._task_over(task, owned)]
+            if tasks:
+                self._blockers[root_dir] = tasks
+            else:
+                del self._blockers[root_dir]
+        while True:
+            try:
+                delta = self.deltas.get_nowait()
+            except queue.Empty:
+                break
+            self._held.setdefault(delta.root_dir, []).append(delta)
+
+        count = 0
+        for root_dir, deltas in list(self._held.items()):
+            while deltas and root_dir not in self._blockers:
+                delta = deltas.pop(0)
+                handler = self.handlers.get(root_dir)
+                if handler is None:
+                    continue
+                try:
+                    task = handler(delta)
+                except Exception as e:
+                    log.error(f"处理 {root_dir} 的文件变化时出现错误：{e}")
+                    task = None
+                if task is not None:
+                    self._blockers[root_dir] = [(task, True)]
+                count += 1
+            if not deltas:
+                del self._held[root_dir]
+        return count
+
+    @staticmethod
+    def _task_over(task: LoadTask, owned: bool) -> bool:
+        if not owned:
+            return task.finished or task.cancelled
+        try:
+            return task.drain()
+        except Exception as e:
+            log.error(f"应用 {task.name} 的结果时出现错误：{e}")
+            return True
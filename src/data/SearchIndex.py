@@ -0,0 +1,256 @@
+"""mod 的全文搜索索引。
+
+对名字、id、provides、作者和描述建立两层倒排索引：
+    - 词索引：把文本按非文字字符切分成词，词 -> 包含这个词的 mod
+    - 三元组索引：建立在词表上，三元组 -> 包含这个三元组的词。长关键字取各个三元组对应的词求交集，
+      就能找到包含这个子串的词；短关键字则在排好序的词表中查找前缀，再扫描词表找其它位置的子串
+找到的词对应的 mod 就是候选，最后在候选的文本中确认并计算相关程度。
+搜索的耗时只和词表大小以及匹配的数量有关，而不是 mod 数量乘以描述长度。
+
+加入索引的 mod 不会马上被分析（访问描述等字段会让快速解析的 mod 完整解析），
+而是在下一次搜索时才一次性加入索引，之后的增删都是增量的。
+"""
+import re
+from bisect import bisect_left
+from typing import Iterable
+
+from data.mod.ModFile import ModFile
+
+FIELD_WEIGHTS: dict[str, int] = {
+    'name': 8,
+    'mod_id': 6,
+    'provides': 4,
+    'authors': 2,
+    'description': 1,
+}
+"""各个字段的权重，关键字出现在权重高的字段中的 mod 排在前面"""
+
+_GRAM = 3
+_TOKEN = re.compile(r'[^\W_]+')
+
+_tField = tuple[int, str, frozenset[str]]
+"""(权重, 小写的文本, 文本中的词)"""
+
+
+def _normalize(text: str) -> str:
+    return text.lower()
+
+
+def _grams(text: str) -> set[str]:
+    return {text[i:i + _GRAM] for i in range(len(text) - _GRAM + 1)}
+
+
+def _doc_tokens(fields: list[_tField]) -> set[str]:
+    result: set[str] = set()
+    for _, _, tokens in fields:
+        result |= tokens
+    return result
+
+
+def _mod_fields(mod: ModFile) -> list[_tField]:
+    values: dict[str, list[str]] = {name: [] for name in FIELD_WEIGHTS}
+    for info in mod.mod_info:
+        values['name'].append(info.name)
+        values['mod_id'].append(info.mod_id)
+        values['provides'].extend(info.provide_mods_id)
+        values['authors'].extend(info.authors)
+        values['description'].append(info.description)
+    result: list[_tField] = []
+    for name, weight in FIELD_WEIGHTS.items():
+        text = _normalize('\n'.join(i for i in values[name] if i))
+        if text:
+            result.append((weight, text, frozenset(_TOKEN.findall(text))))
+    return result
+
+
+class SearchIndex:
+    """mod 搜索索引，mod 按对象本身（而不是内容）区分
+    """
+
+    def __init__(self, mods: Iterable[ModFile] = ()) -> None:
+        self._next_doc: int = 0
+        self._doc_of: dict[int, int] = {}
+        """id(mod) -> 文档编号"""
+        self._mods: dict[int, ModFile] = {}
+        """文档编号 -> mod，包括还没有分析的 mod"""
+        self._pending: set[int] = set()
+        """还没有分析的文档"""
+        self._fields: dict[int, list[_tField]] = {}
+        self._tokens: dict[str, set[int]] = {}
+        """词 -> 包含这个词的文档们"""
+        self._grams: dict[str, set[str]] = {}
+        """三元组 -> 包含这个三元组的词们"""
+        self._vocab: list[str] | None = None
+        """排好序的词表，用于前缀查找，词表变化后置为 None"""
+        for mod in mods:
+            self.add(mod)
+
+    def __len__(self) -> int:
+        return len(self._mods)
+
+    def add(self, mod: ModFile) -> None:
+        """把 mod 加入索引，已经在索引中时什么也不做。mod 会在下一次搜索时才被分析"""
+        if id(mod) in self._doc_of:
+            return
+        doc = self._next_doc
+        self._next_doc += 1
+        self._doc_of[id(mod)] = doc
+        self._mods[doc] = mod
+        self._pending.add(doc)
+
+    def remove(self, mod: ModFile) -> None:
+        """从索引中删除 mod，不在索引中时什么也不做"""
+        doc = self._doc_of.pop(id(mod), None)
+        if doc is None:
+            return
+        del self._mods[doc]
+        if doc in self._pending:
+            self._pending.discard(doc)
+            return
+        for token in _doc_tokens(self._fields.pop(doc)):
+            docs = self._tokens[token]
+            docs.discard(doc)
+            if docs:
+                continue
+            # 词不再出现在任何文档中，从词表和三元组索引中删除
+            del self._tokens[token]
+            self._vocab = None
+            for gram in _grams(token):
+                tokens = self._grams[gram]
+                tokens.discard(token)
+                if not tokens:
+                    del self._grams[gram]
+
+    def update(self, mod: ModFile) -> None:
+        """mod 的信息变化后（例如完整解析之后）重新分析"""
+        if id(mod) in self._doc_of:
+            self.remove(mod)
+            self.add(mod)
+
+    def clear(self) -> None:
+        self._doc_of.clear()
+        self._mods.clear()
+        self._pending.clear()
+        self._fields.clear()
+        self._tokens.clear()
+        self._grams.clear()
+        self._vocab = None
+
+    def _index_pending(self) -> None:
+        for doc in self._pending:
+            fields = _mod_fields(self._mods[doc])
+            self._fields[doc] = fields
+            for token in _doc_tokens(fields):
+                docs = self._tokens.get(token)
+                if docs is None:
+                    docs = self._tokens[token] = set()
+                    self._vocab = None
+                    for gram in _grams(token):
+                        self._grams.setdefault(gram, set()).add(token)
+                docs.add(doc)
+        self._pending.clear()
+
+    def _get_vocab(self) -> list[str]:
+        if self._vocab is None:
+            self._vocab = sorted(self._tokens)
+        return self._vocab
+
+    def _tokens_containing(self, piece: str) -> Iterable[str]:
+        """词表中包含 piece 的词"""
+        if len(piece) >= _GRAM:
+            postings = sorted((self._grams.get(g, set()) for g in _grams(piece)), key=len)
+            candidates = set(postings[0])
+            for tokens in postings[1:]:
+                candidates &= tokens
+            return (t for t in candidates if piece in t)
+        # 短的片段：前缀匹配的词在排好序的词表中是连续的一段，其它位置的子串只能扫描词表
+        vocab = self._get_vocab()
+        result: list[str] = []
+        i = bisect_left(vocab, piece)
+        while i < len(vocab) and vocab[i].startswith(piece):
+            result.append(vocab[i])
+            i += 1
+        result.extend(t for t in vocab if piece in t and not t.startswith(piece))
+        return result
+
+    def _candidates(self, term: str) -> set[int]:
+        """可能包含 term 的文档们，term 中的每一段文字都要出现在文档的某个词中"""
+        pieces = _TOKEN.findall(term)
+        if not pieces:
+            return set(self._fields)
+        result: set[int] | None = None
+        for piece in sorted(pieces, key=len, reverse=True):
+            docs: set[int] = set()
+            for token in self._tokens_containing(piece):
+                docs |= self._tokens[token]
+            result = docs if result is None else result & docs
+            if not result:
+                return set()
+        assert result is not None
+        return result
+
+    def _score(self, doc: int, term: str, word_start: re.Pattern) -> int:
+        score = 0
+        for weight, text, tokens in self._fields[doc]:
+            if term not in text:
+                continue
+            if term in tokens:
+                score += weight * 3
+            elif word_start.search(text):
+                score += weight * 2
+            else:
+                score += weight
+        return score
+
+    def search(self, query: str, limit: int | None = None) -> list[ModFile]:
+        """搜索 mod，按相关程度从高到低排序，相关程度相同时按加入索引的顺序。
+        关键字按空格分成多个词，mod 需要包含全部的词；每个词可以是整词、前缀或者任意子串，忽略大小写。
+        整词匹配比前缀匹配排名高，前缀匹配比其它位置的子串排名高，再按字段的权重（FIELD_WEIGHTS）累加。
+
+        Args:
+            query: 搜索关键字，为空时返回全部 mod
+            limit: 最多返回多少个结果，None 表示不限制
+        """
+        terms = _normalize(query).split()
+        if not terms:
+            result = list(self._mods.values())
+            return result if limit is None else result[:limit]
+        self._index_pending()
+
+        # 先处理最长的词（候选通常最少），后面的词只需要在已有的结果中确认
+        scores: dict[int, int] | None = None
+        for term in sorted(terms, key=len, reverse=True):
+            docs = self._candidates(term) if scores is None else set(scores)
+            word_start = re.compile(r'(?<![^\W_])' + re.escape(term))
+            new_scores: dict[int, int] = {}
+            for doc in docs:
+                score = self._score(doc, term, word_start)
+                if score:
+                    new_scores[doc] = score + (scores[doc] if scores else 0)
+            scores = new_scores
+            if not scores:
+                return []
+        assert scores is not None
+        ranked = sorted(scores, key=lambda doc: (-scores[doc], doc))  # type: ignore
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self._mods[doc] for doc in ranked]
+
+    def matches(self, mod: ModFile, query: str) -> bool:
+        """判断一个 mod 是否包含关键字中的全部词，不需要 mod 在索引中，关键字为空时总是返回 True"""
+        terms = _normalize(query).split()
+        if not terms:
+            return True
+        doc = self._doc_of.get(id(mod))
+        fields = self._fields.get(doc) if doc is not None else None
+        if fields is None:
+            fields = _mod_fields(mod)
+        return all(any(term in text for _, text, _ in fields) for term in terms)
+
+    def match_ids(self, query: str) -> set[int] | None:
+        """获取搜索结果中 mod 对象的 id(mod) 集合，用于快速判断某个 mod 是否被搜索到。
+        关键字为空时返回 None，表示全部匹配。
+        """
+        if not query.split():
+            return None
+        return {id(mod) for mod in self.search(query)}
@@ -10,7 +10,39 @@ class Settings:
     game_version_dir: str = "./.minecraft/versions"
     local_mods_dir: str = "./local_mods"
     global_size: float = 1
-    
+    scan_workers: int = 0
+    """扫描 mod 时使用的进程数，0 表示使用全部 cpu 核心，1 表示不使用进程池"""
+    mod_cache_file: str = "./mod_cache.pkl"
+    """mod 信息缓存文件，为空表示不使用缓存"""
+    mod_cache_check_hash: bool = False
+    """使用缓存前是否还要校验文件内容的哈希值，更可靠但需要读取整个文件"""
+    thumbnail_cache_dir: str = "./thumbnail_cache"
+    """mod 图标缩略图的缓存目录，为空表示不缓存"""
+    frame_budget_ms: int = 8
+    """每帧最多花多少毫秒把后台加载好的 mod 显示到界面上，超出的留到下一帧"""
+    idle_fps: int = 10
+    """没有输入也没有后台任务时的帧率"""
+    download_workers: int = 8
+    """同时进行的下载数量"""
+    download_per_host: int = 4
+    """每个网站同时进行的下载数量"""
+    download_retries: int = 3
+    """下载失败后最多重试的次数"""
+    download_segments: int = 4
+    """大文件最多分成几段并行下载"""
+    http_cache_dir: str = "./http_cache"
+    """网页请求的缓存目录，为空表示不缓存"""
+    http_cache_max_mb: int = 64
+    """网页请求缓存的大小上限（MB）"""
+    http_cache_ttl: int = 600
+    """网页没有说明缓存时间时缓存多少秒，过期后会向服务器确认是否有变化"""
+    search_prefetch_pages: int = 2
+    """浏览搜索结果时在后台预取后面的几页"""
+    search_window_pages: int = 6
+    """浏览搜索结果时最多在内存中保留几页"""
+    trace_file: str = ""
+    """不为空时记录扫描和解析 mod 的性能追踪，退出时以 Chrome trace 格式写入这个文件，参考 data.Trace"""
+
     def save(self):
         """保存设置"""
         with open(self._settings_file_path, 'w', encoding='utf-8') as f:
@@ -38,6 +70,8 @@ class Settings:
                     value = int(value)
                 elif SettingsFieldsTypeMap[key] == float:
                     value = float(value)
+                elif SettingsFieldsTypeMap[key] == bool:
+                    value = value == 'True'
                 res.__setattr__(key, value)
             return res
 
@@ -0,0 +1,133 @@
+"""扫描和解析 mod 时的性能追踪。
+
+在扫描目录、打开 jar、选择解析器、解析器的每个 get_ 方法、解析子 jar、读取游戏版本 json 等阶段外面套上 span，
+记录每一段的开始时间、用时和属性（文件、加载器、字节数等），最后导出为 Chrome 的 trace event 格式，
+可以用 chrome://tracing 或 https://ui.perfetto.dev 打开，看出到底是哪个 jar 的哪个阶段慢。
+
+默认关闭，关闭时 span 只返回一个共享的空对象，几乎没有开销。设置中的 trace_file 不为空时启动即开启，
+退出时写入这个文件；也可以直接调用 enable 和 export_chrome_trace。
+进程池中的子进程记录的事件会随解析结果一起传回主进程，参考 ModScanner。
+"""
+import json
+import os
+import threading
+from time import perf_counter_ns
+from typing import Any, Callable, TypeVar
+
+T = TypeVar('T')
+
+_tEvent = tuple[str, int, int, int, int, dict[str, Any]]
+"""(名字, 开始时间 ns, 用时 ns, 进程 id, 线程 id, 属性)"""
+
+_enabled: bool = False
+_events: list[_tEvent] = []
+"""已经结束的 span，list.append 是线程安全的"""
+
+
+class Span(object):
+    """一段正在记录的区间，作为上下文管理器使用，退出时记录下来"""
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name: str, args: dict[str, Any]) -> None:
+        self.name: str = name
+        self.args: dict[str, Any] = args
+        self.start: int = 0
+
+    def set(self, key: str, value: Any) -> None:
+        """设置一个属性，例如读取完成后才知道的字节数"""
+        self.args[key] = value
+
+    def __enter__(self) -> 'Span':
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        end = perf_counter_ns()
+        if exc_type is not None:
+            self.args['error'] = repr(exc)
+        _events.append((self.name, self.start, end - self.start,
+                        os.getpid(), threading.get_ident(), self.args))
+
+
+class _NoopSpan(object):
+    """关闭追踪时使用的空 span"""
+    __slots__ = ()
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> '_NoopSpan':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **args: Any) -> Span | _NoopSpan:
+    """创建一个 span，关闭追踪时返回共享的空 span
+
+        with span('open_jar', file=path) as s:
+            ...
+            s.set('bytes', size)
+    """
+    if not _enabled:
+        return _NOOP
+    return Span(name, args)
+
+
+def call(fun: Callable[[], T], **args: Any) -> T:
+    """调用一个无参函数并用以它的名字命名的 span 记录下来，用于解析器的 get_ 方法"""
+    if not _enabled:
+        return fun()
+    with Span(fun.__name__, args):
+        return fun()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable(enabled: bool = True) -> None:
+    """开启或关闭追踪，已经记录的事件不会被清除"""
+    global _enabled
+    _enabled = enabled
+
+
+def take_events() -> list[_tEvent]:
+    """取出并清空已经记录的事件"""
+    global _events
+    events, _events = _events, []
+    return events
+
+
+def add_events(events: list[_tEvent]) -> None:
+    """加入其它进程记录的事件"""
+    _events.extend(events)
+
+
+def to_chrome_trace(events: list[_tEvent]) -> dict:
+    """转换成 Chrome trace event 格式，每个 span 是一个 ph 为 X 的完整事件，时间单位是微秒。
+    perf_counter 在同一台机器的不同进程间是一致的，所以子进程的事件能和主进程的对齐
+    """
+    trace_events = []
+    for name, start, duration, pid, tid, args in events:
+        trace_events.append({
+            'name': name, 'cat': 'scan', 'ph': 'X',
+            'ts': start / 1000, 'dur': duration / 1000,
+            'pid': pid, 'tid': tid,
+            'args': {k: v if isinstance(v, (int, float, bool)) or v is None else str(v)
+                     for k, v in args.items()},
+        })
+    return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+
+def export_chrome_trace(file_path: str, events: list[_tEvent] | None = None) -> int:
+    """把事件（默认为取出的全部事件）写入 Chrome trace 文件，返回写入的事件数量"""
+    if events is None:
+        events = take_events()
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(to_chrome_trace(events), f, ensure_ascii=False)
+    return len(events)
@@ -1,51 +1,88 @@
 from os import listdir
-from os.path import isdir, join
+from functools import partial
+from os.path import abspath, basename, isdir, join
+
+from Utils import clear_file_path_suffix
 
 from data.Settings import settings
 from data.GameInfo import Game
 from data.mod.ModFile import ModFile
+from data.LoadTask import LoadTask
+from data.ModScanner import list_mod_files, scan_mod_files
+from data.mod.ModCache import get_mod_cache
+from data.ModWatcher import ModDirDelta, ModListChange, ModWatcher, start_mods_delta
 
-from typing import Callable
+from typing import Callable, Iterator
 
 ModInfoArray = list[ModFile]
 
 
+def iter_mods(root_dir: str,
+              workers: int | None = None,
+              use_cache: bool = True,
+              quick: bool = False,
+              ) -> Iterator[ModFile]:
+    """逐个产出一个目录下解析成功的 mod，参数参考 load_mods。
+    全部产出后才会清理并保存 mod 缓存，提前关闭生成器时不会保存；
+    出现错误时不清理，但是会保存已经解析好的文件，下次加载时不需要重新解析。
+    """
+    if not isdir(root_dir):
+        return
+    cache = get_mod_cache() if use_cache else None
+    mod_file_paths = list_mod_files(root_dir)
+    try:
+        for mod in scan_mod_files(mod_file_paths, workers, cache, quick):
+            if mod:
+                yield mod
+    except Exception:
+        if cache:
+            cache.save()
+        raise
+    if cache:
+        cache.prune(root_dir, mod_file_paths)
+        cache.save()
+
+
+def iter_full_mods(mods: list[ModFile]) -> Iterator[ModFile]:
+    """逐个完整解析快速解析的 mod 并产出，适合在后台线程中运行，已经完整的 mod 会被跳过。
+    补全的结果会写回 mod 缓存（参考 ModFile.load_full），全部补全后保存缓存。
+    """
+    for mod in mods:
+        if not mod.is_full:
+            mod.load_full()
+            yield mod
+    cache = get_mod_cache()
+    if cache:
+        cache.save()
+
+
 def load_mods(root_dir: str,
               on_load_one: Callable[[ModFile], None] | None = None,
               on_load_over: Callable[[list[ModFile]], None] | None = None,
+              workers: int | None = None,
+              use_cache: bool = True,
+              quick: bool = False,
               ) -> ModInfoArray:
     """加载一个目录下的全部 jar 格式的 mod 文件并返回，包含两个加载中的回调。
+    mod 文件会按文件名排序，并用进程池并行解析，回调总是在调用者的线程中按排序后的顺序触发。
+    没有变化的文件会直接从 mod 缓存中读取。
 
     Args:
         root_dir: mod 目录.
         on_load_one: 读取一个 mod 的回调.
         on_load_over: 读取结束后的回调.
+        workers: 解析用的进程数，None 表示使用设置中的 scan_workers，0 表示使用全部 cpu 核心.
+        use_cache: 是否使用 mod 缓存.
+        quick: 是否快速解析，快速解析的 mod 会在需要依赖、描述等信息时自动完整解析，参考 ModInfo.
 
     Returns:
         list[ModInfo]: ModInfo 列表
     """
     result: ModInfoArray = []
-    if not isdir(root_dir):
-        if on_load_over:
-            on_load_over(result.copy())
-        return result
-
-    mods_file_list = listdir(root_dir)
-
-    for mod_file_path in mods_file_list:
-        # 仅读取 .jar 或 .jar.disabled 后缀的文件
-        lf: str = mod_file_path.lower()
-        if not (lf.endswith('.jar') or lf.endswith('.jar.disabled')):
-            continue
-
-        try:
-            mod = ModFile.create(join(root_dir, mod_file_path))
-        except Exception:
-            continue
-        if on_load_one and mod:
+    for mod in iter_mods(root_dir, workers, use_cache, quick):
+        if on_load_one:
             on_load_one(mod)
-        if mod:
-            result.append(mod)
+        result.append(mod)
 
     if on_load_over:
         on_load_over(result.copy())
@@ -93,6 +130,10 @@ class ModManager:
         """仓库中的mod们"""
         self.games: list[Game] = []
         """游戏目录下的游戏们"""
+        self.watcher: ModWatcher | None = None
+        """mods 目录监听器，调用 start_watch 后才会创建"""
+        self.on_mods_changed: list[Callable[[Game | None, ModListChange], None]] = []
+        """监听到 mod 列表发生变化时的回调们，第一个参数为 None 表示仓库中的 mod 发生了变化"""
 
     @staticmethod
     def get():
@@ -117,15 +158,43 @@ class ModManager:
     def reload_local_mods(self,
                           on_load_one: Callable[[ModFile], None] | None = None,
                           on_load_over: Callable[[
-                              list[ModFile]], None] | None = None
-                          ) -> None:
-        """ 重新加载本地 mod 们
+                              list[ModFile]], None] | None = None,
+                          workers: int | None = None,
+                          quick: bool = False,
+                          background: bool = False,
+                          on_load_failed: Callable[[Exception], None] | None = None
+                          ) -> LoadTask[ModFile] | None:
+        """ 重新加载本地 mod 们，workers 和 quick 参考 load_mods
+
+        Args:
+            background: 是否在后台线程中加载，为 True 时返回已经启动的任务，
+                需要定期调用它的 drain 来触发回调，local_mods 在加载结束时才会更新，
+                任务被取消或失败时保持原来的列表。
+                加载期间仓库目录的变化会暂缓到加载结束（或取消、失败）后再应用
+            on_load_failed: 后台加载失败时的回调，这时不会调用 on_load_over，参考 LoadTask
         """
+        if background:
+            def _over(mods: list[ModFile]):
+                self.local_mods = mods
+                if self.watcher:
+                    self._update_watch_dirs()
+                if on_load_over:
+                    on_load_over(mods.copy())
 
+            task = LoadTask(partial(iter_mods, settings.local_mods_dir, workers, quick=quick),
+                            on_load_one, _over, on_load_failed, name='LoadLocalMods').start()
+            if self.watcher:
+                self.watcher.hold(settings.local_mods_dir, task)
+            return task
         self.local_mods.clear()
         self.local_mods = load_mods(settings.local_mods_dir,
                                     on_load_one=on_load_one,
-                                    on_load_over=on_load_over)
+                                    on_load_over=on_load_over,
+                                    workers=workers,
+                                    quick=quick)
+        if self.watcher:
+            self._update_watch_dirs()
+        return None
 
     def reload_games(self,
                      on_load_one: Callable[[Game], None] | None = None,
@@ -138,6 +207,8 @@ class ModManager:
         self.games = load_games(settings.game_version_dir,
                                 on_load_one=on_load_one,
                                 on_load_over=on_load_over)
+        if self.watcher:
+            self._update_watch_dirs()
 
     def add_mod(self, mod: ModFile) -> ModFile:
         """
@@ -147,13 +218,65 @@ class ModManager:
         Returns:
             list[ModInfo]: 添加完成的mod
         """
-        if mod in self.local_mods:
-            return mod
-        new_mod = mod.copy_to(settings.local_mods_dir)
-        new_mod.enabled = True
+        file_name = basename(clear_file_path_suffix(
+            mod.full_file_path, ['jar', 'disable', 'disabled'])) + '.jar'
+        target_path = abspath(join(settings.local_mods_dir, file_name))
+        # 仓库中已经有同名的 mod（无论是否禁用）时直接返回它
+        target_keys = {ModFile.get_path_key(target_path), ModFile.get_path_key(target_path + '.disabled')}
+        for local_mod in self.local_mods:
+            if local_mod.get_key() in target_keys:
+                return local_mod
+        new_mod = mod.copy_to(target_path)
         self.local_mods.append(new_mod)
         return new_mod
 
+    def start_watch(self) -> ModWatcher:
+        """开始在后台监听仓库目录和全部游戏的 mods 目录，需要定期调用 watcher.dispatch 来应用变化。
+        变化应用到 mod 列表后会触发 on_mods_changed 回调。
+        """
+        if self.watcher is None:
+            self.watcher = ModWatcher()
+            self._update_watch_dirs()
+            self.watcher.start()
+        return self.watcher
+
+    def stop_watch(self) -> None:
+        """停止监听 mods 目录"""
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+
+    def _update_watch_dirs(self) -> None:
+        """让监听的目录和当前的设置、游戏列表保持一致"""
+        assert self.watcher
+        wanted: dict[str, Game | None] = {
+            abspath(game.get_mods_dir()): game for game in self.games}
+        wanted[abspath(settings.local_mods_dir)] = None
+        for root_dir in self.watcher.watched_dirs():
+            if root_dir not in wanted:
+                self.watcher.unwatch(root_dir)
+        for root_dir, game in wanted.items():
+            self.watcher.watch(root_dir, partial(self._on_mods_dir_changed, game))
+
+    def _on_mods_dir_changed(self, game: Game | None, delta: ModDirDelta) -> LoadTask | None:
+        """在后台线程中解析新增的文件，返回的任务由 watcher.dispatch 取出结果"""
+        if game is not None:
+            return game.start_mods_delta(delta, partial(self._notify_mods_changed, game))
+        mods = self.local_mods
+
+        def _done(change: ModListChange) -> None:
+            # 解析期间仓库被重新加载时，变化已经反映在新的列表里了
+            if mods is self.local_mods:
+                self._notify_mods_changed(None, change)
+
+        return start_mods_delta(mods, delta, _done)
+
+    def _notify_mods_changed(self, game: Game | None, change: ModListChange) -> None:
+        if not change:
+            return
+        for callback in self.on_mods_changed:
+            callback(game, change)
+
 
 if __name__ == '__main__':
     mm = ModManager()
@@ -162,6 +285,7 @@ if __name__ == '__main__':
 
 
 __all__ = [
+    'iter_mods',
     'load_mods',
     'load_games',
     'Game',
@@ -0,0 +1,90 @@
+"""mod 图标的按需读取与缓存。
+
+扫描 mod 时只记录图标在 jar 中的文件名，第一次需要图标时才打开 jar 读取，
+读取到的内容放在一个按字节数限制大小的 LRU 缓存中。
+缓存的图标记录读取时（最外层）jar 文件的状态，文件被原地替换或者路径被别的文件重新使用后会重新读取。
+"""
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from data.mod import log
+from data.mod.JarView import open_mod_jar
+from data.mod.ModCache import file_stat
+
+if TYPE_CHECKING:
+    from data.mod.ModFile import ModFile
+
+_tKey = tuple[str, str]
+_tStat = tuple[int, int, int] | None
+
+
+def read_jar_entry(mod: 'ModFile', entry: str) -> bytes | None:
+    """读取 mod 文件中的一个文件，子 mod 会从外层 jar 中逐层打开
+
+    Args:
+        mod: mod 文件
+        entry: 文件在 jar 中的路径
+    """
+    try:
+        with open_mod_jar(mod) as jar:
+            return jar.read(entry)
+    except Exception as e:
+        log.info(f"读取 {mod.get_full_path()} 中的 {entry} 失败：{e}")
+        return None
+
+
+class IconCache:
+    """按字节数限制大小的图标 LRU 缓存
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024) -> None:
+        """
+        Args:
+            max_bytes: 缓存的图标总字节数上限
+        """
+        self.max_bytes: int = max_bytes
+        self.size: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self._icons: OrderedDict[_tKey, tuple[_tStat, bytes]] = OrderedDict()
+        """(完整路径, jar 中的路径) -> (读取时 jar 文件的状态, 图标)"""
+
+    def get(self, mod: 'ModFile', entry: str) -> bytes | None:
+        """获取 mod 的图标，不在缓存中或者 jar 文件已经变化时从 jar 中读取，读取失败返回 None"""
+        key = (mod.get_full_path(), entry)
+        stat = self._jar_stat(mod)
+        cached = self._icons.get(key)
+        if cached is not None and cached[0] == stat:
+            self.hits += 1
+            self._icons.move_to_end(key)
+            return cached[1] or None
+        self.misses += 1
+        if cached is not None:
+            del self._icons[key]
+            self.size -= len(cached[1])
+        icon = read_jar_entry(mod, entry) or b''
+        # 读取失败时缓存一个空值，避免每次都重新打开 jar
+        self._icons[key] = (stat, icon)
+        self.size += len(icon)
+        while self.size > self.max_bytes and len(self._icons) > 1:
+            _, (_, old) = self._icons.popitem(last=False)
+            self.size -= len(old)
+        return icon or None
+
+    @staticmethod
+    def _jar_stat(mod: 'ModFile') -> _tStat:
+        """mod 所在的最外层 jar 文件的状态，文件不存在时为 None"""
+        while mod.parent:
+            mod = mod.parent
+        try:
+            return file_stat(mod.full_file_path)
+        except OSError:
+            return None
+
+    def clear(self) -> None:
+        self._icons.clear()
+        self.size = 0
+
+
+icon_cache = IconCache()
+'''全局唯一的图标缓存'''
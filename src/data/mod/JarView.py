@@ -0,0 +1,171 @@
+"""jar 文件的只读视图，用于在不复制数据的情况下打开 jar 中的 jar（子 mod）。
+
+顶层 jar 文件会被 mmap 到内存中，并包装成 FileSlice 交给 ZipFile。
+jar 中不压缩存储 (stored) 的子 jar 在外层文件里是一段连续的字节，可以直接在同一个 mmap 上
+再开一个 FileSlice；压缩过的子 jar 则边解压边写入 SpooledTemporaryFile，小的留在内存，大的落到磁盘。
+"""
+import io
+import mmap
+import shutil
+import struct
+import tempfile
+from contextlib import contextmanager
+from typing import IO, TYPE_CHECKING, Iterator
+from zipfile import ZIP_STORED, ZipFile, ZipInfo
+
+if TYPE_CHECKING:
+    from data.mod.ModFile import ModFile
+
+_LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+"""zip 本地文件头，最后两个字段是文件名长度和扩展字段长度"""
+_LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+
+SPOOL_MAX_SIZE: int = 1 << 20
+"""解压子 jar 时超过这个大小（字节）就写入临时文件而不是留在内存中"""
+
+
+class FileSlice(io.RawIOBase):
+    """一段缓冲区（通常是 mmap）上的只读、可随机访问的有界视图，读取时只复制被读取的部分
+    """
+
+    def __init__(self, buffer: mmap.mmap | bytes, start: int = 0, size: int | None = None) -> None:
+        """
+        Args:
+            buffer: 底层缓冲区
+            start: 视图在缓冲区中的起始位置
+            size: 视图的大小，None 表示到缓冲区末尾
+        """
+        super().__init__()
+        self.buffer: mmap.mmap | bytes = buffer
+        self.start: int = start
+        self.size: int = len(buffer) - start if size is None else size
+        self.pos: int = 0
+        self.bytes_read: int = 0
+        """已经读取的字节数，用于性能追踪，参考 data.Trace"""
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self.pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"不支持的 whence: {whence}")
+        if pos < 0:
+            raise ValueError("不能 seek 到负数位置")
+        self.pos = pos
+        return pos
+
+    def read(self, size: int | None = -1) -> bytes:
+        end = self.size if size is None or size < 0 else min(self.size, self.pos + size)
+        if end <= self.pos:
+            return b''
+        data = self.buffer[self.start + self.pos:self.start + end]
+        self.bytes_read += end - self.pos
+        self.pos = end
+        return data
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def readinto(self, b) -> int:
+        data = self.read(len(b))
+        memoryview(b)[:len(data)] = data
+        return len(data)
+
+    def slice(self, start: int, size: int) -> 'FileSlice':
+        """在同一个缓冲区上创建一个子视图，start 相对于当前视图"""
+        return FileSlice(self.buffer, self.start + start, size)
+
+
+@contextmanager
+def open_jar_file(jar_path: str) -> Iterator[IO[bytes]]:
+    """打开一个 jar 文件，尽量以 mmap 的方式提供 FileSlice，不能 mmap（例如空文件）时返回普通文件对象
+    """
+    with open(jar_path, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            yield f
+            return
+        try:
+            yield FileSlice(mm)
+        finally:
+            mm.close()
+
+
+def _stored_data_offset(view: FileSlice, info: ZipInfo) -> int | None:
+    """获取一个不压缩的条目的数据在 view 中的起始位置，本地文件头异常时返回 None"""
+    header = view.buffer[view.start + info.header_offset:
+                         view.start + info.header_offset + _LOCAL_HEADER.size]
+    if len(header) != _LOCAL_HEADER.size:
+        return None
+    fields = _LOCAL_HEADER.unpack(header)
+    if fields[0] != _LOCAL_HEADER_SIGNATURE:
+        return None
+    offset = info.header_offset + _LOCAL_HEADER.size + fields[-2] + fields[-1]
+    if offset + info.file_size > view.size:
+        return None
+    return offset
+
+
+def open_nested_jar(jar: ZipFile, name: str) -> IO[bytes]:
+    """打开 jar 中的一个子 jar，返回可以交给 ZipFile 的文件对象，用完后需要关闭。
+
+    不压缩的条目直接返回外层缓冲区上的 FileSlice，不复制任何数据；
+    压缩过的条目流式解压到 SpooledTemporaryFile 中。
+    """
+    info = jar.getinfo(name)
+    if isinstance(jar.fp, FileSlice) and info.compress_type == ZIP_STORED \
+            and not info.flag_bits & 0x1:
+        offset = _stored_data_offset(jar.fp, info)
+        if offset is not None:
+            return jar.fp.slice(offset, info.file_size)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    try:
+        with jar.open(info, 'r') as f:
+            shutil.copyfileobj(f, spool, 1 << 16)
+    except Exception:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool  # type: ignore
+
+
+@contextmanager
+def open_mod_jar(mod: 'ModFile') -> Iterator[ZipFile]:
+    """以 ZipFile 打开一个 mod 文件，子 mod 会从最外层的 jar 开始逐层打开
+    """
+    chain: list['ModFile'] = []
+    current: 'ModFile | None' = mod
+    while current is not None:
+        chain.append(current)
+        current = current.parent
+    chain.reverse()
+
+    with open_jar_file(chain[0].full_file_path) as f:
+        with ZipFile(f) as jar:
+            with _open_chain(jar, chain[1:]) as target:
+                yield target
+
+
+@contextmanager
+def _open_chain(jar: ZipFile, nested: list['ModFile']) -> Iterator[ZipFile]:
+    if not nested:
+        yield jar
+        return
+    with open_nested_jar(jar, nested[0].full_file_path) as f:
+        with ZipFile(f) as nested_jar:
+            with _open_chain(nested_jar, nested[1:]) as target:
+                yield target
@@ -0,0 +1,334 @@
+"""mod 信息的持久化缓存。
+
+缓存以文件的完整路径为键，记录文件的 (大小, 修改时间, inode) 以及可选的内容哈希，
+文件没有变化时直接使用缓存中解析好的 ModFile，不再打开 jar 文件。
+
+同一个整合包里经常有很多 mod 内嵌了同样的子 jar（fabric-api 的模块、cloth-config 等），
+NestedJarMemo 以子 jar 在 zip 中央目录里的 (CRC32, 解压后大小, 文件名) 为键记住解析结果，
+每个不同的子 jar 在一次扫描中只解析一次，结果也会随 ModCache 一起保存。
+"""
+import dataclasses
+import hashlib
+import os
+import pickle
+import threading
+
+from data.mod import log
+from data.mod.ModFile import ModFile
+
+CACHE_VERSION = 5
+"""缓存格式版本，修改了解析器、ModFile 或 ModInfo 的结构时必须增加这个数字，旧的缓存会被整体丢弃"""
+
+NESTED_MAX_ENTRIES = 8192
+"""持久化的子 jar 缓存超过这个数量时，保存时只保留本次运行中用到过的"""
+
+_tStat = tuple[int, int, int]
+_tEntry = tuple[_tStat, str, bytes]
+"""(文件状态, 内容哈希, pickle 后的 ModFile)"""
+_tNestedKey = tuple[int, int, str]
+"""(CRC32, 解压后大小, 在 jar 中的文件名)"""
+_tNestedResult = tuple[dict[_tNestedKey, bytes], set[_tNestedKey], int, int]
+"""(新增的解析结果, 用到过的键, 命中次数, 未命中次数)"""
+
+
+@dataclasses.dataclass
+class ScanStats:
+    """扫描统计，包括 mod 缓存和子 jar 缓存的命中情况"""
+    hits: int = 0
+    """命中次数"""
+    misses: int = 0
+    """没有缓存的次数"""
+    stale: int = 0
+    """有缓存但文件已经变化的次数，同时也会计入 misses"""
+    nested_hits: int = 0
+    """子 jar 直接使用已有解析结果的次数"""
+    nested_misses: int = 0
+    """子 jar 需要解析的次数"""
+
+    def reset(self) -> None:
+        self.hits = self.misses = self.stale = 0
+        self.nested_hits = self.nested_misses = 0
+
+    @property
+    def nested_hit_rate(self) -> float:
+        total = self.nested_hits + self.nested_misses
+        return self.nested_hits / total if total else 0.0
+
+
+class NestedJarMemo:
+    """子 jar 解析结果的备忘录，保存的是去掉 parent 后 pickle 的 ModFile
+    """
+
+    def __init__(self, entries: dict[_tNestedKey, bytes] | None = None) -> None:
+        """
+        Args:
+            entries: 已有的解析结果，会被直接使用（新的结果也会写进去）而不是复制
+        """
+        self.entries: dict[_tNestedKey, bytes] = {} if entries is None else entries
+        self.added: dict[_tNestedKey, bytes] = {}
+        """本备忘录新增的解析结果"""
+        self.used: set[_tNestedKey] = set()
+        """本备忘录用到过的键"""
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, key: _tNestedKey) -> ModFile | None:
+        """获取一个子 jar 的解析结果，每次返回新的对象，调用者需要自己设置 parent"""
+        blob = self.entries.get(key)
+        if blob is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.used.add(key)
+        return pickle.loads(blob)
+
+    def put(self, key: _tNestedKey, mod: ModFile) -> None:
+        parent, mod.parent = mod.parent, None
+        try:
+            blob = pickle.dumps(mod, pickle.HIGHEST_PROTOCOL)
+        finally:
+            mod.parent = parent
+        self.entries[key] = blob
+        self.added[key] = blob
+        self.used.add(key)
+
+    def take_result(self) -> '_tNestedResult':
+        """取出并清空新增的结果、用到过的键和命中统计，用于把子进程中的结果交回主进程"""
+        result = (self.added, self.used, self.hits, self.misses)
+        self.added = {}
+        self.used = set()
+        self.hits = self.misses = 0
+        return result
+
+
+_NESTED_MEMO = threading.local()
+"""每个线程各自的子 jar 备忘录，后台加载和界面线程中的重新解析可能同时进行"""
+
+
+def get_nested_memo() -> NestedJarMemo | None:
+    """获取当前线程正在使用的子 jar 备忘录，没有在解析时返回 None"""
+    return getattr(_NESTED_MEMO, 'memo', None)
+
+
+def set_nested_memo(memo: NestedJarMemo | None) -> NestedJarMemo | None:
+    """设置当前线程使用的子 jar 备忘录，返回之前的备忘录"""
+    old = getattr(_NESTED_MEMO, 'memo', None)
+    _NESTED_MEMO.memo = memo
+    return old
+
+
+def file_stat(file_path: str) -> _tStat:
+    """获取用于校验缓存的文件状态 (大小, 纳秒修改时间, inode)"""
+    st = os.stat(file_path)
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+def file_hash(file_path: str) -> str:
+    """计算文件内容的哈希值"""
+    h = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ModCache:
+    """mod 信息缓存，第一次使用时才会读取缓存文件。
+    后台加载和监听器可能在不同的线程中同时使用同一个缓存，读写都在锁内进行。
+    """
+
+    def __init__(self, cache_file_path: str, check_hash: bool = False) -> None:
+        """
+        Args:
+            cache_file_path: 缓存文件路径
+            check_hash: 命中缓存前是否还要校验文件内容的哈希值
+        """
+        self.cache_file_path: str = cache_file_path
+        self.check_hash: bool = check_hash
+        self.stats: ScanStats = ScanStats()
+        self._entries: dict[str, _tEntry] | None = None
+        self._nested: dict[_tNestedKey, bytes] = {}
+        self._nested_used: set[_tNestedKey] = set()
+        self._dirty: bool = False
+        self._lock = threading.RLock()
+
+    @property
+    def entries(self) -> dict[str, _tEntry]:
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            assert self._entries is not None
+            return self._entries
+
+    @property
+    def nested(self) -> dict[_tNestedKey, bytes]:
+        """持久化的子 jar 解析结果"""
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            return self._nested
+
+    def nested_snapshot(self) -> dict[_tNestedKey, bytes]:
+        """子 jar 解析结果的副本，交给一次扫描使用，新的结果通过 add_nested 合并回来"""
+        with self._lock:
+            return dict(self.nested)
+
+    def _load(self) -> None:
+        self._entries = {}
+        if not os.path.isfile(self.cache_file_path):
+            return
+        try:
+            with open(self.cache_file_path, 'rb') as f:
+                root: dict = pickle.load(f)
+        except Exception as e:
+            log.warning(f"读取 mod 缓存 {self.cache_file_path} 失败，将重新建立缓存：{e}")
+            return
+        if root.get('version') != CACHE_VERSION:
+            log.info(f"mod 缓存版本 {root.get('version')} 已过期，将重新建立缓存")
+            return
+        self._entries = root.get('entries', {})
+        self._nested = root.get('nested', {})
+
+    def add_nested(self, result: _tNestedResult) -> None:
+        """合并一次扫描中新解析的子 jar 结果和统计，参考 NestedJarMemo.take_result"""
+        added, used, hits, misses = result
+        with self._lock:
+            if added:
+                self.nested.update(added)
+                self._dirty = True
+            self._nested_used |= used
+            self.stats.nested_hits += hits
+            self.stats.nested_misses += misses
+
+    def get(self, file_path: str, stat: _tStat | None = None) -> ModFile | None:
+        """获取缓存的 mod，没有缓存或文件已经改变时返回 None。
+        每次都会返回新的 ModFile 对象，调用者可以随意修改。
+
+        Args:
+            file_path: mod 文件路径
+            stat: 已经获取好的文件状态，为 None 时自动获取
+        """
+        key = os.path.abspath(file_path)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        cached_stat, digest, blob = entry
+        try:
+            if stat is None:
+                stat = file_stat(key)
+            if cached_stat != stat or (self.check_hash and digest != file_hash(key)):
+                self.stats.misses += 1
+                self.stats.stale += 1
+                return None
+            mod: ModFile = pickle.loads(blob)
+        except Exception:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return mod
+
+    def put(self, mod: ModFile, stat: _tStat | None = None) -> None:
+        """缓存一个顶层 mod
+
+        Args:
+            mod: 要缓存的 mod
+            stat: 解析之前获取的文件状态，为 None 时自动获取
+        """
+        key = os.path.abspath(mod.full_file_path)
+        try:
+            if stat is None:
+                stat = file_stat(key)
+            digest = file_hash(key) if self.check_hash else ''
+            blob = pickle.dumps(mod, pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            log.warning(f"缓存 mod {key} 失败：{e}")
+            return
+        with self._lock:
+            self.entries[key] = (stat, digest, blob)
+            self._dirty = True
+
+    def promote(self, mod: ModFile, stat: _tStat) -> None:
+        """用完整解析后的 mod 替换缓存中同一个文件的（快速解析的）结果，下次加载时不需要再完整解析。
+        只在缓存的文件状态仍然是 stat 时替换，文件已经变化或者不在缓存中时什么也不做。
+        和 put 一样只修改内存中的缓存，随下一次 save 写入文件
+
+        Args:
+            mod: 已经完整解析的顶层 mod
+            stat: 完整解析之前获取的文件状态
+        """
+        key = os.path.abspath(mod.full_file_path)
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry is None or entry[0] != stat:
+            return
+        try:
+            blob = pickle.dumps(mod, pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            log.warning(f"缓存 mod {key} 失败：{e}")
+            return
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == stat:
+                self.entries[key] = (stat, entry[1], blob)
+                self._dirty = True
+
+    def prune(self, root_dir: str, keep: list[str]) -> None:
+        """删除某个目录下已经不存在的 mod 的缓存
+
+        Args:
+            root_dir: mod 目录
+            keep: 这个目录下仍然存在的 mod 文件
+        """
+        root_dir = os.path.abspath(root_dir)
+        keep_set = {os.path.abspath(i) for i in keep}
+        with self._lock:
+            for key in list(self.entries.keys()):
+                if os.path.dirname(key) == root_dir and key not in keep_set:
+                    del self.entries[key]
+                    self._dirty = True
+
+    def clear(self) -> None:
+        """清空全部缓存"""
+        with self._lock:
+            self._entries = {}
+            self._nested = {}
+            self._dirty = True
+
+    def save(self) -> None:
+        """有修改时把缓存写入文件，先写临时文件再替换，避免写一半时崩溃导致缓存损坏"""
+        with self._lock:
+            self._save()
+
+    def _save(self) -> None:
+        if not self._dirty or self._entries is None:
+            return
+        if len(self._nested) > NESTED_MAX_ENTRIES:
+            self._nested = {k: v for k, v in self._nested.items()
+                            if k in self._nested_used}
+        temp_path = self.cache_file_path + '.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                pickle.dump({'version': CACHE_VERSION, 'entries': self._entries,
+                             'nested': self._nested},
+                            f, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.cache_file_path)
+        except Exception as e:
+            log.warning(f"保存 mod 缓存 {self.cache_file_path} 失败：{e}")
+            return
+        self._dirty = False
+
+
+_MOD_CACHE: ModCache | None = None
+
+
+def get_mod_cache() -> ModCache | None:
+    """获取全局的 mod 缓存，设置中没有配置缓存文件时返回 None"""
+    global _MOD_CACHE
+    from data.Settings import settings
+    if not settings.mod_cache_file:
+        return None
+    if _MOD_CACHE is None or _MOD_CACHE.cache_file_path != settings.mod_cache_file:
+        _MOD_CACHE = ModCache(settings.mod_cache_file)
+    _MOD_CACHE.check_hash = settings.mod_cache_check_hash
+    return _MOD_CACHE
@@ -6,43 +6,56 @@ from zipfile import ZipFile
 from Utils import LoaderType, clear_file_path_suffix
 from data.mod.ModInfo import ModInfo
 from data.mod import log
+from data import Trace
 import os
+import threading
 
 
 _tModFile_None = Union[None, 'ModFile']
 
+_FULL_LOCK = threading.RLock()
+"""后台补全 mod 时界面线程也可能访问同一个 mod 的字段，同一时间只让一个线程完整解析"""
 
-@dataclass
+
+@dataclass(eq=False)
 class ModFile(object):
+    """一个 mod 文件（或 jar 中的子 mod），相等和哈希只取决于 get_key，参考 get_key
+    """
     full_file_path: str
     mod_info: list[ModInfo]
     parent: _tModFile_None = None
 
     @staticmethod
-    def create_by_bytes(jar_bytes: IO[bytes], full_file_path: str) -> 'ModFile':
+    def create_by_bytes(jar_bytes: IO[bytes], full_file_path: str, quick: bool = False) -> 'ModFile':
         """从内存创建
 
         Args:
             full_file_path (str): 该 mod 文件的完整路径
+            quick (bool): 是否快速解析，参考 ModParserBase.parse
         """
 
         result = ModFile(
             full_file_path=full_file_path,
             mod_info=[]
         )
-        jar_zip: ZipFile = ZipFile(jar_bytes)
-
-        from data.mod.parser import PARSERS
-        for parser in PARSERS:
-            if not parser.supported(jar_zip):
-                continue
-            try:
-                info = parser(jar_zip, result).parse()
-                if info:
-                    result.mod_info.append(info)
-            except Exception as e:
-                log.error(
-                    f"使用 {parser} 解析 mod {full_file_path} 出现错误：")
+        from data.mod.parser import get_parsers
+        with Trace.span('open_zip', file=full_file_path):
+            jar_zip = ZipFile(jar_bytes)
+        with jar_zip:
+            with Trace.span('select_parsers', file=full_file_path) as span:
+                parsers = get_parsers(jar_zip)
+                span.set('parsers', ','.join(i.__name__ for i in parsers))
+            for parser in parsers:
+                try:
+                    with Trace.span('parse', file=full_file_path, parser=parser.__name__) as span:
+                        instance = parser(jar_zip, result)
+                        span.set('loader', instance.loader)
+                        info = instance.parse(quick)
+                    if info:
+                        result.mod_info.append(info)
+                except Exception as e:
+                    log.error(
+                        f"使用 {parser} 解析 mod {full_file_path} 出现错误：")
 
         if not result.mod_info:
             log.warning(
@@ -50,16 +63,62 @@ class ModFile(object):
         return result
 
     @staticmethod
-    def create(jar_path: str) -> _tModFile_None:
-        """从文件创建
+    def create(jar_path: str, quick: bool = False) -> _tModFile_None:
+        """从文件创建，quick 参考 ModParserBase.parse
         """
         if not os.path.isfile(jar_path):
             log.warn("不能创建 ModField，因为 {jar_path} 不是文件。")
             return None
-        with open(jar_path, 'rb') as f:
-            mod = ModFile.create_by_bytes(f, os.path.abspath(jar_path))
+        from data.mod.JarView import open_jar_file
+        with Trace.span('mod_file', file=jar_path, quick=quick) as span:
+            with open_jar_file(jar_path) as f:
+                mod = ModFile.create_by_bytes(f, os.path.abspath(jar_path), quick)
+                span.set('bytes_read', getattr(f, 'bytes_read', None))
         return mod
 
+    @property
+    def is_full(self) -> bool:
+        """是否已经完整解析，不会触发完整解析"""
+        return all(info.is_full for info in self.mod_info)
+
+    def load_full(self) -> None:
+        """把快速解析得到的 mod 信息补全为完整解析，访问 ModInfo 中缺少的字段时会自动调用。
+        jar 无法读取时用空值补全，不会反复尝试。
+        顶层 mod 完整解析的结果会写回 mod 缓存（参考 ModCache.promote），之后的会话不需要再次完整解析。
+        """
+        if self.is_full:
+            return
+        with _FULL_LOCK:
+            if not self.is_full:
+                self._load_full()
+
+    def _load_full(self) -> None:
+        from data.mod.JarView import open_mod_jar
+        from data.mod.ModCache import file_stat, get_mod_cache
+        from data.mod.parser import get_parsers
+        log.info(f"完整解析 mod {self.get_full_path()}")
+        stat = None
+        try:
+            if self.parent is None:
+                stat = file_stat(self.full_file_path)
+            with open_mod_jar(self) as jar:
+                for parser_type in get_parsers(jar):
+                    parser = parser_type(jar, self)
+                    targets = [info for info in self.mod_info
+                               if not info.is_full and info.loader == parser.loader]
+                    if not targets:
+                        continue
+                    full = parser.parse()
+                    for info in targets:
+                        info.fill_full(full)
+        except Exception as e:
+            log.warning(f"完整解析 mod {self.get_full_path()} 失败：{e}")
+            stat = None
+        for info in self.mod_info:
+            info.fill_full()
+        if stat is not None and (cache := get_mod_cache()) is not None:
+            cache.promote(self, stat)
+
     def support_loaders(self) -> list[LoaderType]:
         """获取支持的 mod 加载器
         """
@@ -167,13 +226,46 @@ class ModFile(object):
             return self.parent.get_full_path() + ":" + self.full_file_path
         return self.full_file_path
 
+    def __str__(self) -> str:
+        """完整路径，可以直接作为 % 格式的日志参数，只有真正输出日志时才会拼接"""
+        return self.get_full_path()
+
     def delete_file(self):
         """删除 mod 文件
         """
         os.remove(self.full_file_path)
 
+    def get_key(self) -> str:
+        """获取 mod 的身份标识：顶层 mod 是（normcase 后的）完整路径，子 mod 是所在 mod 的标识加上在 jar 中的路径。
+        同一个目录中的 a.jar 和 a.jar.disabled 是不同的 mod。
+        启用、禁用或者移动 mod 会改变这个值，所以改名后还要找到同一个 mod 的地方应当用 id(mod) 作为键。
+        计算结果缓存在对象上，路径变化后才重新计算。
+        """
+        parent_key = self.parent.get_key() if self.parent else None
+        cached = self.__dict__.get('_key')
+        if cached is not None and cached[0] is self.full_file_path and cached[1] is parent_key:
+            return cached[2]
+        if parent_key is not None:
+            key = parent_key + ":" + self.full_file_path
+        else:
+            key = ModFile.get_path_key(self.full_file_path)
+        self.__dict__['_key'] = (self.full_file_path, parent_key, key)
+        return key
+
+    @staticmethod
+    def get_path_key(file_path: str) -> str:
+        """获取某个路径上的顶层 mod 的身份标识，参考 get_key"""
+        return os.path.normcase(file_path)
+
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, ModFile):
+            return NotImplemented
+        return self.get_key() == other.get_key()
+
     def __hash__(self) -> int:
-        return hash(self.get_full_path)
+        return hash(self.get_key())
 
     def get_names(self) -> list[str]:
         """获取不重复 mod 名称列表
@@ -193,12 +285,28 @@ class ModFile(object):
                 result.append(info.mod_id)
         return result
 
-    def get_icon(self) -> bytes | None:
+    def get_icon_entry(self) -> str | None:
+        """获取图标在 jar 中的文件名，不读取文件
+        """
         for info in self.mod_info:
             if info.icon:
                 return info.icon
         return None
 
+    def has_icon(self) -> bool:
+        """是否有图标，不读取文件
+        """
+        return self.get_icon_entry() is not None
+
+    def get_icon(self) -> bytes | None:
+        """获取图标内容，第一次获取时才会从 jar 中读取，之后从图标缓存中获取
+        """
+        entry = self.get_icon_entry()
+        if entry is None:
+            return None
+        from data.mod.IconCache import icon_cache
+        return icon_cache.get(self, entry)
+
 
 if __name__ == '__main__':
     mod = ModFile.create(
@@ -1,4 +1,5 @@
 from Utils import LoaderType
+from Version import ANY_RANGE, VersionRange
 import dataclasses
 
 from typing import TYPE_CHECKING, Union
@@ -11,30 +12,81 @@ class ModDepend(object):
     mod_id: str
     mandatory: bool
     version_range: str = ''
+    """用于显示的版本范围"""
     ordering: str = ''
     side: str = ''
+    range: VersionRange = ANY_RANGE
+    """编译好的版本范围，由解析器根据 mod 信息中的原始范围生成"""
 
+    def accepts(self, version: str) -> bool:
+        """判断某个版本的 mod 能否满足这个依赖"""
+        return self.range.contains(version)
 
-@dataclasses.dataclass
+
+FULL_FIELDS: tuple[str, ...] = (
+    'dependencies', 'description', 'links', 'authors', 'child_mods', 'provide_mods_id'
+)
+"""只有完整解析才会填充的字段，快速解析的 ModInfo 在第一次访问这些字段时自动完整解析"""
+
+
+@dataclasses.dataclass(eq=False)
 class ModInfo(object):
-    """表示一个加载器中的 MOD 信息
+    """表示一个加载器中的 MOD 信息。
+
+    快速解析的 ModInfo 只有名字、id、版本等基本字段，访问 FULL_FIELDS 中的字段时
+    会通过 ModFile.load_full 重新打开 jar 完整解析，对调用者是透明的。
+    ModInfo 属于唯一的 ModFile，按对象本身比较，不比较内容。
     """
     file: "ModFile"
     name: str
     mod_id: str
     version: str
-    dependencies: list[ModDepend]
     mc_version: str
-    description: str
-    links: dict[str, str]
-    authors: list[str]
-    icon: bytes | None
-
-    child_mods: list["ModFile"]
-    provide_mods_id: list[str]
+    icon: str | None
+    """图标在 jar 中的文件名，内容通过 ModFile.get_icon 按需读取"""
 
     loader: LoaderType
 
+    dependencies: list[ModDepend] = dataclasses.field(default_factory=list)
+    description: str = dataclasses.field(default_factory=str)
+    links: dict[str, str] = dataclasses.field(default_factory=dict)
+    authors: list[str] = dataclasses.field(default_factory=list)
+    child_mods: list["ModFile"] = dataclasses.field(default_factory=list)
+    provide_mods_id: list[str] = dataclasses.field(default_factory=list)
+
+    def __getattr__(self, name: str):
+        # 只有实例和类上都找不到的属性才会走到这里，也就是快速解析时没有填充的字段
+        if name in FULL_FIELDS and 'file' in self.__dict__:
+            self.file.load_full()
+            if name in self.__dict__:
+                return self.__dict__[name]
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    @property
+    def is_full(self) -> bool:
+        """是否已经完整解析，不会触发完整解析"""
+        return all(name in self.__dict__ for name in FULL_FIELDS)
+
+    def defer_full(self) -> None:
+        """去掉完整解析才有的字段，变成快速解析的状态"""
+        for name in FULL_FIELDS:
+            self.__dict__.pop(name, None)
+
+    def fill_full(self, full: 'ModInfo | None' = None) -> None:
+        """补全完整解析才有的字段
+
+        Args:
+            full: 完整解析得到的 ModInfo，为 None 时用空值补全（例如 jar 已经无法读取）
+        """
+        for name in FULL_FIELDS:
+            if name in self.__dict__:
+                continue
+            if full is not None and name in full.__dict__:
+                self.__dict__[name] = full.__dict__[name]
+            else:
+                self.__dict__[name] = _FULL_DEFAULTS[name]()
+
     def include_mod_by_id(self, mod_id: str) -> bool:
         return self.get_include_mod_by_id(mod_id) is not None
 
@@ -46,3 +98,25 @@ class ModInfo(object):
             if get:
                 return get
         return None
+
+    def get_all_ids(self) -> list[str]:
+        """获取这个 mod 能满足的全部 mod id：自己的 id、provides 中的 id 以及（同一加载器下）子 mod 的这些 id
+        """
+        return list(self.get_provided())
+
+    def get_provided(self) -> dict[str, str]:
+        """获取这个 mod 能满足的全部 mod id 以及对应的版本，参考 get_all_ids。
+        provides 中的 id 使用提供它的 mod 的版本，同一个 id 出现多次时保留最先出现的。
+        """
+        result = {self.mod_id: self.version}
+        for mod_id in self.provide_mods_id:
+            result.setdefault(mod_id, self.version)
+        for mod in self.child_mods:
+            info = mod.get_info(self.loader)
+            if info:
+                for mod_id, version in info.get_provided().items():
+                    result.setdefault(mod_id, version)
+        return result
+
+_FULL_DEFAULTS = {f.name: f.default_factory for f in dataclasses.fields(ModInfo)
+                  if f.name in FULL_FIELDS}
@@ -0,0 +1,112 @@
+"""mod 图标缩略图的解码与磁盘缓存。
+
+图标在内存中直接解码、缩放成 RGBA 像素，不再经过临时文件。
+解码结果按 (图标内容的哈希, 边长) 保存在缓存目录中，重启之后同样的图标不需要再解码；
+很多 mod 内嵌的子 mod 使用同一个图标，它们也共用同一份缩略图。
+"""
+import hashlib
+import os
+from array import array
+from io import BytesIO
+
+from data.mod import log
+
+
+def icon_digest(icon: bytes) -> str:
+    """计算图标内容的哈希值"""
+    return hashlib.sha1(icon).hexdigest()
+
+
+def decode_thumbnail(icon: bytes, size: int) -> bytes:
+    """把图标解码并缩放成 size x size 的 RGBA 像素，每个通道一个字节"""
+    from PIL.Image import Resampling, open as open_image
+    img = open_image(BytesIO(icon)).convert('RGBA')
+    img = img.resize((size, size), Resampling.NEAREST)
+    return img.tobytes()
+
+
+def rgba_to_floats(rgba: bytes, size: int) -> array:
+    """把 size x size、每个通道一个字节的像素转换成 dpg 纹理使用的 0 到 1 之间的浮点数。
+    每个通道分别交给 PIL 转换成浮点数，再交错放回一个数组，比逐个字节转换快得多
+    """
+    from PIL.Image import frombytes
+    result = array('f', bytes(len(rgba) * 4))
+    for i, band in enumerate(frombytes('RGBA', (size, size), rgba).split()):
+        result[i::4] = array('f', band.convert('F').point(lambda v: v / 255).tobytes())
+    return result
+
+
+class ThumbnailCache:
+    """缩略图的磁盘缓存，为空的目录表示只解码不缓存
+    """
+
+    def __init__(self, cache_dir: str) -> None:
+        """
+        Args:
+            cache_dir: 缓存目录，不存在时第一次写入会自动创建
+        """
+        self.cache_dir: str = cache_dir
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get_path(self, digest: str, size: int) -> str:
+        return os.path.join(self.cache_dir, digest[:2], f'{digest}_{size}.rgba')
+
+    def get(self, icon: bytes, size: int, digest: str | None = None) -> bytes | None:
+        """获取图标的缩略图，解码失败返回 None
+
+        Args:
+            icon: 图标文件的内容
+            size: 缩略图边长
+            digest: 已经计算好的 icon_digest(icon)，为 None 时自动计算
+        """
+        if digest is None:
+            digest = icon_digest(icon)
+        expected = size * size * 4
+        path = self.get_path(digest, size) if self.cache_dir else ''
+        if path:
+            try:
+                with open(path, 'rb') as f:
+                    rgba = f.read()
+                if len(rgba) == expected:
+                    self.hits += 1
+                    return rgba
+            except OSError:
+                pass
+        self.misses += 1
+        try:
+            rgba = decode_thumbnail(icon, size)
+        except Exception as e:
+            log.info(f"解码图标失败：{e}")
+            return None
+        if path:
+            self._save(path, rgba)
+        return rgba
+
+    @staticmethod
+    def _save(path: str, rgba: bytes) -> None:
+        # 每次写入使用不同的临时文件再替换，同时生成同一个缩略图时不会互相覆盖写了一半的文件
+        temp_path = f'{path}.{os.getpid()}.{id(rgba)}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                f.write(rgba)
+            os.replace(temp_path, path)
+        except OSError as e:
+            log.info(f"保存缩略图 {path} 失败：{e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+
+_THUMBNAIL_CACHE: ThumbnailCache | None = None
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    """获取全局的缩略图缓存，目录由设置中的 thumbnail_cache_dir 决定"""
+    global _THUMBNAIL_CACHE
+    from data.Settings import settings
+    if _THUMBNAIL_CACHE is None or _THUMBNAIL_CACHE.cache_dir != settings.thumbnail_cache_dir:
+        _THUMBNAIL_CACHE = ThumbnailCache(settings.thumbnail_cache_dir)
+    return _THUMBNAIL_CACHE
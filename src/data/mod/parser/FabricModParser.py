@@ -4,17 +4,13 @@ from data.mod.ModFile import ModFile
 from data.mod.ModInfo import ModDepend
 from data.mod.parser.ModParserBase import ModParserBase
 from data.mod import log
-from io import BytesIO
+from Version import compile_range, range_text
 
 _FABRIC_MOD_INFO_FILE = 'fabric.mod.json'
 
 
 class FabricModParser(ModParserBase):
-    @staticmethod
-    def supported(jar: ZipFile) -> bool:
-        if _FABRIC_MOD_INFO_FILE in [i.filename for i in jar.filelist]:
-            return True
-        return False
+    marker_files = (_FABRIC_MOD_INFO_FILE,)
 
     def __init__(self, jar: ZipFile, mod_file: ModFile):
         super().__init__(jar, mod_file)
@@ -53,10 +49,12 @@ class FabricModParser(ModParserBase):
         for k, v in self.json.get('depends', {}).items():
             if k in ['minecraft', 'fabricloader', 'java', 'fabric']:
                 continue
+            # 版本范围可以是一个字符串，也可以是满足任意一个即可的字符串列表
             result.append(ModDepend(
                 mod_id=k,
                 mandatory=True,
-                version_range=v
+                version_range=range_text(v),
+                range=compile_range(v)
             ))
 
         return result
@@ -81,18 +79,10 @@ class FabricModParser(ModParserBase):
                 result[k] = v
         return result
 
-    def get_icon(self) -> bytes | None:
+    def get_icon(self) -> str | None:
         if self.error:
             return None
-        icon = self.json.get('icon', None)
-        if icon is None:
-            return None
-        try:
-            with self.jar.open(icon, 'r') as f:
-                return f.read()
-        except Exception:
-            log.info(f"打开 icon 图标失败，{self.mod_file.full_file_path}")
-            return None
+        return self.find_icon_entry(self.json.get('icon', None))
 
     def get_mod_id(self) -> str:
         if self.error:
@@ -120,32 +110,4 @@ class FabricModParser(ModParserBase):
 
         jars: list[str] = [jar.get('file', '')
                            for jar in self.json.get('jars', [])]
-        if jars:
-            log.info(
-                f"准备为 {self.mod_file.full_file_path} 解析 {len(jars)} 个子 mod")
-
-        result: list[ModFile] = []
-        for jar in jars:
-            log.info(f"解析子 mod {jar}")
-            if not jar:
-                continue
-
-            try:
-                f = self.jar.open(jar, 'r')
-                jar_bytes = f.read()
-                f.close()
-            except Exception as e:
-                log.warning(
-                    f"在 {self.mod_file.full_file_path} 中解析子 mod {jar} 时出现错误：{e}")
-                continue
-
-            mod = ModFile.create_by_bytes(
-                jar_bytes=BytesIO(jar_bytes),
-                full_file_path=jar,
-            )
-            if mod is None:
-                continue
-            mod.parent = self.mod_file
-            result.append(mod)
-
-        return result
+        return self.parse_child_jars(jars)
@@ -4,6 +4,7 @@ from data.mod.ModFile import ModFile
 from data.mod.ModInfo import ModDepend, ModInfo
 from data.mod.parser.ModParserBase import ModParserBase
 from data.mod import log
+from Version import compile_range
 
 
 _FORGE_MOD_INFO_FILE = 'META-INF/mods.toml'
@@ -11,10 +12,7 @@ _JAR_INFO_FILE = 'META-INF/MANIFEST.MF'
 
 
 class ForgeModParser(ModParserBase):
-    @staticmethod
-    def supported(jar: ZipFile) -> bool:
-        file_list = [file.filename for file in jar.filelist]
-        return _FORGE_MOD_INFO_FILE in file_list
+    marker_files = (_FORGE_MOD_INFO_FILE,)
 
     def __init__(self, jar: ZipFile, mod_file: ModFile) -> None:
         super().__init__(jar, mod_file)
@@ -39,9 +37,10 @@ class ForgeModParser(ModParserBase):
 
     def parse_over(self, mod: ModInfo) -> None:
         no_version = 'version' in mod.version.lower() or mod.version == '0.0.0'
-        no_name = bool(mod.name)
-        no_id = bool(mod.mod_id)
-        if no_version or no_name or no_id:
+        no_name = not mod.name
+        no_id = not mod.mod_id
+        # 只有 mods.toml 中缺少信息时才需要读取 MANIFEST.MF
+        if (no_version or no_name or no_id) and _JAR_INFO_FILE in self.jar.NameToInfo:
             info: dict[str, str] = {}
             info_str = self.jar.read(_JAR_INFO_FILE).decode('utf-8')
             for line in info_str.splitlines():
@@ -54,20 +53,8 @@ class ForgeModParser(ModParserBase):
             if no_id:
                 mod.mod_id = info.get('Specification-Title', '')
 
-    def get_icon(self) -> bytes | None:
-        logo = self.toml_mods.get('logoFile', None)
-        if logo is None:
-            return None
-        if not isinstance(logo, str):
-            return None
-
-        try:
-            with self.jar.open(logo, 'r') as f:
-                return f.read()
-        except Exception as e:
-            log.warning(
-                f"{self.mod_file.full_file_path} 明明有 logoFile 设定但读取文件失败。")
-            return None
+    def get_icon(self) -> str | None:
+        return self.find_icon_entry(self.toml_mods.get('logoFile', None))
 
     def get_name(self) -> str:
         return self.toml_mods.get('displayName', '')
@@ -109,7 +96,8 @@ class ForgeModParser(ModParserBase):
                 mandatory=str(dep.get('mandatory', False)).lower() == 'true',
                 version_range=dep.get('versionRange', ''),
                 ordering=dep.get('ordering', ''),
-                side=dep.get('side', '')
+                side=dep.get('side', ''),
+                range=compile_range(dep.get('versionRange', ''), maven=True)
             ))
         return result
 
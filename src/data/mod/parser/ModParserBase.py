@@ -1,6 +1,7 @@
 from abc import abstractmethod
 from ast import main
 from data.mod import log
+from data import Trace
 from zipfile import ZipFile
 from Utils import LoaderType
 from data.mod.ModInfo import ModInfo, ModDepend
@@ -11,36 +12,48 @@ class ModParserBase(object):
     """这是个 Mod 解析器基类，实现新的解析器需要重写 get_ 开头的的全部方法。
     """
 
+    marker_files: tuple[str, ...] = ()
+    """标志文件，jar 中存在这些文件时才会尝试使用这个解析器，parser 包会按照这些文件建立索引"""
+
     def __init__(self, jar: ZipFile, mod_file: ModFile) -> None:
         self.jar: ZipFile = jar
         self.mod_file: ModFile = mod_file
         self.loader: LoaderType | None = None
         self.error: bool = False
 
-    def parse(self) -> ModInfo | None:
+    def parse(self, quick: bool = False) -> ModInfo | None:
         """ 从 jar 文件提取 mod 信息
+
+        Args:
+            quick: 是否快速解析，快速解析只获取名字、id、版本、mc 版本和图标，
+                依赖、描述、子 mod 等字段会在第一次被访问时再完整解析，参考 ModInfo.
         """
         if self.error:
             return None
         if self.loader is None:
             raise Exception("Mod 解析器没有设置 loader 属性！！！")
-        log.info(f"开始解析 {self.loader} mod: {self.mod_file.get_full_path()}")
+        # 每个 mod 和子 mod 都会经过这里，日志用 % 参数，不输出时不格式化
+        log.info("开始解析 %s mod: %s", self.loader, self.mod_file)
+        call = Trace.call
         try:
             result = ModInfo(
                 loader=self.loader,
                 file=self.mod_file,
-                authors=self.get_authors(),
-                child_mods=self.get_child_mods(),
-                dependencies=self.get_depends(),
-                description=self.get_description(),
-                icon=self.get_icon(),
-                mc_version=self.get_mc_version(),
-                mod_id=self.get_mod_id(),
-                name=self.get_name(),
-                version=self.get_version(),
-                provide_mods_id=self.get_provide_mods_id(),
-                links=self.get_links()
+                icon=call(self.get_icon),
+                mc_version=call(self.get_mc_version),
+                mod_id=call(self.get_mod_id),
+                name=call(self.get_name),
+                version=call(self.get_version),
             )
+            if quick:
+                result.defer_full()
+            else:
+                result.authors = call(self.get_authors)
+                result.child_mods = call(self.get_child_mods)
+                result.dependencies = call(self.get_depends)
+                result.description = call(self.get_description)
+                result.provide_mods_id = call(self.get_provide_mods_id)
+                result.links = call(self.get_links)
             self.parse_over(result)
         except Exception as e:
             log.error(
@@ -57,25 +70,90 @@ class ModParserBase(object):
 
         if self.error:
             return None
-        log.info(f"解析完成 {self.loader} mod: {self.mod_file.get_full_path()}")
+        log.info("解析完成 %s mod: %s", self.loader, self.mod_file)
         return result
 
     def parse_over(self, mod: ModInfo) -> None:
         """构建 ModInfo 后调用的后处理方法，可以对 ModInfo 进行最后一步完善。
+        快速解析时也会调用，这里不要访问完整解析才有的字段（参考 ModInfo.is_full）。
         """
         pass
 
+    def find_icon_entry(self, icon: str | dict | None) -> str | None:
+        """根据 mod 信息中的图标设置找到 jar 中的图标文件名，只查文件名索引，不读取图标内容
+
+        Args:
+            icon: 图标路径，或者 fabric / quilt 格式的 {尺寸: 路径} 字典（此时选择最大的尺寸）
+        """
+        if isinstance(icon, dict):
+            sizes = [(int(k), v) for k, v in icon.items()
+                     if str(k).isdigit() and isinstance(v, str)]
+            icon = max(sizes)[1] if sizes else None
+        if not icon or not isinstance(icon, str):
+            return None
+        icon = icon.lstrip('/')
+        if icon not in self.jar.NameToInfo:
+            log.info(f"{self.mod_file.get_full_path()} 中找不到图标文件 {icon}")
+            return None
+        return icon
+
+    def parse_child_jars(self, jars: list[str]) -> list[ModFile]:
+        """解析 jar 中的子 jar，子 jar 尽量在外层文件上直接打开而不复制
+
+        Args:
+            jars: 子 jar 在当前 jar 中的路径们
+        """
+        from data.mod.JarView import open_nested_jar
+        from data.mod.ModCache import get_nested_memo
+        memo = get_nested_memo()
+        if jars:
+            log.info("准备为 %s 解析 %d 个子 mod", self.mod_file, len(jars))
+
+        result: list[ModFile] = []
+        for jar in jars:
+            log.info("解析子 mod %s", jar)
+            if not jar:
+                continue
+
+            try:
+                # 中央目录里现成的 CRC32 和大小足以识别内容相同的子 jar
+                info = self.jar.getinfo(jar)
+                key = (info.CRC, info.file_size, jar)
+                with Trace.span('nested_jar', file=jar, bytes=info.file_size) as span:
+                    mod = memo.get(key) if memo else None
+                    span.set('memo_hit', mod is not None)
+                    if mod is None:
+                        with open_nested_jar(self.jar, jar) as f:
+                            mod = ModFile.create_by_bytes(
+                                jar_bytes=f,
+                                full_file_path=jar,
+                            )
+                            span.set('bytes_read', getattr(f, 'bytes_read', None))
+                        if memo:
+                            memo.put(key, mod)
+            except Exception as e:
+                log.warning(
+                    f"在 {self.mod_file.get_full_path()} 中解析子 mod {jar} 时出现错误：{e}")
+                continue
+
+            if mod is None:
+                continue
+            mod.parent = self.mod_file
+            result.append(mod)
+
+        return result
+
     def raise_error(self, message: str) -> None:
         self.error = True
         log.warning(
             f"按照 {self.loader} 方式解析 {self.mod_file.get_full_path()} 失败：" + message)
 
-    @staticmethod
-    @abstractmethod
-    def supported(jar: ZipFile) -> bool:
-        """判断 jar 文件是否支持当前解析器解析
+    @classmethod
+    def supported(cls, jar: ZipFile) -> bool:
+        """判断 jar 文件是否支持当前解析器解析，默认检查 marker_files 是否都存在。
+        ZipFile 打开时已经把中央目录读成了 文件名 -> ZipInfo 的字典，这里直接查字典而不是遍历文件列表。
         """
-        pass
+        return all(name in jar.NameToInfo for name in cls.marker_files)
 
     @abstractmethod
     def get_mod_id(self) -> str:
@@ -98,7 +176,8 @@ class ModParserBase(object):
         pass
 
     @abstractmethod
-    def get_icon(self) -> bytes | None:
+    def get_icon(self) -> str | None:
+        """获取图标在 jar 中的文件名，图标内容会在 ModFile.get_icon 时才读取"""
         pass
 
     @abstractmethod
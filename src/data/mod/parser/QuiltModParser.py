@@ -4,17 +4,13 @@ from data.mod.ModFile import ModFile
 from data.mod.ModInfo import ModDepend
 from data.mod.parser.ModParserBase import ModParserBase
 from data.mod import log
-from io import BytesIO
+from Version import compile_range, range_text
 
 _QUILT_MOD_INFO_FILE = 'quilt.mod.json'
 
 
 class QuiltModParser(ModParserBase):
-    @staticmethod
-    def supported(jar: ZipFile) -> bool:
-        if _QUILT_MOD_INFO_FILE in [i.filename for i in jar.filelist]:
-            return True
-        return False
+    marker_files = (_QUILT_MOD_INFO_FILE,)
 
     def _init_parse_json(self):
         self.loader_info: dict = self.json.get('quilt_loader', {})
@@ -77,10 +73,13 @@ class QuiltModParser(ModParserBase):
             if mod_id in ['minecraft', 'fabricloader', 'java', 'fabric']:
                 continue
 
+            # versions 可以是字符串、列表或者 {"any": [...]} / {"all": [...]}，没有时表示任意版本
+            versions = dep.get('versions', '*')
             result.append(ModDepend(
                 mod_id=mod_id,
-                mandatory=True,
-                version_range=dep.get('versions', '0.0.0')
+                mandatory=not dep.get('optional', False),
+                version_range=range_text(versions),
+                range=compile_range(versions)
             ))
 
         return result
@@ -110,18 +109,10 @@ class QuiltModParser(ModParserBase):
                 result[k] = v
         return result
 
-    def get_icon(self) -> bytes | None:
+    def get_icon(self) -> str | None:
         if self.error:
             return None
-        icon = self.metadata.get('icon', None)
-        if icon is None:
-            return None
-        try:
-            with self.jar.open(icon, 'r') as f:
-                return f.read()
-        except Exception:
-            log.info(f"打开 icon 图标失败，{self.mod_file.get_full_path()}")
-            return None
+        return self.find_icon_entry(self.metadata.get('icon', None))
 
     def get_mod_id(self) -> str:
         if self.error:
@@ -150,36 +141,7 @@ class QuiltModParser(ModParserBase):
 
         jars: list[str] = [jar for jar in self.loader_info.get('jars', [])
                            if isinstance(jar, str)]
-
-        if jars:
-            log.info(
-                f"准备为 {self.mod_file.get_full_path()} 解析 {len(jars)} 个子 mod")
-
-        result: list[ModFile] = []
-        for jar in jars:
-            log.info(f"解析子 mod {jar}")
-            if not jar:
-                continue
-
-            try:
-                f = self.jar.open(jar, 'r')
-                jar_bytes = f.read()
-                f.close()
-            except Exception as e:
-                log.warning(
-                    f"在 {self.mod_file.get_full_path()} 中解析子 mod {jar} 时出现错误：{e}")
-                continue
-
-            mod = ModFile.create_by_bytes(
-                jar_bytes=BytesIO(jar_bytes),
-                full_file_path=jar,
-            )
-            if mod is None:
-                continue
-            mod.parent = self.mod_file
-            result.append(mod)
-
-        return result
+        return self.parse_child_jars(jars)
 
 
 if __name__ == '__main__':
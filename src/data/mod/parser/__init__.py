@@ -1,10 +1,43 @@
+from zipfile import ZipFile
+
 from data.mod.parser.FabricModParser import FabricModParser
 from data.mod.parser.QuiltModParser import QuiltModParser
 from data.mod.parser.ForgeModParser import ForgeModParser
 from data.mod.parser.ModParserBase import ModParserBase
 
-PARSERS: list[type[ModParserBase]] = [
-    FabricModParser,
-    ForgeModParser,
-    QuiltModParser
-]
+PARSERS: list[type[ModParserBase]] = []
+"""全部解析器，按照注册顺序排列"""
+
+_PARSERS_BY_MARKER: dict[str, list[type[ModParserBase]]] = {}
+"""标志文件 -> 需要这个标志文件的解析器们"""
+_PARSERS_WITHOUT_MARKER: list[type[ModParserBase]] = []
+"""没有标志文件的解析器，只能对每个 jar 都调用 supported 判断"""
+
+
+def register_parser(parser: type[ModParserBase]) -> type[ModParserBase]:
+    """注册一个解析器，并按照它的 marker_files 建立索引
+    """
+    PARSERS.append(parser)
+    if not parser.marker_files:
+        _PARSERS_WITHOUT_MARKER.append(parser)
+    for marker in parser.marker_files:
+        _PARSERS_BY_MARKER.setdefault(marker, []).append(parser)
+    return parser
+
+
+def get_parsers(jar: ZipFile) -> list[type[ModParserBase]]:
+    """获取能够解析这个 jar 的解析器们，顺序与 PARSERS 一致。
+    只用标志文件去查 jar 的文件名索引，耗时与 jar 中的文件数量无关。
+    """
+    index = jar.NameToInfo
+    candidates: set[type[ModParserBase]] = set(_PARSERS_WITHOUT_MARKER)
+    for marker, parsers in _PARSERS_BY_MARKER.items():
+        if marker in index:
+            candidates.update(parsers)
+    return [parser for parser in PARSERS
+            if parser in candidates and parser.supported(jar)]
+
+
+register_parser(FabricModParser)
+register_parser(ForgeModParser)
+register_parser(QuiltModParser)
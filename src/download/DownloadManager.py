@@ -0,0 +1,440 @@
+"""下载管理器。
+
+所有下载共用一个 httpx.Client（连接池复用 TCP/TLS 连接），由固定数量的工作线程按优先级执行，
+每个主机同时进行的下载数量有上限，避免把一个网站打满。
+网络错误和 429/5xx 会按指数退避重试，下载到文件时先流式写入同一目录下的临时文件，完成后再原子地改名，
+所以目标文件要么不存在，要么是完整的。
+
+进度和完成事件放入线程安全的队列，由界面线程每帧调用 drain 取出并触发 on_progress / on_done，
+回调总是在调用 drain 的线程中运行，参考 data.LoadTask。
+"""
+import hashlib
+import heapq
+import itertools
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+from typing import Callable
+from urllib.parse import urlsplit
+
+import httpx
+
+from download import log
+
+RETRY_STATUS: frozenset[int] = frozenset({408, 429, 500, 502, 503, 504})
+"""遇到这些状态码时重试"""
+
+CHUNK_SIZE: int = 64 * 1024
+
+SEGMENT_MIN_SIZE: int = 4 << 20
+"""可以续传的下载中，每一段至少这么大（字节），小于两段的文件直接整个下载"""
+
+
+class JobState(object):
+    pending: str = 'pending'
+    running: str = 'running'
+    done: str = 'done'
+    failed: str = 'failed'
+    cancelled: str = 'cancelled'
+
+
+_FINISHED_STATES = (JobState.done, JobState.failed, JobState.cancelled)
+
+_tJobCallback = Callable[['DownloadJob'], None]
+
+
+class DownloadJob(object):
+    """一个下载任务，由 DownloadManager.submit 执行。
+    target_path 为 None 时下载到内存，完成后可以从 response 中读取内容
+    """
+
+    def __init__(self, url: str,
+                 target_path: str | None = None,
+                 params: dict[str, str] | None = None,
+                 priority: int = 0,
+                 on_progress: _tJobCallback | None = None,
+                 on_done: _tJobCallback | None = None,
+                 on_done_in_worker: _tJobCallback | None = None,
+                 headers: dict[str, str] | None = None,
+                 resumable: bool = False,
+                 expected_size: int | None = None,
+                 expected_hash: str | None = None) -> None:
+        """
+        Args:
+            url: 下载地址
+            target_path: 保存到的文件，None 表示下载到内存
+            params: url 的查询参数
+            priority: 优先级，越大越先开始
+            on_progress: 有新的进度时的回调，在调用 DownloadManager.drain 的线程中运行，多次进度可能合并为一次
+            on_done: 任务结束（成功、失败或取消）时的回调，在调用 DownloadManager.drain 的线程中运行
+            on_done_in_worker: 任务结束时直接在工作线程中运行的回调，用于没有界面循环的场合
+            headers: 额外的请求头
+            resumable: 下载到文件时，服务器支持 Range 就分段并行下载，并把进度保存在文件旁边，
+                中断（出错、取消或者程序退出）之后再次下载同一个文件时从断点继续，参考 download.RangeDownload
+            expected_size: 文件应有的大小，下载完成后校验，不一致时任务失败
+            expected_hash: 文件应有的哈希值，格式为 算法:十六进制，例如 sha1:0beec7b5...，不一致时任务失败
+        """
+        self.url: str = url
+        self.target_path: str | None = target_path
+        self.params: dict[str, str] | None = params
+        self.priority: int = priority
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_done_in_worker = on_done_in_worker
+        self.headers: dict[str, str] | None = headers
+        self.resumable: bool = resumable
+        self.expected_size: int | None = expected_size
+        self.expected_hash: str | None = expected_hash
+        self.host: str = urlsplit(url).netloc
+
+        self.state: str = JobState.pending
+        self.downloaded: int = 0
+        """已经下载的字节数，重试时从 0 开始"""
+        self.total: int | None = None
+        """总字节数，服务器没有给出 Content-Length 时为 None"""
+        self.attempts: int = 0
+        self.error: str | None = None
+        self.response: httpx.Response | None = None
+        """最后一次的响应，下载到内存时包含完整的内容"""
+        self._cancelled = threading.Event()
+        self._progress_posted: bool = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in _FINISHED_STATES
+
+    @property
+    def content(self) -> bytes:
+        """下载到内存的内容"""
+        return self.response.content if self.response is not None else b''
+
+    def cancel(self) -> None:
+        """取消任务，可以在任何线程中调用，正在下载的任务会在下一块数据之后停止"""
+        self._cancelled.set()
+
+
+class _RetryableError(Exception):
+    pass
+
+
+class DownloadVerifyError(Exception):
+    """下载的文件大小或者哈希值与预期的不一致"""
+    pass
+
+
+def new_hasher(expected_hash: str | None):
+    """按照 算法:十六进制 格式的哈希值创建 hashlib 对象，None 表示不校验"""
+    if not expected_hash:
+        return None
+    algorithm = expected_hash.split(':', 1)[0] if ':' in expected_hash else 'sha1'
+    return hashlib.new(algorithm)
+
+
+def verify(job: 'DownloadJob', size: int, hasher) -> None:
+    """校验下载的大小和哈希值，不一致时抛出 DownloadVerifyError"""
+    if job.expected_size is not None and size != job.expected_size:
+        raise DownloadVerifyError(f"文件大小为 {size}，应该是 {job.expected_size}")
+    if hasher is not None and job.expected_hash:
+        expected = job.expected_hash.rsplit(':', 1)[-1].lower()
+        if hasher.hexdigest() != expected:
+            raise DownloadVerifyError(f"{hasher.name} 为 {hasher.hexdigest()}，应该是 {expected}")
+
+
+class DownloadManager(object):
+    """共享连接池、按优先级调度并限制每个主机并发数的下载管理器
+    """
+
+    def __init__(self, workers: int = 8, per_host: int = 4, retries: int = 3,
+                 timeout: float = 30.0, backoff: float = 0.5, segments: int = 4,
+                 client: httpx.Client | None = None) -> None:
+        """
+        Args:
+            workers: 工作线程数，也就是同时进行的下载数量上限
+            per_host: 每个主机同时进行的下载数量上限
+            retries: 失败后最多重试的次数
+            timeout: 连接和每次读取的超时秒数
+            backoff: 第一次重试前等待的秒数，之后每次翻倍，并加上随机抖动
+            segments: 可以续传的下载最多分成几段并行下载，参考 DownloadJob.resumable
+            client: 使用的 httpx.Client，None 表示新建一个，关闭管理器时会一起关闭
+        """
+        self.workers: int = max(1, workers)
+        self.per_host: int = max(1, per_host)
+        self.retries: int = max(0, retries)
+        self.backoff: float = backoff
+        self.segments: int = max(1, segments)
+        self.client: httpx.Client = client or httpx.Client(
+            timeout=timeout, follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.workers * self.segments,
+                                max_keepalive_connections=self.workers))
+        self.events: queue.Queue[tuple[DownloadJob, bool]] = queue.Queue()
+        """(任务, 是否结束)，由 drain 取出"""
+        self._pending: list[tuple[int, int, DownloadJob]] = []
+        """(-优先级, 序号, 任务) 的堆，同优先级先提交的先开始"""
+        self._seq = itertools.count()
+        self._running: dict[str, int] = {}
+        """主机 -> 正在下载的数量"""
+        self._active: set[DownloadJob] = set()
+        """正在下载的任务"""
+        self._cond = threading.Condition()
+        self._progress_lock = threading.Lock()
+        """分段下载时多个线程会同时更新同一个任务的进度"""
+        self._threads: list[threading.Thread] = []
+        self._closed: bool = False
+
+    def submit(self, job: DownloadJob) -> DownloadJob:
+        """提交一个任务，工作线程在第一次提交时才启动"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("下载管理器已经关闭")
+            heapq.heappush(self._pending, (-job.priority, next(self._seq), job))
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, daemon=True,
+                                          name=f'Download-{len(self._threads)}')
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        return job
+
+    def get(self, url: str, params: dict[str, str] | None = None, priority: int = 0,
+            **kwargs) -> DownloadJob:
+        """下载到内存，其它参数参考 DownloadJob"""
+        return self.submit(DownloadJob(url, None, params, priority, **kwargs))
+
+    def download(self, url: str, target_path: str, priority: int = 0, **kwargs) -> DownloadJob:
+        """下载到文件，其它参数参考 DownloadJob"""
+        return self.submit(DownloadJob(url, target_path, None, priority, **kwargs))
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def drain(self, deadline: float | None = None) -> bool:
+        """在调用者线程中取出进度和完成事件并触发回调
+
+        Args:
+            deadline: time.perf_counter() 的截止时间，超过后剩下的事件留到下次再取，None 表示不限制
+
+        Returns:
+            是否取出了事件
+        """
+        drained = False
+        while True:
+            try:
+                job, finished = self.events.get_nowait()
+            except queue.Empty:
+                break
+            drained = True
+            if finished:
+                if job.on_done:
+                    job.on_done(job)
+            else:
+                job._progress_posted = False
+                if job.on_progress and not job.finished:
+                    job.on_progress(job)
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        return drained
+
+    def close(self, wait: bool = True) -> None:
+        """取消全部任务并关闭连接池"""
+        with self._cond:
+            self._closed = True
+            for _, _, job in self._pending:
+                job.cancel()
+            for job in self._active:
+                job.cancel()
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self.client.close()
+
+    def _take(self) -> tuple[DownloadJob, bool] | None:
+        """取出优先级最高、并且所在主机还没有达到并发上限的任务，没有时等待，关闭后返回 None。
+        返回 (任务, 是否占用了主机的名额)，占用了名额的任务结束后必须调用 _release，即使它在那之后被取消了
+        """
+        with self._cond:
+            while True:
+                if self._closed and not self._pending:
+                    return None
+                skipped: list[tuple[int, int, DownloadJob]] = []
+                job = None
+                while self._pending:
+                    item = heapq.heappop(self._pending)
+                    if item[2].cancelled or self._running.get(item[2].host, 0) < self.per_host:
+                        job = item[2]
+                        break
+                    skipped.append(item)
+                for item in skipped:
+                    heapq.heappush(self._pending, item)
+                if job is not None:
+                    if job.cancelled:
+                        return job, False
+                    self._running[job.host] = self._running.get(job.host, 0) + 1
+                    self._active.add(job)
+                    return job, True
+                self._cond.wait()
+
+    def _release(self, job: DownloadJob) -> None:
+        with self._cond:
+            self._active.discard(job)
+            self._running[job.host] -= 1
+            if not self._running[job.host]:
+                del self._running[job.host]
+            self._cond.notify_all()
+
+    def _work(self) -> None:
+        while (taken := self._take()) is not None:
+            job, slotted = taken
+            try:
+                # 取出之后也可能被取消，这时仍然要归还主机的名额
+                self._finish(job, JobState.cancelled if job.cancelled else self._run(job))
+            finally:
+                if slotted:
+                    self._release(job)
+
+    def _finish(self, job: DownloadJob, state: str) -> None:
+        job.state = state
+        if job.on_done_in_worker:
+            try:
+                job.on_done_in_worker(job)
+            except Exception as e:
+                log.warning(f"下载 {job.url} 的回调出现错误：{e}")
+        self.events.put((job, True))
+
+    def _run(self, job: DownloadJob) -> str:
+        """执行一个任务，失败时按指数退避重试，返回最终状态"""
+        job.state = JobState.running
+        while True:
+            job.attempts += 1
+            try:
+                self._fetch(job)
+                return JobState.cancelled if job.cancelled else JobState.done
+            except _RetryableError as e:
+                job.error = str(e)
+            except httpx.TransportError as e:
+                job.error = f"{type(e).__name__}: {e}"
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+                log.warning(f"下载 {job.url} 失败：{job.error}")
+                return JobState.failed
+            if job.cancelled:
+                return JobState.cancelled
+            if job.attempts > self.retries:
+                log.warning(f"下载 {job.url} 失败，已经重试 {self.retries} 次：{job.error}")
+                return JobState.failed
+            delay = self.backoff * 2 ** (job.attempts - 1) * (0.5 + random.random())
+            log.info(f"下载 {job.url} 出错（{job.error}），{delay:.1f} 秒后重试")
+            # 等待期间取消会马上醒来
+            if job._cancelled.wait(delay):
+                return JobState.cancelled
+
+    def _fetch(self, job: DownloadJob) -> None:
+        job.downloaded = 0
+        job.total = None
+        if job.target_path is not None and job.resumable:
+            from download.RangeDownload import fetch_ranges
+            if fetch_ranges(self, job):
+                return
+            job.downloaded = 0
+        with self.client.stream('GET', job.url, params=job.params, headers=job.headers) as response:
+            if response.status_code in RETRY_STATUS:
+                raise _RetryableError(f"HTTP {response.status_code}")
+            if response.status_code != 304:
+                # 304 是条件请求的正常结果，交给调用者处理，参考 HttpCache
+                response.raise_for_status()
+            length = response.headers.get('Content-Length')
+            job.total = int(length) if length and length.isdigit() else None
+            if job.target_path is None:
+                chunks: list[bytes] = []
+                for chunk in response.iter_bytes(CHUNK_SIZE):
+                    if job.cancelled:
+                        return
+                    chunks.append(chunk)
+                    self._progress(job, len(chunk))
+                job.response = httpx.Response(response.status_code, headers=response.headers,
+                                              content=b''.join(chunks), request=response.request)
+                return
+            job.response = response
+            self._stream_to_file(job, response)
+
+    def _stream_to_file(self, job: DownloadJob, response: httpx.Response) -> None:
+        """写入同一目录下的临时文件，完整下载后再改名为目标文件"""
+        assert job.target_path is not None
+        target_dir = os.path.dirname(os.path.abspath(job.target_path))
+        os.makedirs(target_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(job.target_path) + '.',
+                                         suffix='.part', dir=target_dir)
+        hasher = new_hasher(job.expected_hash)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_bytes(CHUNK_SIZE):
+                    if job.cancelled:
+                        return
+                    f.write(chunk)
+                    if hasher is not None:
+                        hasher.update(chunk)
+                    self._progress(job, len(chunk))
+            if job.total is not None and job.downloaded != job.total:
+                raise _RetryableError(f"只下载了 {job.downloaded}/{job.total} 字节")
+            verify(job, job.downloaded, hasher)
+            os.replace(temp_path, job.target_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _progress(self, job: DownloadJob, size: int) -> None:
+        with self._progress_lock:
+            job.downloaded += size
+            # 上一次的进度还没有被取出时不再放入新的，drain 时读到的总是最新进度
+            if job._progress_posted:
+                return
+            job._progress_posted = True
+        self.events.put((job, False))
+
+
+_MANAGER: DownloadManager | None = None
+
+
+def get_download_manager() -> DownloadManager:
+    """获取全局的下载管理器，第一次调用时按照设置创建"""
+    global _MANAGER
+    if _MANAGER is None:
+        from data.Settings import settings
+        _MANAGER = DownloadManager(workers=settings.download_workers,
+                                   per_host=settings.download_per_host,
+                                   retries=settings.download_retries,
+                                   segments=settings.download_segments)
+    return _MANAGER
+
+
+def download_mod(url: str, file_name: str, priority: int = 0, **kwargs) -> DownloadJob:
+    """把一个 mod 下载到 settings.local_mods_dir，可以续传，校验通过后才会出现在目录中，
+    其它参数参考 DownloadJob
+    """
+    from data.Settings import settings
+    kwargs.setdefault('resumable', True)
+    return get_download_manager().download(url, os.path.join(settings.local_mods_dir, file_name),
+                                           priority, **kwargs)
+
+
+def drain_downloads(deadline: float | None = None) -> bool:
+    """取出全局下载管理器的事件，还没有创建下载管理器时什么也不做，参考 DownloadManager.drain"""
+    if _MANAGER is None:
+        return False
+    return _MANAGER.drain(deadline)
+
+
+def close_download_manager() -> None:
+    """关闭全局的下载管理器，之后 get_download_manager 会创建新的"""
+    global _MANAGER
+    if _MANAGER is not None:
+        _MANAGER.close()
+        _MANAGER = None
@@ -4,14 +4,31 @@ from typing import Callable
 
 import httpx
 
+from download.DownloadManager import DownloadJob, JobState, get_download_manager
+
 _tCallback = Callable[[httpx.Response], None]
 
 
-class DownloadingInNewThread(object):
+class Downloading(object):
+    """一次后台请求，结果通过 callback 交回，Cancel 之后不再触发 callback
+    """
+
     def __init__(self, callback: _tCallback) -> None:
         self.callback: _tCallback = callback
         self.cancel: bool = False
 
+    def Cancel(self):
+        self.cancel = True
+
+    def commit(self, response: httpx.Response):
+        if not self.cancel:
+            self.callback(response)
+
+
+class DownloadingInNewThread(Downloading):
+    def __init__(self, callback: _tCallback) -> None:
+        super().__init__(callback)
+
         self.thread: Thread = Thread(target=self.downloading_in_new_thread)
         self.thread.start()
 
@@ -19,20 +36,24 @@ class DownloadingInNewThread(object):
     def downloading_in_new_thread(self):
         pass
 
-    def Cancel(self):
-        self.cancel = True
-
-    def commit(self, response: httpx.Response):
-        if not self.cancel:
-            self.callback(response)
 
+class Get(Downloading):
+    """通过全局的下载管理器发出 GET 请求，复用连接池并且会自动重试，参考 DownloadManager。
+    callback 和原来一样在后台线程中调用，请求最终失败时不会调用
+    """
 
-class Get(DownloadingInNewThread):
-    def __init__(self, url: str, params: dict[str, str], callback: _tCallback) -> None:
+    def __init__(self, url: str, params: dict[str, str], callback: _tCallback,
+                 priority: int = 0) -> None:
         super().__init__(callback)
         self.params: dict[str, str] = params
         self.url: str = url
+        self.job = get_download_manager().get(url, params, priority=priority,
+                                              on_done_in_worker=self._on_done)
 
-    def downloading_in_new_thread(self):
-        response: httpx.Response = httpx.get(self.url, params=self.params)
-        self.commit(response)
+    def Cancel(self):
+        super().Cancel()
+        self.job.cancel()
+
+    def _on_done(self, job: DownloadJob):
+        if job.state == JobState.done and job.response is not None:
+            self.commit(job.response)
@@ -0,0 +1,433 @@
+"""下载子系统的 http 响应磁盘缓存。
+
+缓存以 url 加上规范化之后的查询参数为键（去掉空值、按参数名排序），保存响应内容、ETag / Last-Modified
+以及过期时间。没有过期时直接使用缓存，过期后带上 If-None-Match / If-Modified-Since 重新验证，
+服务器返回 304 时只延长过期时间。除了原始内容，还可以为每个条目保存解析后的对象（例如 WebMod 列表），
+内容没有变化时解析结果一直有效，内容变化后自动作废。
+
+缓存目录的总大小有上限，超出时按最后一次使用的顺序删除最旧的条目。
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+from urllib.parse import urlencode
+
+import httpx
+
+from download import log
+from download.DownloadManager import DownloadJob, JobState, get_download_manager
+from download.DownloadThread import Downloading
+
+T = TypeVar('T')
+
+
+def normalize_params(params: dict[str, Any] | None) -> list[tuple[str, str]]:
+    """去掉空值并按参数名排序，同样的查询总是得到同样的参数列表"""
+    return sorted((str(k), str(v)) for k, v in (params or {}).items() if v not in (None, ''))
+
+
+def cache_key(url: str, params: dict[str, Any] | None = None) -> str:
+    query = urlencode(normalize_params(params))
+    return hashlib.sha1(f'{url}?{query}'.encode('utf-8')).hexdigest()
+
+
+class CacheEntry(object):
+    """缓存中的一个响应
+    """
+
+    def __init__(self, key: str, url: str, status: int, etag: str | None,
+                 last_modified: str | None, expires: float, size: int) -> None:
+        self.key: str = key
+        self.url: str = url
+        self.status: int = status
+        self.etag: str | None = etag
+        self.last_modified: str | None = last_modified
+        self.expires: float = expires
+        """time.time() 的过期时间"""
+        self.size: int = size
+        """响应内容的字节数"""
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires
+
+    def validators(self) -> dict[str, str]:
+        """重新验证时使用的条件请求头"""
+        headers: dict[str, str] = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+def response_ttl(response: httpx.Response, default: float) -> float:
+    """按照 Cache-Control 决定缓存多少秒，no-store / no-cache 时为 0"""
+    cache_control = response.headers.get('Cache-Control', '').lower()
+    for item in cache_control.split(','):
+        item = item.strip()
+        if item in ('no-store', 'no-cache'):
+            return 0
+        if item.startswith('max-age='):
+            value = item[len('max-age='):]
+            if value.isdigit():
+                return int(value)
+    return default
+
+
+class HttpCache(object):
+    """http 响应的磁盘缓存，线程安全，为空的目录表示不缓存
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 64 << 20) -> None:
+        """
+        Args:
+            cache_dir: 缓存目录，不存在时第一次写入会自动创建
+            max_bytes: 缓存目录的总大小上限
+        """
+        self.cache_dir: str = cache_dir
+        self.max_bytes: int = max_bytes
+        self.hits: int = 0
+        """没有过期直接使用的次数"""
+        self.revalidated: int = 0
+        """服务器返回 304 的次数"""
+        self.misses: int = 0
+        self._lock = threading.RLock()
+        self._usage: OrderedDict[str, int] | None = None
+        """键 -> 条目的全部文件大小，按最后一次使用的顺序排列，第一次使用时从目录中读取"""
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + suffix)
+
+    def _load_usage(self) -> OrderedDict[str, int]:
+        if self._usage is not None:
+            return self._usage
+        entries: list[tuple[float, str, int]] = []
+        if os.path.isdir(self.cache_dir):
+            for sub in os.scandir(self.cache_dir):
+                if not sub.is_dir():
+                    continue
+                sizes: dict[str, int] = {}
+                used: dict[str, float] = {}
+                for file in os.scandir(sub.path):
+                    key = file.name.split('.', 1)[0]
+                    stat = file.stat()
+                    sizes[key] = sizes.get(key, 0) + stat.st_size
+                    if file.name.endswith('.json'):
+                        used[key] = stat.st_mtime
+                entries.extend((used.get(key, 0), key, size) for key, size in sizes.items())
+        entries.sort()
+        self._usage = OrderedDict((key, size) for _, key, size in entries)
+        return self._usage
+
+    def _touch(self, key: str) -> None:
+        usage = self._load_usage()
+        if key in usage:
+            usage.move_to_end(key)
+        try:
+            os.utime(self._path(key, '.json'))
+        except OSError:
+            pass
+
+    def _write(self, path: str, data: bytes) -> int:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        return len(data)
+
+    def _key_files(self, key: str) -> list[str]:
+        sub_dir = os.path.dirname(self._path(key, ''))
+        try:
+            return [os.path.join(sub_dir, name) for name in os.listdir(sub_dir)
+                    if name.split('.', 1)[0] == key]
+        except OSError:
+            return []
+
+    def _remove(self, key: str) -> None:
+        for file_path in self._key_files(key):
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+        self._load_usage().pop(key, None)
+
+    def _account(self, key: str) -> None:
+        """重新计算一个条目的大小，超出上限时删除最久没有使用的条目"""
+        usage = self._load_usage()
+        size = 0
+        for file_path in self._key_files(key):
+            try:
+                size += os.path.getsize(file_path)
+            except OSError:
+                pass
+        usage[key] = size
+        usage.move_to_end(key)
+        total = sum(usage.values())
+        while total > self.max_bytes and len(usage) > 1:
+            old_key, old_size = next(iter(usage.items()))
+            if old_key == key:
+                break
+            self._remove(old_key)
+            total -= old_size
+
+    def lookup(self, url: str, params: dict[str, Any] | None = None) -> CacheEntry | None:
+        """查找一个条目，不管是否过期"""
+        if not self.cache_dir:
+            return None
+        key = cache_key(url, params)
+        try:
+            with open(self._path(key, '.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            return CacheEntry(key, meta['url'], meta['status'], meta.get('etag'),
+                              meta.get('last_modified'), meta['expires'], meta['size'])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def read(self, entry: CacheEntry) -> bytes | None:
+        """读取条目的响应内容，并记为最近使用"""
+        try:
+            with open(self._path(entry.key, '.body'), 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None
+        self.touch(entry)
+        return body if len(body) == entry.size else None
+
+    def touch(self, entry: CacheEntry) -> None:
+        """把条目记为最近使用，参考 max_bytes"""
+        with self._lock:
+            self._touch(entry.key)
+
+    def _save_meta(self, entry: CacheEntry) -> None:
+        self._write(self._path(entry.key, '.json'), json.dumps({
+            'url': entry.url, 'status': entry.status, 'etag': entry.etag,
+            'last_modified': entry.last_modified, 'expires': entry.expires, 'size': entry.size,
+        }).encode('utf-8'))
+
+    def store(self, url: str, params: dict[str, Any] | None, response: httpx.Response,
+              ttl: float) -> CacheEntry | None:
+        """保存一个 200 响应，同时作废这个条目之前的解析结果；不能缓存时返回 None"""
+        ttl = response_ttl(response, ttl)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not self.cache_dir or response.status_code != 200 or (ttl <= 0 and not etag and not last_modified):
+            return None
+        body = response.content
+        entry = CacheEntry(cache_key(url, params), url, response.status_code, etag, last_modified,
+                           time.time() + ttl, len(body))
+        with self._lock:
+            try:
+                self._remove(entry.key)
+                self._write(self._path(entry.key, '.body'), body)
+                self._save_meta(entry)
+                self._account(entry.key)
+            except OSError as e:
+                log.info(f"保存 http 缓存 {url} 失败：{e}")
+                return None
+        return entry
+
+    def refresh(self, entry: CacheEntry, response: httpx.Response, ttl: float) -> None:
+        """服务器返回 304 之后延长条目的过期时间"""
+        entry.expires = time.time() + response_ttl(response, ttl)
+        entry.etag = response.headers.get('ETag', entry.etag)
+        entry.last_modified = response.headers.get('Last-Modified', entry.last_modified)
+        with self._lock:
+            try:
+                self._save_meta(entry)
+                self._touch(entry.key)
+            except OSError as e:
+                log.info(f"更新 http 缓存 {entry.url} 失败：{e}")
+
+    def get_parsed(self, entry: CacheEntry, name: str) -> Any | None:
+        """读取条目的解析结果，没有时返回 None
+
+        Args:
+            name: 解析结果的名字，解析方式变化时应该换一个名字
+        """
+        try:
+            with open(self._path(entry.key, f'.{name}.pkl'), 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+    def put_parsed(self, entry: CacheEntry, name: str, value: Any) -> None:
+        """保存条目的解析结果，和响应内容一起计入缓存大小"""
+        with self._lock:
+            try:
+                self._write(self._path(entry.key, f'.{name}.pkl'), pickle.dumps(value))
+                self._account(entry.key)
+            except (OSError, pickle.PicklingError) as e:
+                log.info(f"保存 {entry.url} 的解析结果失败：{e}")
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(self._load_usage().values())
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._load_usage()):
+                self._remove(key)
+
+
+class CachedGet(Downloading):
+    """经过 HttpCache 的 GET 请求，回调得到解析之后的结果。
+
+    缓存没有过期并且有解析结果时直接在当前线程中调用 callback；只有原始内容时在解析线程中解析并调用；
+    否则通过下载管理器发出（带条件头的）请求，在下载管理器的工作线程中解析并调用 callback。
+    请求失败但有过期的缓存时使用过期的缓存。解析总是在后台线程中进行，不会阻塞调用者。
+    """
+
+    def __init__(self, url: str, params: dict[str, Any] | None,
+                 callback: Callable[[T], None],
+                 parse: Callable[[str], T],
+                 parsed_name: str,
+                 ttl: float | None = None,
+                 cache: 'HttpCache | None' = None,
+                 priority: int = 0,
+                 on_error: Callable[[], None] | None = None) -> None:
+        """
+        Args:
+            parse: 把响应的文本解析成结果，在工作线程中运行
+            parsed_name: 解析结果在缓存中的名字，参考 HttpCache.get_parsed
+            ttl: 服务器没有给出 Cache-Control 时缓存多少秒，None 表示使用设置中的 http_cache_ttl
+            cache: 使用的缓存，None 表示全局的缓存
+            on_error: 请求失败并且没有可用的缓存时在工作线程中调用，Cancel 之后不再调用
+        """
+        super().__init__(callback)  # type: ignore
+        self.url: str = url
+        self.params: dict[str, str] = dict(normalize_params(params))
+        self.parse = parse
+        self.parsed_name: str = parsed_name
+        self.on_error: Callable[[], None] | None = on_error
+        if ttl is None:
+            from data.Settings import settings
+            ttl = settings.http_cache_ttl
+        self.ttl: float = ttl
+        self.cache: HttpCache = cache or get_http_cache()
+        self.job: DownloadJob | None = None
+        self.from_cache: str = ''
+        """结果的来源：hit 没有过期、revalidated 服务器返回 304、stale 请求失败时使用过期的缓存，空表示新下载的"""
+
+        self.priority: int = priority
+
+        self.entry = self.cache.lookup(url, self.params)
+        if self.entry is not None and self.entry.fresh:
+            result = self.cache.get_parsed(self.entry, self.parsed_name)
+            if result is not None:
+                self.cache.touch(self.entry)
+                self._commit_hit(result)
+                return
+            # 只有原始内容时在解析线程中解析，不阻塞调用者（通常是界面线程）
+            _get_parse_executor().submit(self._parse_fresh)
+            return
+        self._request()
+
+    def _request(self) -> None:
+        headers = self.entry.validators() if self.entry is not None else None
+        self.job = get_download_manager().get(self.url, self.params, priority=self.priority,
+                                              headers=headers, on_done_in_worker=self._on_done)
+
+    def _commit_hit(self, result: T) -> None:
+        self.cache.hits += 1
+        self.from_cache = 'hit'
+        self.commit(result)  # type: ignore
+
+    def _parse_fresh(self) -> None:
+        if self.cancel:
+            return
+        assert self.entry is not None
+        try:
+            result = self._from_entry(self.entry)
+        except Exception as e:
+            log.warning(f"解析 {self.url} 的缓存失败：{e}")
+            result = None
+        if result is None:
+            # 缓存的内容丢失或者损坏，不带条件头重新下载
+            self.entry = None
+            self._request()
+        else:
+            self._commit_hit(result)
+
+    def Cancel(self):
+        super().Cancel()
+        if self.job is not None:
+            self.job.cancel()
+
+    def _from_entry(self, entry: CacheEntry) -> T | None:
+        """从缓存条目取出解析结果，没有解析结果时解析缓存的内容并保存"""
+        result = self.cache.get_parsed(entry, self.parsed_name)
+        if result is not None:
+            self.cache.touch(entry)
+            return result
+        body = self.cache.read(entry)
+        if body is None:
+            return None
+        result = self.parse(body.decode('utf-8', errors='replace'))
+        self.cache.put_parsed(entry, self.parsed_name, result)
+        return result
+
+    def _on_done(self, job: DownloadJob) -> None:
+        if self.cancel or job.state == JobState.cancelled:
+            return
+        try:
+            result = self._result_of(job)
+        except Exception as e:
+            log.warning(f"解析 {self.url} 失败：{e}")
+            result = None
+        if result is not None:
+            self.commit(result)  # type: ignore
+        elif self.on_error is not None and not self.cancel:
+            self.on_error()
+
+    def _result_of(self, job: DownloadJob) -> T | None:
+        """从结束的请求得到结果，失败时尽量使用过期的缓存"""
+        response = job.response
+        result = None
+        if job.state == JobState.done and response is not None:
+            if response.status_code == 304 and self.entry is not None:
+                self.cache.revalidated += 1
+                self.cache.refresh(self.entry, response, self.ttl)
+                self.from_cache = 'revalidated'
+                result = self._from_entry(self.entry)
+            if result is None and response.status_code == 200:
+                self.cache.misses += 1
+                result = self.parse(response.text)
+                entry = self.cache.store(self.url, self.params, response, self.ttl)
+                if entry is not None:
+                    self.cache.put_parsed(entry, self.parsed_name, result)
+        if result is None and self.entry is not None:
+            log.info(f"请求 {self.url} 失败，使用过期的缓存")
+            self.from_cache = 'stale'
+            result = self._from_entry(self.entry)
+        return result
+
+
+_PARSE_EXECUTOR: ThreadPoolExecutor | None = None
+
+
+def _get_parse_executor() -> ThreadPoolExecutor:
+    """解析缓存内容用的后台线程"""
+    global _PARSE_EXECUTOR
+    if _PARSE_EXECUTOR is None:
+        _PARSE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='HttpCacheParse')
+    return _PARSE_EXECUTOR
+
+
+_HTTP_CACHE: HttpCache | None = None
+
+
+def get_http_cache() -> HttpCache:
+    """获取全局的 http 缓存，目录和大小由设置中的 http_cache_dir 和 http_cache_max_mb 决定"""
+    global _HTTP_CACHE
+    from data.Settings import settings
+    if _HTTP_CACHE is None or _HTTP_CACHE.cache_dir != settings.http_cache_dir:
+        _HTTP_CACHE = HttpCache(settings.http_cache_dir, settings.http_cache_max_mb << 20)
+    return _HTTP_CACHE
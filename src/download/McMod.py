@@ -1,21 +1,243 @@
+import re
+from typing import Callable
+
+from html.parser import HTMLParser
+
 from download.WebMod import WebMod
-from download.DownloadThread import Get
-from bs4 import BeautifulSoup
-from bs4.element import Tag
+from download.HttpCache import CachedGet
+
+MCMOD_URL: str = 'https://www.mcmod.cn'
+MCMOD_SEARCH_URL: str = MCMOD_URL + '/modlist.html'
+
+SEARCH_PAGE_PARSED: str = 'webmods-1'
+"""搜索结果页解析结果在 http 缓存中的名字，解析方式变化时要修改"""
+
+_CLASS_ID = re.compile(r'/class/(\d+)\.html')
+
+
+def absolute_url(url: str) -> str:
+    """把页面中的相对地址转换成完整的地址"""
+    if url.startswith('//'):
+        return 'https:' + url
+    if url.startswith('/'):
+        return MCMOD_URL + url
+    return url
+
+
+class SearchPageParser(HTMLParser):
+    """mod 列表页的流式解析器，不建立 DOM 树，一边读入 html 一边填写 WebMod，可以多次 feed。
+
+    每个 div.modlist-block 是一个 mod：其中第一个 class 含有 name 的元素里的第一个带 href 的 a
+    是名字和 mod 页面的链接（/class/<id>.html），没有这样的元素时使用块中第一个带 href 的 a；
+    第一个 img 是封面（优先使用懒加载的 data-src）；第一个 class 含有 mcver 的元素中，
+    以冒号结尾的 li 是加载器，其它 li 是支持的 mc 版本，第一个版本是最新的。
+    结果与 parse_search_page_soup 相同。
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.mods: list[WebMod] = []
+        self._mod: WebMod | None = None
+        self._div_depth: int = 0
+        """当前块中还没有关闭的 div 数量，回到 0 时块结束"""
+        self._name: tuple[str, int] | None = None
+        """正在读取的 name 元素的 (标签, 同名标签的嵌套层数)"""
+        self._name_seen: bool = False
+        self._mcver: tuple[str, int] | None = None
+        self._mcver_seen: bool = False
+        self._image_seen: bool = False
+        self._link_text: list[str] | None = None
+        """正在读取的链接文字，None 表示不在需要的链接中"""
+        self._link_depth: int = 0
+        self._link_from_name: bool = False
+        self._fallback: tuple[str, list[str]] | None = None
+        """块中第一个带 href 的 a 的 (href, 文字)，没有 name 元素时使用"""
+        self._items: list[list[str]] = []
+        """mcver 中 li 们的文字，按开始标签的顺序"""
+        self._open_items: list[int] = []
+        """还没有关闭的 li 在 _items 中的下标"""
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        mod = self._mod
+        classes = ''
+        for key, value in attrs:
+            if key == 'class':
+                classes = value or ''
+                break
+        if mod is None:
+            if tag == 'div' and 'modlist-block' in classes.split():
+                self._begin_block()
+            return
+        if tag == 'div':
+            self._div_depth += 1
+        class_list = classes.split() if classes else ()
+
+        if self._name is not None:
+            if tag == self._name[0]:
+                self._name = (tag, self._name[1] + 1)
+        elif not self._name_seen and 'name' in class_list:
+            self._name = (tag, 1)
+            self._name_seen = True
+        if self._mcver is not None:
+            if tag == self._mcver[0]:
+                self._mcver = (tag, self._mcver[1] + 1)
+        elif not self._mcver_seen and 'mcver' in class_list:
+            self._mcver = (tag, 1)
+            self._mcver_seen = True
 
-FUCK_IMPORT = False
-if FUCK_IMPORT:
-    import httpx
+        if tag == 'a':
+            if self._link_text is not None:
+                self._link_depth += 1
+            else:
+                href = dict(attrs).get('href')
+                if href is not None:
+                    if self._name is not None and not mod.download_link:
+                        self._start_link(mod, href, True)
+                    elif self._fallback is None and not self._name_seen:
+                        self._fallback = (href, [])
+                        self._link_text = self._fallback[1]
+                        self._link_depth = 1
+                        self._link_from_name = False
+        elif tag == 'img' and not self._image_seen:
+            attr = dict(attrs)
+            mod.image_url = absolute_url(attr.get('data-src') or attr.get('src') or '')
+            self._image_seen = True
+        elif tag == 'li' and self._mcver is not None:
+            self._open_items.append(len(self._items))
+            self._items.append([])
 
-MCMOD_SEARCH_URL: str = 'https://www.mcmod.cn/modlist.html'
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        # <img .../> 之类自闭合的标签没有结束标签，不能计入嵌套层数
+        if tag == 'div':
+            return
+        self.handle_starttag(tag, attrs)
+        if tag != 'img':
+            self.handle_endtag(tag)
 
+    def handle_endtag(self, tag: str) -> None:
+        mod = self._mod
+        if mod is None:
+            return
+        if tag == 'a' and self._link_text is not None:
+            if self._link_depth > 1:
+                self._link_depth -= 1
+            else:
+                if self._link_from_name:
+                    mod.name = ''.join(self._link_text)
+                self._link_text = None
+        elif tag == 'li' and self._open_items:
+            self._open_items.pop()
+        if self._name is not None and tag == self._name[0]:
+            self._name = (tag, self._name[1] - 1) if self._name[1] > 1 else None
+        if self._mcver is not None and tag == self._mcver[0]:
+            if self._mcver[1] > 1:
+                self._mcver = (tag, self._mcver[1] - 1)
+            else:
+                self._mcver = None
+                self._open_items.clear()
+        if tag == 'div':
+            self._div_depth -= 1
+            if self._div_depth <= 0:
+                self._end_block()
 
+    def handle_data(self, data: str) -> None:
+        if self._mod is None:
+            return
+        text = data.strip()
+        if not text:
+            return
+        if self._link_text is not None:
+            self._link_text.append(text)
+        for index in self._open_items:
+            self._items[index].append(text)
 
-def parse_search_page(source: str):
+    def close(self) -> None:
+        super().close()
+        if self._mod is not None:
+            self._end_block()
+
+    def _begin_block(self) -> None:
+        self._mod = WebMod()
+        self._div_depth = 1
+        self._name = self._mcver = None
+        self._name_seen = self._mcver_seen = self._image_seen = False
+        self._link_text = None
+        self._link_depth = 0
+        self._fallback = None
+        self._items = []
+        self._open_items = []
+
+    def _start_link(self, mod: WebMod, href: str, from_name: bool) -> None:
+        mod.download_link = absolute_url(href)
+        if match := _CLASS_ID.search(href):
+            mod.mod_id = match.group(1)
+        self._link_text = []
+        self._link_depth = 1
+        self._link_from_name = from_name
+
+    def _end_block(self) -> None:
+        mod = self._mod
+        assert mod is not None
+        if not self._name_seen and self._fallback is not None:
+            href, text = self._fallback
+            mod.download_link = absolute_url(href)
+            if match := _CLASS_ID.search(href):
+                mod.mod_id = match.group(1)
+            mod.name = ''.join(text)
+        loaders: list[str] = []
+        for pieces in self._items:
+            text = ''.join(pieces)
+            if text.endswith(':') or text.endswith('：'):
+                loaders.append(text[:-1])
+            elif text and not mod.later_version:
+                mod.later_version = text
+        mod.loader = '/'.join(loaders)
+        self.mods.append(mod)
+        self._mod = None
+
+
+def parse_search_page(source: str) -> list[WebMod]:
+    """从 mod 列表页中解析出 WebMod 们，参考 SearchPageParser"""
+    parser = SearchPageParser()
+    parser.feed(source)
+    parser.close()
+    return parser.mods
+
+
+def parse_search_page_soup(source: str) -> list[WebMod]:
+    """用 BeautifulSoup 建立整个 DOM 树再查找的解析方式，结果与 parse_search_page 相同，
+    慢得多并且占用更多内存，只用于对照测试
+    """
+    from bs4 import BeautifulSoup
+    from bs4.element import Tag
     root: Tag = BeautifulSoup(source, 'html.parser')
     mod_blocks: list[Tag] = root.find_all('div', **{'class': 'modlist-block'})
+    result: list[WebMod] = []
     for block in mod_blocks:
-        block.find()
+        mod = WebMod()
+        name = block.find(**{'class': 'name'}) or block
+        link = name.find('a', href=True)
+        if isinstance(link, Tag):
+            mod.name = link.get_text(strip=True)
+            href = str(link['href'])
+            mod.download_link = absolute_url(href)
+            if match := _CLASS_ID.search(href):
+                mod.mod_id = match.group(1)
+        image = block.find('img')
+        if isinstance(image, Tag):
+            mod.image_url = absolute_url(str(image.get('data-src') or image.get('src') or ''))
+        mc_version = block.find(**{'class': 'mcver'})
+        if isinstance(mc_version, Tag):
+            loaders: list[str] = []
+            for li in mc_version.find_all('li'):
+                text = li.get_text(strip=True)
+                if text.endswith(':') or text.endswith('：'):
+                    loaders.append(text[:-1])
+                elif text and not mod.later_version:
+                    mod.later_version = text
+            mod.loader = '/'.join(loaders)
+        result.append(mod)
+    return result
 
 
 class McModSearchFilter(object):
@@ -49,6 +271,7 @@ class McModSearchFilter(object):
         self.sort: str = sort
 
     def to_dict(self) -> dict[str, str]:
+        """转换成查询参数，去掉没有设置的条件"""
         result = {
             'category': self.category,
             'mcver': self.mc_version,
@@ -58,29 +281,33 @@ class McModSearchFilter(object):
             'mode': self.mode,
             'sort': self.sort,
         }
-        for k in result.keys():
-            if not result[k]:
-                del result[k]
-        return result
+        return {k: v for k, v in result.items() if v}
 
 
-def _search_mod_callback(response: 'httpx.Response'):
-    if response.status_code != 200:
-        return
+def search_mod(page: int, filter: McModSearchFilter,
+               callback: Callable[[list[WebMod]], None],
+               url: str = MCMOD_SEARCH_URL, priority: int = 0,
+               on_error: Callable[[], None] | None = None) -> CachedGet:
+    """搜索 mod，结果经过 http 缓存，参考 CachedGet。返回的请求可以用 Cancel 取消
 
-
-def search_mod(page: int, filter: McModSearchFilter) -> list[WebMod]:
-    result: list[WebMod] = []
+    Args:
+        page: 页码，从 1 开始
+        callback: 得到这一页 WebMod 们的回调，命中缓存时在当前线程中调用，否则在下载线程中调用
+        url: 搜索页的地址
+        on_error: 请求失败并且没有缓存时的回调
+    """
     params = filter.to_dict()
     params['page'] = str(page)
-    Get(MCMOD_SEARCH_URL, params=params,
-        callback=_search_mod_callback)
-    return result
+    return CachedGet(url, params, callback, parse_search_page, SEARCH_PAGE_PARSED,
+                     priority=priority, on_error=on_error)
 
 
-if __name__ == 'main':
+if __name__ == '__main__':
+    import threading
+    done = threading.Event()
     search_mod(1, McModSearchFilter(
         mc_version='1.16.5',
         mode='1',
         loader='1',
-    ))
+    ), lambda mods: (print(mods), done.set()))
+    done.wait(30)
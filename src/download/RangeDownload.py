@@ -0,0 +1,199 @@
+"""可以续传的分段并行下载，由 DownloadManager 在 DownloadJob.resumable 为真时使用。
+
+先用 Range: bytes=0-0 探测服务器是否支持 Range 以及文件大小，支持并且文件足够大时：
+把文件分成若干段，每一段用一个 Range 请求并行下载，写入目标文件旁边的 <目标>.part 中对应的位置；
+每一段已经写入的字节数保存在 <目标>.part.json 中，下载中断后再次下载同一个文件时只下载没有完成的部分。
+进度文件同时记录了 url、大小和 ETag（或 Last-Modified），服务器上的文件变化后会重新下载。
+全部完成后校验大小和哈希值，通过后才改名为目标文件。
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from download import log
+from download.DownloadManager import (CHUNK_SIZE, RETRY_STATUS, SEGMENT_MIN_SIZE, DownloadJob,
+                                      DownloadManager, _RetryableError, new_hasher, verify)
+
+SAVE_INTERVAL: float = 0.5
+"""至少间隔多少秒保存一次进度文件"""
+
+
+class _RemoteChanged(_RetryableError):
+    """服务器上的文件和进度文件记录的不一致"""
+    pass
+
+
+class PartState(object):
+    """分段下载的进度，保存在 <目标>.part.json 中
+    """
+
+    def __init__(self, url: str, total: int, validator: str | None,
+                 segments: list[list[int]]) -> None:
+        self.url: str = url
+        self.total: int = total
+        self.validator: str | None = validator
+        """ETag 或者 Last-Modified，用于 If-Range"""
+        self.segments: list[list[int]] = segments
+        """[起始位置, 结束位置（包含）, 已经写入的字节数] 们"""
+
+    @staticmethod
+    def create(url: str, total: int, validator: str | None, count: int) -> 'PartState':
+        size = -(-total // count)
+        segments = [[start, min(start + size, total) - 1, 0] for start in range(0, total, size)]
+        return PartState(url, total, validator, segments)
+
+    @staticmethod
+    def load(file_path: str) -> 'PartState | None':
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return PartState(data['url'], data['total'], data['validator'], data['segments'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, file_path: str) -> None:
+        temp_path = file_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'url': self.url, 'total': self.total, 'validator': self.validator,
+                       'segments': self.segments}, f)
+        os.replace(temp_path, file_path)
+
+    def matches(self, url: str, total: int, validator: str | None) -> bool:
+        return self.url == url and self.total == total and self.validator == validator
+
+    @property
+    def done(self) -> int:
+        return sum(done for _, _, done in self.segments)
+
+
+def probe(manager: DownloadManager, job: DownloadJob) -> tuple[int | None, bool, str | None]:
+    """探测文件大小、是否支持 Range，以及 ETag 或 Last-Modified
+
+    Returns:
+        (大小, 是否支持 Range, 校验标记)
+    """
+    headers = {**(job.headers or {}), 'Range': 'bytes=0-0'}
+    with manager.client.stream('GET', job.url, params=job.params, headers=headers) as response:
+        if response.status_code in RETRY_STATUS:
+            raise _RetryableError(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+        if response.status_code == 206:
+            total = response.headers.get('Content-Range', '').rsplit('/', 1)[-1]
+            return (int(total) if total.isdigit() else None), True, validator
+        length = response.headers.get('Content-Length')
+        return (int(length) if length and length.isdigit() else None), False, validator
+
+
+def fetch_ranges(manager: DownloadManager, job: DownloadJob) -> bool:
+    """分段下载 job，服务器不支持 Range 或者文件太小时什么也不做并返回 False，交给普通的下载方式
+    """
+    assert job.target_path is not None
+    total, ranges, validator = probe(manager, job)
+    if not ranges or total is None or total < SEGMENT_MIN_SIZE * 2:
+        return False
+    job.total = total
+    part_path = job.target_path + '.part'
+    state_path = part_path + '.json'
+
+    state = PartState.load(state_path)
+    if (state is None or not state.matches(job.url, total, validator)
+            or not os.path.isfile(part_path) or os.path.getsize(part_path) != total):
+        count = max(1, min(manager.segments, total // SEGMENT_MIN_SIZE))
+        state = PartState.create(job.url, total, validator, count)
+        os.makedirs(os.path.dirname(os.path.abspath(part_path)), exist_ok=True)
+        with open(part_path, 'wb') as f:
+            f.truncate(total)
+        state.save(state_path)
+    elif state.done:
+        log.info(f"继续下载 {job.url}，已经完成 {state.done}/{total} 字节")
+    manager._progress(job, state.done)
+
+    lock = threading.Lock()
+    last_save = [time.perf_counter()]
+
+    def save(force: bool = False) -> None:
+        with lock:
+            if force or time.perf_counter() - last_save[0] >= SAVE_INTERVAL:
+                state.save(state_path)
+                last_save[0] = time.perf_counter()
+
+    def commit(index: int, written: int) -> None:
+        with lock:
+            state.segments[index][2] += written
+
+    def fetch_segment(index: int) -> None:
+        start, end, done = state.segments[index]
+        if start + done > end:
+            return
+        headers = {**(job.headers or {}), 'Range': f'bytes={start + done}-{end}'}
+        if validator:
+            headers['If-Range'] = validator
+        with manager.client.stream('GET', job.url, params=job.params, headers=headers) as response:
+            if response.status_code in RETRY_STATUS:
+                raise _RetryableError(f"HTTP {response.status_code}")
+            if response.status_code == 200:
+                # If-Range 不匹配时服务器会返回整个文件
+                raise _RemoteChanged("服务器上的文件已经改变")
+            response.raise_for_status()
+            left = end + 1 - start - done
+            written = 0
+            with open(part_path, 'r+b') as f:
+                f.seek(start + done)
+                for chunk in response.iter_bytes(CHUNK_SIZE):
+                    if job.cancelled:
+                        break
+                    chunk = chunk[:left]
+                    f.write(chunk)
+                    left -= len(chunk)
+                    written += len(chunk)
+                    manager._progress(job, len(chunk))
+                    if written >= CHUNK_SIZE * 16:
+                        # 先写到文件再记录进度，进度文件里的字节数不会超过真正写入的
+                        f.flush()
+                        commit(index, written)
+                        written = 0
+                        save()
+                    if not left:
+                        break
+                f.flush()
+                commit(index, written)
+            if left and not job.cancelled:
+                raise _RetryableError(f"第 {index} 段还差 {left} 字节")
+
+    errors: list[Exception] = []
+    with ThreadPoolExecutor(max_workers=len(state.segments)) as pool:
+        for future in [pool.submit(fetch_segment, i) for i in range(len(state.segments))]:
+            if error := future.exception():
+                errors.append(error)
+    save(force=True)
+
+    if job.cancelled:
+        return True
+    if any(isinstance(e, _RemoteChanged) for e in errors):
+        remove_part(job.target_path)
+    if errors:
+        raise errors[0]
+
+    hasher = new_hasher(job.expected_hash)
+    if hasher is not None:
+        with open(part_path, 'rb') as f:
+            while chunk := f.read(CHUNK_SIZE * 16):
+                hasher.update(chunk)
+    try:
+        verify(job, os.path.getsize(part_path), hasher)
+    except Exception:
+        remove_part(job.target_path)
+        raise
+    os.replace(part_path, job.target_path)
+    os.remove(state_path)
+    return True
+
+
+def remove_part(target_path: str) -> None:
+    """删除一个文件没有下载完的部分和进度"""
+    for file_path in (target_path + '.part', target_path + '.part.json'):
+        if os.path.exists(file_path):
+            os.remove(file_path)
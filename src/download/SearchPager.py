@@ -0,0 +1,208 @@
+"""mcmod 搜索结果的分页器，供下载页翻页浏览。
+
+打开一页时在后台预取后面 prefetch 页，翻到下一页时通常已经下载并解析好了；
+同一个 mod 在不同的页中出现时（翻页期间列表发生了变化）只保留页码最小的那一页中的；
+只在内存中保留离当前页最近的 window 页，更远的页被丢弃，再次打开时重新请求（一般会命中 http 缓存）；
+修改搜索条件时取消所有还没有完成的请求，它们的结果不会再出现。
+
+请求在下载线程中完成，结果先放在分页器中，由界面线程每帧调用 poll 交给 on_page。
+"""
+import threading
+from typing import Callable
+
+from download.HttpCache import CachedGet
+from download.McMod import MCMOD_SEARCH_URL, McModSearchFilter, search_mod
+from download.WebMod import WebMod
+
+_tPageCallback = Callable[[int, list[WebMod] | None], None]
+
+
+class SearchPager(object):
+    """分页的搜索结果，页码从 1 开始
+    """
+
+    def __init__(self, filter: McModSearchFilter,
+                 on_page: _tPageCallback | None = None,
+                 prefetch: int | None = None,
+                 window: int | None = None,
+                 url: str = MCMOD_SEARCH_URL) -> None:
+        """
+        Args:
+            on_page: 一页得到结果时由 poll 调用，结果为 None 表示请求失败，再次 goto 这一页会重试
+            prefetch: 预取当前页之后的几页，None 表示使用设置中的 search_prefetch_pages
+            window: 最多保留几页，None 表示使用设置中的 search_window_pages，至少是 prefetch + 1
+            url: 搜索页的地址
+        """
+        from data.Settings import settings
+        self.filter: McModSearchFilter = filter
+        self.on_page: _tPageCallback | None = on_page
+        self.prefetch: int = settings.search_prefetch_pages if prefetch is None else prefetch
+        self.window: int = max(settings.search_window_pages if window is None else window,
+                               self.prefetch + 1)
+        self.url: str = url
+        self.current: int = 1
+        self.last_page: int | None = None
+        """最后一页的页码，遇到空页之前不知道"""
+
+        self._lock = threading.Condition(threading.RLock())
+        """命中缓存时 search_mod 会在当前线程中直接回调，所以需要可重入"""
+        self._generation: int = 0
+        """每次修改搜索条件加一，之前的请求的结果会被丢弃"""
+        self._pages: dict[int, list[WebMod]] = {}
+        self._requests: dict[int, CachedGet] = {}
+        """还没有完成的请求"""
+        self._failed: set[int] = set()
+        self._ready: list[int] = []
+        """已经有结果但还没有交给 on_page 的页"""
+        self._owner: dict[str, int] = {}
+        """mod_id -> 这个 mod 所在的页码最小的页，被丢弃的页重新请求时仍然保留原来的 mod"""
+
+    def goto(self, page: int) -> list[WebMod] | None:
+        """打开一页并预取后面的页，已经有结果时返回结果，否则等 on_page"""
+        with self._lock:
+            self.current = max(1, page)
+            self._failed.discard(self.current)
+            self._schedule()
+            return self._pages.get(self.current)
+
+    def next(self) -> list[WebMod] | None:
+        return self.goto(self.current + 1) if self.has_next() else self.get(self.current)
+
+    def prev(self) -> list[WebMod] | None:
+        return self.goto(self.current - 1)
+
+    def has_next(self) -> bool:
+        return self.last_page is None or self.current < self.last_page
+
+    def set_filter(self, filter: McModSearchFilter) -> None:
+        """修改搜索条件，取消没有完成的请求，丢弃所有结果并回到第一页"""
+        with self._lock:
+            self._generation += 1
+            self._cancel(list(self._requests))
+            self.filter = filter
+            self.last_page = None
+            self._pages.clear()
+            self._failed.clear()
+            self._ready.clear()
+            self._owner.clear()
+        self.goto(1)
+
+    def get(self, page: int) -> list[WebMod] | None:
+        with self._lock:
+            return self._pages.get(page)
+
+    def wait(self, page: int, timeout: float | None = None) -> list[WebMod] | None:
+        """等待一页的结果，超时或者请求失败时返回 None，用于没有界面循环的场合"""
+        with self._lock:
+            self._lock.wait_for(lambda: page in self._pages or page in self._failed
+                                or page not in self._requests, timeout)
+            return self._pages.get(page)
+
+    def pending(self) -> list[int]:
+        """还在请求的页"""
+        with self._lock:
+            return sorted(self._requests)
+
+    def retained(self) -> list[int]:
+        """内存中保留的页"""
+        with self._lock:
+            return sorted(self._pages)
+
+    def poll(self) -> bool:
+        """在界面线程中调用，把新得到结果的页交给 on_page，返回是否有新的结果"""
+        with self._lock:
+            ready, self._ready = self._ready, []
+            results = [(page, self._pages.get(page)) for page in ready
+                       if page in self._pages or page in self._failed]
+        if self.on_page is not None:
+            for page, mods in results:
+                self.on_page(page, mods)
+        return bool(results)
+
+    def close(self) -> None:
+        """取消所有没有完成的请求"""
+        with self._lock:
+            self._generation += 1
+            self._cancel(list(self._requests))
+
+    def _wanted(self) -> list[int]:
+        pages = range(self.current, self.current + self.prefetch + 1)
+        return [page for page in pages if self.last_page is None or page <= self.last_page]
+
+    def _schedule(self) -> None:
+        wanted = self._wanted()
+        self._cancel([page for page in self._requests if page not in wanted])
+        self._evict()
+        for page in wanted:
+            if page not in self._pages and page not in self._requests and page not in self._failed:
+                self._request(page)
+
+    def _request(self, page: int) -> None:
+        generation = self._generation
+
+        def callback(mods: list[WebMod]) -> None:
+            self._on_result(generation, page, mods)
+
+        def on_error() -> None:
+            self._on_error(generation, page)
+
+        request = search_mod(page, self.filter, callback, url=self.url,
+                             priority=1 if page == self.current else 0, on_error=on_error)
+        # 命中缓存时已经回调过了
+        if page not in self._pages:
+            self._requests[page] = request
+
+    def _cancel(self, pages: list[int]) -> None:
+        for page in pages:
+            self._requests.pop(page).Cancel()
+
+    def _evict(self) -> None:
+        if len(self._pages) <= self.window:
+            return
+        # 先保留当前页和预取的页，然后离当前页越近越优先保留，距离相同时保留后面的页
+        end = self.current + self.prefetch
+        keep = sorted(self._pages, key=lambda page: (not self.current <= page <= end,
+                                                     abs(page - self.current), page < self.current))
+        for page in keep[self.window:]:
+            del self._pages[page]
+
+    def _on_result(self, generation: int, page: int, mods: list[WebMod]) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._requests.pop(page, None)
+            if not mods and (self.last_page is None or page - 1 < self.last_page):
+                self.last_page = page - 1
+                self._cancel([i for i in self._requests if i > self.last_page])
+            kept: list[WebMod] = []
+            seen: set[str] = set()
+            changed: set[int] = set()
+            for mod in mods:
+                if mod.mod_id:
+                    owner = self._owner.get(mod.mod_id, page)
+                    if owner < page or mod.mod_id in seen:
+                        continue
+                    if owner > page:
+                        changed.add(owner)
+                    self._owner[mod.mod_id] = page
+                    seen.add(mod.mod_id)
+                kept.append(mod)
+            self._pages[page] = kept
+            self._ready.append(page)
+            # 后面的页先到时，把重复的 mod 从后面的页中去掉，重新交给 on_page
+            for other in changed & self._pages.keys():
+                self._pages[other] = [mod for mod in self._pages[other]
+                                      if not mod.mod_id or self._owner[mod.mod_id] == other]
+                if other not in self._ready:
+                    self._ready.append(other)
+            self._evict()
+            self._lock.notify_all()
+
+    def _on_error(self, generation: int, page: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._requests.pop(page, None)
+            self._failed.add(page)
+            self._ready.append(page)
+            self._lock.notify_all()
@@ -1,48 +1,201 @@
 """ 图片缓存, 用来暂存 mod 的缩略图, 加快反复刷新 mod 列表时的响应速度
+
+缩略图在内存中解码(参考 data.mod.Thumbnail), 按格子放进共享的图集纹理里,
+get 返回图集纹理和缩略图在其中的 uv 坐标. 内容相同的图标共用一个格子.
+缓存按占用的字节数限制大小, 超出时通过 remove 删除最久没有用到的 mod 的缩略图.
+控件画出缩略图时用 use 标记格子正在显示, 换成别的图标时 unuse, 正在显示的格子不会被回收给别的图标,
+否则虚拟列表中还没有重新绑定的行会画出别的 mod 的图标.
+图集的像素在每帧开始时统一提交, 同一帧加载多个图标时每个图集只提交一次.
 """
-import os
-from io import BytesIO
+from array import array
+from collections import OrderedDict
+from typing import NamedTuple
 
 import dearpygui.dearpygui as dpg
-from PIL.Image import Resampling, Image, open as open_image
 from data import ModFile
+from data.mod.Thumbnail import get_thumbnail_cache, icon_digest, rgba_to_floats
+from gui.StateWatcher import on_update
 
-cache: dict[ModFile, int | str] = {}
+ATLAS_CELLS: int = 4
+"""每个图集每边放多少个缩略图"""
+MAX_BYTES: int = 64 * 1024 * 1024
+"""全部缩略图占用的字节数上限, 每个像素按 4 个 float 计算"""
 
+_tCellKey = tuple[str, int]
+"""(图标内容的哈希, 边长)"""
 
-def get(mod: ModFile, height: int = 180) -> int | str:
-    """获取某个 mod 的缩略图, 若已经缓存则直接返回, 否则生成
-    """
-    if mod not in cache:
-        icon = mod.get_icon()
-        if not icon:
-            return 0
-        img: Image = open_image(BytesIO(icon))
-        img = img.resize((height, height), Resampling.NEAREST)
-        img.save('./___temp___.png')
 
-        width, height, _, img_data = dpg.load_image('./___temp___.png')
+class Thumb(NamedTuple):
+    """一个缩略图在图集中的位置"""
+    texture: int | str
+    uv_min: tuple[float, float]
+    uv_max: tuple[float, float]
+    key: _tCellKey
 
-        os.remove('./___temp___.png')
 
+class _Atlas:
+    """一张图集纹理, 被划分成 ATLAS_CELLS x ATLAS_CELLS 个格子"""
+
+    def __init__(self, cell_size: int):
+        self.cell_size: int = cell_size
+        self.width: int = cell_size * ATLAS_CELLS
+        self.pixels: array = array('f', bytes(self.width * self.width * 4 * 4))
+        self.free: list[int] = list(range(ATLAS_CELLS * ATLAS_CELLS - 1, -1, -1))
+        self.dirty: bool = False
         with dpg.texture_registry():
-            cache[mod] = dpg.add_static_texture(width, height, img_data)
+            self.texture: int | str = dpg.add_dynamic_texture(
+                self.width, self.width, self.pixels)  # type: ignore
+
+    def put(self, cell: int, rgba: bytes, key: _tCellKey) -> Thumb:
+        size = self.cell_size
+        x, y = cell % ATLAS_CELLS * size, cell // ATLAS_CELLS * size
+        floats = rgba_to_floats(rgba, size)
+        row = size * 4
+        for i in range(size):
+            start = ((y + i) * self.width + x) * 4
+            self.pixels[start:start + row] = floats[i * row:(i + 1) * row]
+        self.dirty = True
+        return Thumb(self.texture, (x / self.width, y / self.width),
+                     ((x + size) / self.width, (y + size) / self.width), key)
+
+
+class _Cell:
+    def __init__(self, atlas: _Atlas, index: int, thumb: Thumb):
+        self.atlas = atlas
+        self.index = index
+        self.thumb = thumb
+        self.refs: int = 0
+        """缓存中使用这个格子的 mod 的数量"""
+        self.users: int = 0
+        """正在显示这个格子的控件的数量"""
+
+
+cache: OrderedDict[int, tuple[ModFile, Thumb, _tCellKey]] = OrderedDict()
+"""id(mod) -> (mod, 缩略图, 格子), 按最近使用的顺序排列.
+按对象本身区分 mod, mod 文件改名后身份标识变化也能找到原来的缩略图"""
+_cells: dict[_tCellKey, _Cell] = {}
+_atlases: dict[int, list[_Atlas]] = {}
+"""边长 -> 这个边长的图集们"""
+size: int = 0
+"""全部缩略图占用的字节数"""
+_registered: bool = False
+
+
+def _flush():
+    """把有变化的图集提交给 dpg"""
+    for atlases in _atlases.values():
+        for atlas in atlases:
+            if atlas.dirty:
+                dpg.set_value(atlas.texture, atlas.pixels)
+                atlas.dirty = False
+
+
+def _alloc(key: _tCellKey, rgba: bytes) -> _Cell:
+    global size, _registered
+    if not _registered:
+        on_update.append(_flush)
+        _registered = True
+    cell_size = key[1]
+    atlases = _atlases.setdefault(cell_size, [])
+    atlas = next((i for i in atlases if i.free), None)
+    if atlas is None:
+        atlas = _Atlas(cell_size)
+        atlases.append(atlas)
+    index = atlas.free.pop()
+    cell = _Cell(atlas, index, atlas.put(index, rgba, key))
+    _cells[key] = cell
+    size += cell_size * cell_size * 4 * 4
+    return cell
+
+
+def _release(key: _tCellKey):
+    cell = _cells[key]
+    cell.refs -= 1
+    _free_unused(key, cell)
+
+
+def _free_unused(key: _tCellKey, cell: _Cell):
+    """没有 mod 使用、也没有控件在显示的格子才会被回收"""
+    global size
+    if cell.refs > 0 or cell.users > 0:
+        return
+    del _cells[key]
+    size -= key[1] * key[1] * 4 * 4
+    # 空出来的图集留着给之后的缩略图用, 正在显示的控件可能还引用着它的纹理
+    cell.atlas.free.append(cell.index)
+
+
+def get(mod: ModFile, height: int = 180) -> Thumb | None:
+    """获取某个 mod 的缩略图, 若已经缓存则直接返回, 否则生成. mod 没有图标或图标无法解码时返回 None
+    """
+    cached = cache.get(id(mod))
+    if cached is not None:
+        cache.move_to_end(id(mod))
+        return cached[1]
+    icon = mod.get_icon()
+    if not icon:
+        return None
+    digest = icon_digest(icon)
+    key = (digest, height)
+    cell = _cells.get(key)
+    if cell is None:
+        rgba = get_thumbnail_cache().get(icon, height, digest)
+        if rgba is None:
+            return None
+        cell = _alloc(key, rgba)
+    cell.refs += 1
+    cache[id(mod)] = (mod, cell.thumb, key)
+    if size > MAX_BYTES:
+        _evict(id(mod))
+    return cell.thumb
+
+
+def _evict(keep: int):
+    """按最久没有用到的顺序移除缩略图直到不超过大小限制.
+    正在显示的格子移除了也不会空出来, 所以跳过它们; 刚刚加入的 keep 还没有来得及显示, 也跳过
+    """
+    for mod_id in list(cache):
+        if size <= MAX_BYTES:
+            return
+        mod, _, key = cache[mod_id]
+        if mod_id != keep and not _cells[key].users:
+            remove(mod)
+
+
+def use(thumb: Thumb):
+    """标记一个控件开始显示这个缩略图, 在 unuse 之前它的格子不会被回收"""
+    cell = _cells.get(thumb.key)
+    if cell is not None and cell.thumb is thumb:
+        cell.users += 1
+
 
-    return cache[mod]
+def unuse(thumb: Thumb):
+    """标记一个控件不再显示这个缩略图, 已经被移除的缩略图的格子这时才会被回收"""
+    cell = _cells.get(thumb.key)
+    if cell is not None and cell.thumb is thumb and cell.users > 0:
+        cell.users -= 1
+        _free_unused(thumb.key, cell)
 
 
 def remove(mod: ModFile | list[ModFile]):
-    """移除某些已经缓存好的mod缩略图,释放内存(其实也占不了多少地方)
+    """移除某些已经缓存好的mod缩略图, 没有 mod 再使用的格子会被回收
     """
     if isinstance(mod, list):
         for m in mod:
             remove(m)
         return
-    if mod in cache:
-        dpg.delete_item(cache[mod])
-        del cache[mod]
+    cached = cache.pop(id(mod), None)
+    if cached is not None:
+        _release(cached[2])
 
 
 def clear():
-    """清空全部缓存的图片"""
-    remove(list(cache.keys()))
+    """清空全部缓存的图片并删除图集纹理, 调用前应当先清空显示缩略图的控件"""
+    global size
+    remove([i[0] for i in cache.values()])
+    for atlases in _atlases.values():
+        for atlas in atlases:
+            dpg.delete_item(atlas.texture)
+    _atlases.clear()
+    _cells.clear()
+    size = 0
@@ -1,10 +1,15 @@
 import dearpygui.dearpygui as dpg
 from gui.MainWindow import MainWindow
-from gui.StateWatcher import watchers, on_update
+from gui.StateWatcher import bind_input_handlers, idle_wait, on_update, update
+from data import ModManager, Trace
+from data.mod.ModCache import get_mod_cache
+from download.DownloadManager import close_download_manager
 from data.Settings import settings
 
 
 def setup():
+    if settings.trace_file:
+        Trace.enable()
     dpg.create_context()
 
     dpg.create_viewport(x_pos=300)
@@ -16,11 +21,20 @@ def setup():
     dpg.show_viewport()
 
     dpg.set_global_font_scale(settings.global_size)
+    mods_watcher = ModManager.get().start_watch()
+    on_update.append(mods_watcher.dispatch)
+    bind_input_handlers()
     while dpg.is_dearpygui_running():
-        for watcher in watchers:
-            watcher.check()
-        for update_fun in on_update:
-            update_fun()
+        update()
         dpg.render_dearpygui_frame()
+        idle_wait()
 
+    ModManager.get().stop_watch()
+    # 使用期间完整解析的 mod 只写回了内存中的缓存
+    cache = get_mod_cache()
+    if cache:
+        cache.save()
+    close_download_manager()
     dpg.destroy_context()
+    if settings.trace_file:
+        Trace.export_chrome_trace(settings.trace_file)
@@ -1,9 +1,20 @@
 """全局实现监听器, 用于实现每帧进行的一些动作
+
+监听器按 控件 -> 状态 建立索引, 每帧只检查能看到的控件的监听器.
+另外支持定时器和一次性任务, 它们和 on_update 一起在每帧渲染之前运行.
+没有输入、没有后台任务、也没有快要到期的定时器时进入空闲状态, 帧率降到 settings.idle_fps,
+有输入或者调用 wake 后马上恢复正常帧率.
 """
 
+import heapq
+import time
+
 import dearpygui.dearpygui as dpg
 from typing import Callable
 
+from data.LoadTask import LoadTask
+from data.Settings import settings
+
 tItem = int | str
 tState = str
 tCallback = Callable[[tItem], None]
@@ -33,23 +44,154 @@ class StateWatcher:
                 self.else_callback(self.item)
 
 
-watchers: list[StateWatcher] = []
+watchers: dict[tItem, dict[tState, list[StateWatcher]]] = {}
+"""控件 -> 状态 -> 监听器们"""
 
 
 def bind_watcher(watcher: StateWatcher):
-    watchers.append(watcher)
+    watchers.setdefault(watcher.item, {}).setdefault(watcher.state, []).append(watcher)
 
 
 def remove_watcher(item: int | str, state: str | None = None):
-    remove_list = []
-    for w in watchers:
-        if item == w.item:
-            if state is None:
-                remove_list.append(w)
-            elif state == w.state:
-                remove_list.append(w)
-    for r in remove_list:
-        watchers.remove(r)
-
-
-on_update: list[Callable[[], None]] = []
+    states = watchers.get(item)
+    if states is None:
+        return
+    if state is None:
+        del watchers[item]
+        return
+    states.pop(state, None)
+    if not states:
+        del watchers[item]
+
+
+def check_watchers():
+    """检查能看到的控件的监听器, 看不到的控件(包括所在页面被隐藏的控件)跳过"""
+    for item, states in list(watchers.items()):
+        if not dpg.is_item_visible(item):
+            continue
+        for state_watchers in list(states.values()):
+            for watcher in state_watchers:
+                watcher.check()
+
+
+class Timer:
+    """定时器或一次性任务, 由 call_later 和 call_every 创建"""
+
+    def __init__(self, when: float, interval: float | None, callback: Callable[[], None]):
+        self.when: float = when
+        self.interval: float | None = interval
+        """重复的间隔秒数, None 表示只运行一次"""
+        self.callback = callback
+        self.cancelled: bool = False
+
+    def __lt__(self, other: 'Timer') -> bool:
+        return self.when < other.when
+
+    def cancel(self):
+        self.cancelled = True
+
+
+_timers: list[Timer] = []
+
+
+def call_later(delay: float, callback: Callable[[], None]) -> Timer:
+    """在 delay 秒之后的第一帧运行一次 callback, delay 为 0 表示下一帧"""
+    timer = Timer(time.perf_counter() + delay, None, callback)
+    heapq.heappush(_timers, timer)
+    return timer
+
+
+def call_every(interval: float, callback: Callable[[], None]) -> Timer:
+    """每隔 interval 秒运行一次 callback, 空闲时也会按时运行"""
+    timer = Timer(time.perf_counter() + interval, interval, callback)
+    heapq.heappush(_timers, timer)
+    return timer
+
+
+def run_timers():
+    """运行已经到期的定时器"""
+    now = time.perf_counter()
+    while _timers and _timers[0].when <= now:
+        timer = heapq.heappop(_timers)
+        if timer.cancelled:
+            continue
+        timer.callback()
+        if timer.interval is not None and not timer.cancelled:
+            # 落后太多时不补运行错过的次数
+            timer.when = max(timer.when + timer.interval, now)
+            heapq.heappush(_timers, timer)
+    while _timers and _timers[0].cancelled:
+        heapq.heappop(_timers)
+
+
+ACTIVE_SECONDS: float = 1.0
+"""最后一次输入之后保持正常帧率的秒数, 要足够悬停动画播放完"""
+_last_active: float = 0.0
+
+
+def wake(*args):
+    """表示有输入或者有需要显示的变化, 在 ACTIVE_SECONDS 内保持正常帧率, 可以直接用作 dpg 的回调"""
+    global _last_active
+    _last_active = time.perf_counter()
+
+
+def is_idle() -> bool:
+    return time.perf_counter() - _last_active > ACTIVE_SECONDS and not load_tasks
+
+
+def bind_input_handlers():
+    """监听鼠标、键盘和窗口大小的变化, 有输入时退出空闲状态"""
+    with dpg.handler_registry():
+        dpg.add_mouse_move_handler(callback=wake)
+        dpg.add_mouse_click_handler(callback=wake)
+        dpg.add_mouse_release_handler(callback=wake)
+        dpg.add_mouse_wheel_handler(callback=wake)
+        dpg.add_key_press_handler(callback=wake)
+        dpg.add_key_release_handler(callback=wake)
+    dpg.set_viewport_resize_callback(wake)
+    wake()
+
+
+def update():
+    """每帧渲染之前调用, 空闲时不检查监听器(没有输入时控件的状态不会改变)"""
+    if not is_idle():
+        check_watchers()
+    run_timers()
+    for update_fun in on_update:
+        update_fun()
+
+
+def idle_wait():
+    """每帧渲染之后调用, 空闲时等待到下一个空闲帧或者下一个定时器到期"""
+    if not is_idle():
+        return
+    delay = 1 / max(settings.idle_fps, 1)
+    if _timers:
+        delay = min(delay, max(_timers[0].when - time.perf_counter(), 0))
+    # 输入要在下一次渲染时才会被 dpg 处理, 所以这里直接等待, 空闲时响应输入最多慢一个空闲帧
+    time.sleep(delay)
+
+
+load_tasks: list[LoadTask] = []
+"""正在进行的后台加载任务"""
+
+
+def add_load_task(task: LoadTask | None):
+    """让后台加载任务的结果在之后每帧的 on_update 中取出, 任务结束或被取消后自动移除"""
+    if task is not None:
+        load_tasks.append(task)
+
+
+def drain_load_tasks():
+    """在 settings.frame_budget_ms 的时间内取出后台加载任务的结果, 剩下的留到下一帧"""
+    if not load_tasks:
+        return
+    deadline = time.perf_counter() + settings.frame_budget_ms / 1000
+    for task in list(load_tasks):
+        if task.drain(deadline):
+            load_tasks.remove(task)
+        if time.perf_counter() >= deadline:
+            break
+
+
+on_update: list[Callable[[], None]] = [drain_load_tasks]
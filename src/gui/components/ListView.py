@@ -1,6 +1,9 @@
+from typing import Callable
+
 import dearpygui.dearpygui as dpg
 
-from gui.components import ComponentBase
+from gui.components import ComponentBase, tItem
+from gui.StateWatcher import on_update
 
 
 class ListView(ComponentBase):
@@ -37,3 +40,130 @@ class ListView(ComponentBase):
         for i in self.values:
             dpg.delete_item(i)
         self.values.clear()
+
+
+class VirtualListView(ComponentBase):
+    """虚拟列表, 只为视口中能看到的行创建控件.
+
+    行控件放在一个控件池中反复使用: 滚动时把它们重新绑定到新的数据上,
+    上下两个占位控件撑开滚动范围, 所以控件的数量只和视口的高度有关, 和数据的数量无关.
+    每帧检查一次滚动位置和视口高度, 数据变化后调用 set_count 或 invalidate, 在下一帧统一重新绑定.
+    values 中是控件池中的行控件, 行控件只能由 create_row 创建, 所以没有 ListView 的 add 和 remove.
+    """
+
+    def __init__(self, row_height: int,
+                 create_row: Callable[[], tItem],
+                 bind_row: Callable[[int, int], None]):
+        """
+        Args:
+            row_height: 行控件的高度, 所有行的高度必须相同
+            create_row: 创建一个新的行控件并返回它的 tag, 调用时容器栈顶就是列表
+            bind_row: 把第几个行控件绑定到第几条数据上
+        """
+        super().__init__()
+        self.values: list[tItem] = []
+        self.row_height: int = row_height
+        self.row_pitch: int = row_height + 4
+        """相邻两行的距离(行高加上控件间距), 第一次同时显示两行时会重新测量"""
+        self.pitch_measured: bool = False
+        self.create_row = create_row
+        self.bind_row = bind_row
+        self.count: int = 0
+        """数据的数量"""
+        self.first: int = 0
+        """第一个行控件对应的数据序号"""
+        self.bound: list[int] = []
+        """每个行控件绑定的数据序号, -1 表示没有绑定(隐藏)"""
+        self.top_spacer: tItem = 0
+        self.bottom_spacer: tItem = 0
+        self.dirty: bool = True
+        self.view_height: int = 0
+
+    def setup(self, **kwargs):
+        with dpg.child_window(**kwargs) as window:
+            self.ui = window  # type: ignore
+        self.top_spacer = dpg.add_spacer(height=1, parent=self.ui, show=False)  # type: ignore
+        self.bottom_spacer = dpg.add_spacer(height=1, parent=self.ui, show=False)  # type: ignore
+        on_update.append(self.update)
+
+    def set_count(self, count: int):
+        """设置数据的数量, 所有的行会在下一帧重新绑定, 数据的顺序或内容变化时也应该调用"""
+        self.count = count
+        self.dirty = True
+
+    def invalidate(self, index: int):
+        """某一条数据的内容变化后, 如果它正在显示就立即重新绑定"""
+        if index in self.bound:
+            self.bind_row(self.bound.index(index), index)
+
+    def clear(self):
+        """清空数据并回到顶部, 控件池保留下来继续使用
+        """
+        self.set_count(0)
+        dpg.set_y_scroll(self.ui, 0)
+        self.update()
+
+    def update(self):
+        """每帧调用, 滚动位置、视口高度或者数据变化时重新绑定行控件"""
+        if not self.dirty and not dpg.is_item_visible(self.ui):
+            return
+        self._measure_pitch()
+        view_height = dpg.get_item_rect_size(self.ui)[1]
+        # 数据变少时滚动位置要到下一帧才会被修正, 这里先保证最后一屏是满的
+        last_first = self.count - view_height // self.row_pitch - 1
+        first = max(0, min(int(dpg.get_y_scroll(self.ui) // self.row_pitch), last_first))
+        if not self.dirty and first == self.first and view_height == self.view_height:
+            return
+        rebind = self.dirty
+        self.dirty = False
+        self.first = first
+        self.view_height = view_height
+        self._ensure_pool(view_height // self.row_pitch + 2)
+        self._layout(rebind)
+
+    def _measure_pitch(self):
+        """控件间距由主题决定, 所以在两行都显示出来之后用它们的位置测量行距"""
+        if self.pitch_measured or len(self.values) < 2 or self.bound[1] < 0 \
+                or not dpg.is_item_visible(self.values[1]):
+            return
+        pitch = dpg.get_item_pos(self.values[1])[1] - dpg.get_item_pos(self.values[0])[1]
+        if pitch < self.row_height:
+            return
+        self.pitch_measured = True
+        if pitch != self.row_pitch:
+            self.row_pitch = pitch
+            self.dirty = True
+
+    def _ensure_pool(self, size: int):
+        while len(self.values) < size:
+            dpg.push_container_stack(self.ui)
+            row = self.create_row()
+            dpg.pop_container_stack()
+            dpg.move_item(row, parent=self.ui, before=self.bottom_spacer)
+            dpg.hide_item(row)
+            self.values.append(row)
+            self.bound.append(-1)
+
+    def _layout(self, rebind: bool):
+        spacing = self.row_pitch - self.row_height
+        last = min(self.count, self.first + len(self.values))
+        # 占位控件自己也会带来一个控件间距, 从高度中减掉, 让行的位置和不虚拟时一致
+        self._set_spacer(self.top_spacer, self.first * self.row_pitch - spacing)
+        self._set_spacer(self.bottom_spacer, (self.count - last) * self.row_pitch - spacing)
+        for j, row in enumerate(self.values):
+            index = self.first + j
+            if index < last:
+                if rebind or self.bound[j] != index:
+                    self.bind_row(j, index)
+                    self.bound[j] = index
+                dpg.show_item(row)
+            elif self.bound[j] >= 0:
+                self.bound[j] = -1
+                dpg.hide_item(row)
+
+    @staticmethod
+    def _set_spacer(spacer: tItem, height: int):
+        if height > 0:
+            dpg.configure_item(spacer, height=height, show=True)
+        else:
+            dpg.hide_item(spacer)
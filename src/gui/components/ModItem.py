@@ -11,14 +11,21 @@ class ModItem(ComponentBase):
     """mod 列表中展示的 mod 项目, 包含图标, 信息, 操作按钮
     """
 
-    def __init__(self, mod: ModFile):
+    def __init__(self, mod: ModFile | None = None):
+        """
+        Args:
+            mod: 要显示的 mod, 为 None 时创建空的控件, 之后再用 bind 绑定
+        """
         super().__init__()
         self.main_button_ui: int | str = 0
         self.minor_button_ui: int | str = 0
         self.title_ui: int | str = -1
         self.info_ui: int | str = -1
         self.desc_ui: int | str = -1
-        self.mod = mod
+        self.icon_ui: int | str = -1
+        self.thumb: ImageCache.Thumb | None = None
+        """正在显示的缩略图"""
+        self.mod: ModFile = mod  # type: ignore
         self.height: int = settings.get_size(180)
         self.table: int | str = -1
 
@@ -29,16 +36,12 @@ class ModItem(ComponentBase):
                 self.__setup_icon()
                 self.__setup_info()
                 self.__setup_buttons()
+        if self.mod is not None:
+            self.bind(self.mod)
 
     def __setup_icon(self):
         with dpg.child_window(height=self.height, width=self.height, border=False):
-            if self.mod.get_icon():
-                img = ImageCache.get(self.mod, self.height)
-                with dpg.drawlist(width=self.height, height=self.height):
-                    dpg.draw_image(img, (0, 0), (self.height, self.height))
-            else:
-                dpg.add_child_window(
-                    border=False, width=self.height, height=self.height)
+            self.icon_ui = dpg.add_drawlist(width=self.height, height=self.height)
 
     def __setup_info(self):
         with dpg.child_window(height=self.height, width=-220, border=False, no_scrollbar=True):
@@ -47,7 +50,6 @@ class ModItem(ComponentBase):
             dpg.add_spacer()
             self.info_ui = dpg.add_text()
             self.desc_ui = dpg.add_text()
-            self.reshow_info()
 
     def __setup_buttons(self):
         with dpg.child_window(height=self.height, width=-10, border=False) as buttons:
@@ -65,6 +67,29 @@ class ModItem(ComponentBase):
                 dpg.bind_item_theme(self.minor_button_ui, 'button_zero')
             dpg.bind_item_theme(buttons, 'zero')  # type: ignore
 
+    def bind(self, mod: ModFile):
+        """让控件显示另一个 mod, 虚拟列表滚动时会把同一个控件绑定到不同的 mod 上
+        """
+        self.mod = mod
+        self.reshow_icon()
+        self.reshow_info()
+
+    def reshow_icon(self):
+        """刷新控件上显示的 mod 图标
+        """
+        dpg.delete_item(self.icon_ui, children_only=True)
+        # 先放开原来的缩略图, 它的格子在没有别的控件显示时才能回收
+        if self.thumb is not None:
+            ImageCache.unuse(self.thumb)
+            self.thumb = None
+        if self.mod.has_icon():
+            thumb = ImageCache.get(self.mod, self.height)
+            if thumb:
+                ImageCache.use(thumb)
+                self.thumb = thumb
+                dpg.draw_image(thumb.texture, (0, 0), (self.height, self.height),
+                               uv_min=thumb.uv_min, uv_max=thumb.uv_max, parent=self.icon_ui)
+
     def reshow_info(self):
         """刷新控件上显示的mod名字, 文件名, 描述信息
         """
@@ -75,7 +100,8 @@ class ModItem(ComponentBase):
         for info in self.mod.mod_info:
             infos.append(
                 f"API:{info.loader}   VER:{info.version}   MC:{info.mc_version}")
-            if len(info.description) > len(des):
+            # 快速解析的 mod 还没有描述，这里不主动触发完整解析，完整解析后刷新时才显示
+            if info.is_full and len(info.description) > len(des):
                 des = info.description
 
         dpg.set_value(self.info_ui,
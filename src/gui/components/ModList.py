@@ -1,15 +1,21 @@
+from functools import partial
 from typing import Callable
 
 import dearpygui.dearpygui as dpg
-from data import ModFile
+from data import ModFile, iter_full_mods
+from data.LoadTask import LoadTask
+from data.ModFilter import ModFilter
+from data.SearchIndex import SearchIndex
 from data.Settings import settings
 from gui.components import ComponentBase
-from gui.components.ListView import ListView
+from gui.components.ListView import VirtualListView
 from gui.components.ModItem import ModItem
+from gui.StateWatcher import add_load_task
 
 
 class ModList(ComponentBase):
-    """mod 列表组件, 包含加载器筛选器, 版本筛选器, 名称筛选器, 刷新按钮
+    """mod 列表组件, 包含加载器筛选器, 版本筛选器, 名称筛选器, 刷新按钮.
+    列表是虚拟的, 只有能看到的几行有 ModItem 控件, 滚动时把它们重新绑定到别的 mod 上.
     """
 
     def __init__(self,
@@ -29,7 +35,8 @@ class ModList(ComponentBase):
             show_name_filter: 是否显示名称筛选. Defaults to True.
             show_tools: 是否显示工具栏(各种筛选和刷新按钮的部分). Defaults to True.
             reload_callback: 点击刷新按钮的回调. Defaults to None.
-            on_create_mod_item: 创建新的ModItem的回调,可以在这个回调里面对ModItem做些设定. Defaults to None.
+            on_create_mod_item: ModItem 绑定到一个 mod 时的回调,可以在这个回调里面对ModItem做些设定.
+                控件会被复用, 每次绑定到新的 mod 上都会调用. Defaults to None.
         """
         self.reload_callback = reload_callback
         self.show_reload_button = show_reload_button
@@ -37,12 +44,23 @@ class ModList(ComponentBase):
         self.show_version_filter: bool = show_version_filter
         self.show_name_filter: bool = show_name_filter
         self.show_tools: bool = show_tools
-        self.lv: ListView = None  # type: ignore
+        self.lv: VirtualListView = None  # type: ignore
         self.loading = False
         self.search_input_ui: int = 0
         self.reload_button: int = 0
         self.loading_indicator: int = 0
+        self.mods: list[ModFile] = []
+        """列表中的全部 mod"""
+        self.shown_mods: list[ModFile] = []
+        """通过筛选的 mod, 按加入的顺序"""
         self.mod_items: list[ModItem] = []
+        """控件池, 数量只和视口高度有关"""
+        self.search_index: SearchIndex = SearchIndex()
+        """列表中全部 mod 的搜索索引，第一次搜索时才会真正建立"""
+        self.mod_filter: ModFilter = ModFilter()
+        """加载器、版本和关键字筛选，只告诉列表哪些控件的可见性发生了变化"""
+        self.full_task: LoadTask | None = None
+        """在后台补全快速解析的 mod 的任务, 参考 load_full_in_background"""
         self.on_create_mod_item = on_create_mod_item
         self.filter: dict[str, str | bool] = {
             'forge': True,
@@ -84,7 +102,7 @@ class ModList(ComponentBase):
                             label="刷新", width=-1, callback=self.reload_callback)  # type: ignore
                         self.loading_indicator = dpg.add_loading_indicator(  # type: ignore
                             radius=1, show=False)
-            self.lv = ListView()
+            self.lv = VirtualListView(settings.get_size(180), self._create_row, self._bind_row)
             self.lv.setup()
 
     def set_loading(self, loading: bool):
@@ -105,8 +123,13 @@ class ModList(ComponentBase):
     def clear(self):
         """清空 mod 列表
         """
+        self.cancel_full_task()
+        self.mods.clear()
+        self.shown_mods.clear()
+        self.search_index.clear()
+        self.mod_filter.clear()
+        self._apply_filter_options()
         self.lv.clear()
-        self.mod_items.clear()
         self.set_loading(False)
 
     def add(self, mod: ModFile):
@@ -115,50 +138,83 @@ class ModList(ComponentBase):
         Args:
             mod (ModInfo): 新mod
         """
-        mi = ModItem(mod)
-        dpg.push_container_stack(self.lv.ui)
-        mi.setup()
-        if self.on_create_mod_item:
-            self.on_create_mod_item(mi)
-
-        dpg.pop_container_stack()
-        dpg.set_item_user_data(mi.ui, mi.mod)
-        self.mod_items.append(mi)
-        self.lv.add(mi.ui)
+        self.mods.append(mod)
+        self.search_index.add(mod)
+        keyword: str = self.filter['keyword']  # type: ignore
+        _, visible = self.mod_filter.add(mod, self.search_index.matches(mod, keyword))
+        if visible:
+            self.shown_mods.append(mod)
+            self.lv.set_count(len(self.shown_mods))
 
     def remove(self, mod: ModFile):
         """删除一个mod
         """
-        remove_target = None
-        for mod_item in self.mod_items:
-            if mod_item.mod == mod:
-                remove_target = mod_item
-        if remove_target is None:
+        # mods 和 shown_mods 都按槽位的顺序排列, 所以位置可以从筛选器的位集直接算出来,
+        # 不需要按对象查找(mod 文件被改名后身份标识会变化, 不能用 list.index)
+        index = self.mod_filter.index_of(mod, self.mod_filter.alive)
+        if index < 0:
+            return
+        shown_index = self.mod_filter.index_of(mod, self.mod_filter.visible)
+        del self.mods[index]
+        self.search_index.remove(mod)
+        self.mod_filter.remove(mod)
+        if shown_index >= 0:
+            del self.shown_mods[shown_index]
+            self.lv.set_count(len(self.shown_mods))
+
+    def refresh(self, mod: ModFile):
+        """mod 的信息发生变化（例如文件被重命名、启用或禁用）后刷新对应的控件
+        """
+        # 只有正在显示的 mod 有控件, 其它的 mod 滚动到时会重新绑定
+        index = self.mod_filter.index_of(mod, self.mod_filter.visible)
+        if index >= 0:
+            self.lv.invalidate(index)
+
+    def load_full_in_background(self):
+        """在后台完整解析列表中快速解析的 mod, 每补全一个就刷新它的控件, 这样才会显示描述等信息.
+        之后的搜索和检查也不需要在界面线程中打开 jar. 列表中的 mod 都已经完整时什么也不做
+        """
+        self.cancel_full_task()
+        if all(mod.is_full for mod in self.mods):
             return
-        self.mod_items.remove(remove_target)
-        self.lv.remove(remove_target.ui)
+        self.full_task = LoadTask(partial(iter_full_mods, list(self.mods)), self.refresh,
+                                  name='LoadFullMods').start()
+        add_load_task(self.full_task)
+
+    def cancel_full_task(self):
+        if self.full_task:
+            self.full_task.cancel()
+            self.full_task = None
+
+    def _create_row(self) -> int | str:
+        mi = ModItem()
+        mi.setup()
+        self.mod_items.append(mi)
+        return mi.ui
+
+    def _bind_row(self, row: int, index: int):
+        mi = self.mod_items[row]
+        mi.bind(self.shown_mods[index])
+        if self.on_create_mod_item:
+            self.on_create_mod_item(mi)
 
     def on_filter_change(self, item, value, data: str):
         """内部回调, 当各种筛选器被修改时触发
         """
-        self.filter[data.split('_')[1]] = value
-        for i in self.lv.values:
-            mod: ModFile = dpg.get_item_user_data(i)  # type: ignore
-            show = False
-            if self.filter['forge'] and 'forge' in mod.support_loaders():
-                show = True
-            elif self.filter['fabric'] and 'fabric' in mod.support_loaders():
-                show = True
-            elif self.filter['quilt'] and 'quilt' in mod.support_loaders():
-                show = True
-            elif self.filter['other'] and 'forge' not in mod.support_loaders() and \
-                    'fabric' not in mod.support_loaders() and 'quilt' not in mod.support_loaders():
-                show = True
-            if self.filter['keyword']:
-                inp: str = self.filter['keyword']  # type: ignore
-                if mod.in_search(inp):
-                    show = False
-            if show:
-                dpg.show_item(i)
-            else:
-                dpg.hide_item(i)
+        key = data.split('_')[1]
+        self.filter[key] = value
+        self._apply_filter_options(keyword_changed=key == 'keyword')
+        # 可见性没有变化时不需要重新绑定控件
+        shown, hidden = self.mod_filter.refresh()
+        if shown or hidden:
+            self.shown_mods = self.mod_filter.visible_mods()
+            self.lv.set_count(len(self.shown_mods))
+
+    def _apply_filter_options(self, keyword_changed: bool = True):
+        """把 filter 中的选项交给筛选器，关键字只在变化时才重新查询索引
+        """
+        self.mod_filter.loaders = {i for i in ('forge', 'fabric', 'quilt', 'other') if self.filter[i]}
+        self.mod_filter.version = self.filter['version']  # type: ignore
+        if keyword_changed:
+            self.mod_filter.set_keyword_matches(
+                self.search_index.match_ids(self.filter['keyword']))  # type: ignore
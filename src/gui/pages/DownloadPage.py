@@ -1,17 +1,123 @@
-from gui.pages import PageBase
+import os
+import time
+
 import dearpygui.dearpygui as dpg
 
+from data.Settings import settings
+from download.DownloadManager import DownloadJob, JobState, drain_downloads, get_download_manager
+from download.McMod import McModSearchFilter
+from download.SearchPager import SearchPager
+from download.WebMod import WebMod
+from gui.pages import PageBase
+from gui.StateWatcher import on_update, wake
+
+
 class DownloadPage(PageBase):
     def __init__(self):
         super().__init__()
+        self.downloads_ui: int | str = -1
+        self.job_items: dict[DownloadJob, int | str] = {}
+        """正在下载的任务 -> 进度条"""
+        self.pager: SearchPager | None = None
+        """mc 百科的搜索结果，第一次搜索时创建"""
+        self.search_version_ui: int | str = -1
+        self.page_text_ui: int | str = -1
+        self.search_results_ui: int | str = -1
+        on_update.append(self.drain_downloads)
+        on_update.append(self.drain_search)
 
     def build_page(self):
         with dpg.tab_bar():
             with dpg.tab(label="MC MOD 百科"):
-                def _test():
-                    pass
-                dpg.add_button(label="测试", callback=_test)
+                with dpg.group(horizontal=True):
+                    self.search_version_ui = dpg.add_input_text(hint="MC 版本", width=150, on_enter=True,
+                                                                callback=self.search)
+                    dpg.add_button(label="搜索", callback=self.search)
+                    dpg.add_button(label="上一页", callback=self.prev_page)
+                    self.page_text_ui = dpg.add_text("")
+                    dpg.add_button(label="下一页", callback=self.next_page)
+                self.search_results_ui = dpg.add_group()
             with dpg.tab(label="CuroseForge"):
                 pass
             with dpg.tab(label="ModRihon"):
                 pass
+            with dpg.tab(label="下载列表"):
+                self.downloads_ui = dpg.add_group()
+
+    def drain_downloads(self):
+        """每帧在 settings.frame_budget_ms 内取出下载进度，有进度时保持正常帧率"""
+        deadline = time.perf_counter() + settings.frame_budget_ms / 1000
+        if drain_downloads(deadline):
+            wake()
+
+    def drain_search(self):
+        """把后台得到的搜索结果显示到界面上"""
+        if self.pager is not None and self.pager.poll():
+            wake()
+
+    def search(self):
+        """按照输入的条件从第一页开始搜索，还没有完成的请求会被取消"""
+        filter = McModSearchFilter(mc_version=dpg.get_value(self.search_version_ui).strip())
+        if self.pager is None:
+            self.pager = SearchPager(filter, on_page=self.on_search_page)
+            self.show_page(self.pager.goto(1))
+        else:
+            self.pager.set_filter(filter)
+            self.show_page(self.pager.get(1))
+
+    def prev_page(self):
+        if self.pager is not None:
+            self.show_page(self.pager.prev())
+
+    def next_page(self):
+        if self.pager is not None:
+            self.show_page(self.pager.next())
+
+    def on_search_page(self, page: int, mods: list[WebMod] | None):
+        if self.pager is not None and page == self.pager.current:
+            self.show_page(mods, failed=mods is None)
+
+    def show_page(self, mods: list[WebMod] | None, failed: bool = False):
+        """显示当前页，mods 为 None 时表示还在加载"""
+        assert self.pager is not None
+        dpg.set_value(self.page_text_ui, f"第 {self.pager.current} 页")
+        dpg.delete_item(self.search_results_ui, children_only=True)
+        if mods is None:
+            dpg.add_text("加载失败" if failed else "加载中...", parent=self.search_results_ui)
+            return
+        for mod in mods:
+            with dpg.group(parent=self.search_results_ui):
+                dpg.add_text(mod.name)
+                dpg.add_text(f"{mod.loader} {mod.later_version}", color=(150, 150, 150))
+
+    def download(self, url: str, target_path: str, priority: int = 0) -> DownloadJob:
+        """下载一个文件并在下载列表中显示进度"""
+        job = get_download_manager().download(url, target_path, priority,
+                                              on_progress=self.on_download_progress,
+                                              on_done=self.on_download_done)
+        with dpg.group(parent=self.downloads_ui):
+            dpg.add_text(os.path.basename(target_path))
+            self.job_items[job] = dpg.add_progress_bar(default_value=0, overlay='等待中', width=-1)
+        return job
+
+    def on_download_progress(self, job: DownloadJob):
+        bar = self.job_items.get(job)
+        if bar is None:
+            return
+        if job.total:
+            dpg.set_value(bar, job.downloaded / job.total)
+            dpg.configure_item(bar, overlay=f"{job.downloaded // 1024} / {job.total // 1024} KB")
+        else:
+            dpg.configure_item(bar, overlay=f"{job.downloaded // 1024} KB")
+
+    def on_download_done(self, job: DownloadJob):
+        bar = self.job_items.pop(job, None)
+        if bar is None:
+            return
+        if job.state == JobState.done:
+            dpg.set_value(bar, 1)
+            dpg.configure_item(bar, overlay='完成')
+        elif job.state == JobState.cancelled:
+            dpg.configure_item(bar, overlay='已取消')
+        else:
+            dpg.configure_item(bar, overlay=f"失败：{job.error}")
@@ -1,14 +1,17 @@
 import dearpygui.dearpygui as dpg
-from data import GameModsCheck
+from data import GameModsCheck, ModManager
 from data.Settings import settings
 from data.GameInfo import Game
+from data.LoadTask import LoadTask
 from data.mod.ModFile import ModFile
+from data.ModWatcher import ModListChange
 from gui.components.IssueMenu import IssueMenu
 from gui.components.GameList import GameList
 from gui.components.ModItem import ModItem
 from gui.components.ModList import ModList
 from gui.Fonts import Fonts
 from gui.pages import PageBase
+from gui.StateWatcher import add_load_task
 
 
 class GamePage(PageBase):
@@ -19,6 +22,8 @@ class GamePage(PageBase):
     def __init__(self):
         super().__init__()
         self.loading: bool = False
+        self.load_task: LoadTask | None = None
+        """正在进行的后台加载, 切换游戏或页面时会被取消"""
         self.game_list: GameList = GameList(
             on_selected_game=self.on_change_game,
             on_reloaded_game=self.on_reload_game)
@@ -30,6 +35,7 @@ class GamePage(PageBase):
         self.current_game: Game | None = None
         self.issue_menu: IssueMenu = IssueMenu()
         GamePage.get = self
+        ModManager.get().on_mods_changed.append(self.on_mods_changed)
 
     def build_page(self):
         dpg.configure_item(self.ui, no_scrollbar=True)
@@ -69,33 +75,43 @@ class GamePage(PageBase):
         super().show()
         if not self.game_list.show_items:
             self.game_list.reload_games()
-        if self.current_game and not self.mod_list.mod_items:
+        if self.current_game and not self.mod_list.mods:
             self.try_show_mods()
 
     def hide(self):
         super().hide()
+        self.cancel_loading()
         self.mod_list.clear()
 
     def set_loading(self, loading: bool):
         self.loading = loading
         self.mod_list.set_loading(loading)
+        # 加载时仍然可以切换游戏, 切换时会取消正在进行的加载
         if loading:
             dpg.disable_item(self.game_list.reload_button_ui)
-            dpg.disable_item(self.game_list.game_list_ui)
         else:
             dpg.enable_item(self.game_list.reload_button_ui)
-            dpg.enable_item(self.game_list.game_list_ui)
+
+    def cancel_loading(self):
+        """取消正在进行的后台加载"""
+        if self.load_task:
+            self.load_task.cancel()
+            self.load_task = None
+        self.set_loading(False)
 
     def reload_mods(self):
         """重新加载当前选中游戏的 mod
         """
         if not self.current_game:
             return
+        self.cancel_loading()
         self.mod_list.clear()
         self.set_loading(True)
-        self.current_game.reload_mods(
-            self.mod_list.add, self.on_load_mod_over
+        self.load_task = self.current_game.reload_mods(
+            self.mod_list.add, self.on_load_mod_over, quick=True, background=True,
+            on_load_failed=self.on_load_mod_failed
         )
+        add_load_task(self.load_task)
 
     def try_show_mods(self):
         """尝试显示mod, 若mod还未加载则加载mod
@@ -106,6 +122,7 @@ class GamePage(PageBase):
             self.mod_list.clear()
             for mod in self.current_game.mod_list:
                 self.mod_list.add(mod)
+            self.mod_list.load_full_in_background()
         else:
             self.reload_mods()
 
@@ -121,28 +138,61 @@ class GamePage(PageBase):
     def on_change_game(self, game: Game):
         """改变选择的游戏时触发, 这会尝试刷新mod列表(调用 try_show_mods)
         """
+        self.cancel_loading()
         self.current_game = game
         self.try_show_mods()
 
     def on_reload_game(self):
         """当重新加载游戏时触发, 这会清空 mod 列表并设置 current_game = None
         """
+        self.cancel_loading()
         self.current_game = None
         self.mod_list.clear()
 
     def on_load_mod_over(self, mods: list[ModFile]):
+        self.load_task = None
+        self.set_loading(False)
+        # 快速解析的 mod 先显示出来, 描述等信息在后台补全
+        self.mod_list.load_full_in_background()
+
+    def on_load_mod_failed(self, error: Exception):
+        """加载失败时游戏的 mod 列表没有变化, 重新显示原来的列表"""
+        self.load_task = None
         self.set_loading(False)
+        self.mod_list.clear()
+        if self.current_game and self.current_game.mod_list:
+            for mod in self.current_game.mod_list:
+                self.mod_list.add(mod)
+            self.mod_list.load_full_in_background()
+
+    def on_mods_changed(self, game: Game | None, change: ModListChange):
+        """当前游戏的 mods 目录中的文件发生变化时，只更新变化了的 mod 控件
+        """
+        if game is None or game is not self.current_game or self.loading \
+                or not dpg.is_item_shown(self.ui):
+            return
+        for mod in change.removed:
+            self.mod_list.remove(mod)
+        for mod in change.moved:
+            self.mod_list.refresh(mod)
+        for mod in change.added:
+            self.mod_list.add(mod)
+        if change.added:
+            self.mod_list.load_full_in_background()
 
     def on_mod_main_button_click(self, item: int | str, value, data: ModItem):
         """当ModItem的主要按钮按下
         """
         mod = data.mod
-        if mod.enabled:
-            mod.enabled = False
-            dpg.set_item_label(data.main_button_ui, Fonts.is_disabled_text)
+        # 通过 Game 开关 mod，已经检查过的游戏只会重新检查受影响的 mod
+        if self.current_game:
+            self.current_game.set_mod_enabled(mod, not mod.enabled)
         else:
-            mod.enabled = True
+            mod.enabled = not mod.enabled
+        if mod.enabled:
             dpg.set_item_label(data.main_button_ui, Fonts.is_enabled_text)
+        else:
+            dpg.set_item_label(data.main_button_ui, Fonts.is_disabled_text)
         data.reshow_info()
 
     def on_mod_minor_button_click(self, item: int | str, value, data: ModItem):
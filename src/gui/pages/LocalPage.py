@@ -5,6 +5,10 @@ from gui.pages import PageBase
 from gui.components.ModItem import ModItem
 from data import ModFile
 from data import ModManager
+from data.GameInfo import Game
+from data.LoadTask import LoadTask
+from data.ModWatcher import ModListChange, remove_mod_by_identity
+from gui.StateWatcher import add_load_task
 
 
 class LocalPage(PageBase):
@@ -14,7 +18,10 @@ class LocalPage(PageBase):
         super().__init__()
         self.ml: ModList = None  # type: ignore
         self.loading: bool = False
+        self.load_task: LoadTask | None = None
+        """正在进行的后台加载"""
         LocalPage.get = self
+        ModManager.get().on_mods_changed.append(self.on_mods_changed)
         with dpg.theme() as self.menu_theme:
             with dpg.theme_component():
                 dpg.add_theme_style(dpg.mvStyleVar_WindowPadding, 0, 0)
@@ -35,11 +42,12 @@ class LocalPage(PageBase):
         super().show()
         if not ModManager.get().local_mods:
             self.reload_mods()
-        if not self.ml.mod_items:
+        if not self.ml.mods:
             self.reshow_mods()
 
     def hide(self):
         super().hide()
+        self.cancel_loading()
         self.ml.clear()
 
     def set_loading(self, loading: bool):
@@ -53,17 +61,53 @@ class LocalPage(PageBase):
         self.set_loading(True)
         import gc
         gc.collect()
-        ModManager.get().reload_local_mods(
+        self.load_task = ModManager.get().reload_local_mods(
             on_load_one=self.ml.add,
-            on_load_over=self.on_load_over
+            on_load_over=self.on_load_over,
+            quick=True,
+            background=True,
+            on_load_failed=self.on_load_failed
         )
+        add_load_task(self.load_task)
+
+    def cancel_loading(self):
+        """取消正在进行的后台加载"""
+        if self.load_task:
+            self.load_task.cancel()
+            self.load_task = None
+        self.set_loading(False)
 
     def reshow_mods(self):
         for mod in ModManager.get().local_mods:
             self.ml.add(mod)
+        self.ml.load_full_in_background()
 
     def on_load_over(self, mods: list[ModFile]):
+        self.load_task = None
+        self.set_loading(False)
+        # 快速解析的 mod 先显示出来, 描述等信息在后台补全
+        self.ml.load_full_in_background()
+
+    def on_load_failed(self, error: Exception):
+        """加载失败时 local_mods 没有变化, 重新显示原来的列表"""
+        self.load_task = None
         self.set_loading(False)
+        self.ml.clear()
+        self.reshow_mods()
+
+    def on_mods_changed(self, game: Game | None, change: ModListChange):
+        """仓库目录中的文件发生变化时，只更新变化了的 mod 控件
+        """
+        if game is not None or self.loading or not dpg.is_item_shown(self.ui):
+            return
+        for mod in change.removed:
+            self.ml.remove(mod)
+        for mod in change.moved:
+            self.ml.refresh(mod)
+        for mod in change.added:
+            self.ml.add(mod)
+        if change.added:
+            self.ml.load_full_in_background()
 
     def on_mod_main_button_click(self, item: int | str, value, data: ModItem):
         from gui.MainWindow import MainWindow
@@ -73,7 +117,7 @@ class LocalPage(PageBase):
         from gui.MainWindow import MainWindow
 
         def _del_mod(mod: ModFile):
-            ModManager.get().local_mods.remove(mod)
+            remove_mod_by_identity(ModManager.get().local_mods, mod)
             LocalPage.get.ml.remove(mod)
             mod.delete_file()
 
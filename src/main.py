@@ -1,3 +1,4 @@
-import gui.Setup
-
-gui.Setup.setup()
\ No newline at end of file
+if __name__ == '__main__':
+    # 扫描 mod 时会启动进程池，子进程会重新导入主模块，所以这里必须加上保护
+    import gui.Setup
+    gui.Setup.setup()